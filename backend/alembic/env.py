@@ -19,6 +19,18 @@ if config.config_file_name is not None:
 from app.models import Base
 target_metadata = Base.metadata
 
+# 数据库地址以应用配置为准（环境变量 DATABASE_URL / .env）
+from app.config import settings
+config.set_main_option("sqlalchemy.url", settings.DATABASE_URL)
+
+
+def include_name(name, type_, parent_names) -> bool:
+    # 全文检索虚拟表由 app/search.py 在运行时维护，不纳入迁移
+    if type_ == "table":
+        return not (name or "").startswith("cursor_rules_fts")
+    return True
+
+
 # other values from the config, defined by the needs of env.py,
 # can be acquired:
 # my_important_option = config.get_main_option("my_important_option")
@@ -41,6 +53,7 @@ def run_migrations_offline() -> None:
     context.configure(
         url=url,
         target_metadata=target_metadata,
+        include_name=include_name,
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
     )
@@ -64,7 +77,9 @@ def run_migrations_online() -> None:
 
     with connectable.connect() as connection:
         context.configure(
-            connection=connection, target_metadata=target_metadata
+            connection=connection,
+            target_metadata=target_metadata,
+            include_name=include_name,
         )
 
         with context.begin_transaction():
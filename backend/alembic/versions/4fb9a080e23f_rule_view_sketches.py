@@ -0,0 +1,36 @@
+"""rule view sketches
+
+Revision ID: 4fb9a080e23f
+Revises: a9f1a2e2bdc3
+Create Date: 2026-10-18 17:44:13.425441
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4fb9a080e23f'
+down_revision: Union[str, None] = 'a9f1a2e2bdc3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # 独立访客 HyperLogLog 草图（已由 create_all 建表的库跳过）
+    if sa.inspect(op.get_bind()).has_table('rule_view_sketches'):
+        return
+    op.create_table('rule_view_sketches',
+    sa.Column('cursor_rule_id', sa.Integer(), nullable=False),
+    sa.Column('precision', sa.SmallInteger(), nullable=False),
+    sa.Column('registers', sa.LargeBinary(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    sa.ForeignKeyConstraint(['cursor_rule_id'], ['cursor_rules.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('cursor_rule_id')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('rule_view_sketches')
@@ -0,0 +1,140 @@
+"""schema and performance indexes
+
+Revision ID: 88d00741a64b
+Revises: 3c12c3721c32
+Create Date: 2026-10-18 17:19:37.961249
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '88d00741a64b'
+down_revision: Union[str, None] = '3c12c3721c32'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _has_table(table_name: str) -> bool:
+    return sa.inspect(op.get_bind()).has_table(table_name)
+
+
+def _create_index(index_name: str, table_name: str, columns, **kw) -> None:
+    """索引不存在时创建（兼容已由 create_all 建好表的库）"""
+    existing = {index["name"] for index in sa.inspect(op.get_bind()).get_indexes(table_name)}
+    if index_name not in existing:
+        op.create_index(index_name, table_name, columns, **kw)
+
+
+def upgrade() -> None:
+    # 表结构：新库在此建表；已由 Base.metadata.create_all 建好的库跳过建表，只补索引
+    if not _has_table('users'):
+        op.create_table('users',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('username', sa.String(length=50), nullable=False),
+        sa.Column('password_hash', sa.String(length=255), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+        )
+    _create_index('ix_users_id', 'users', ['id'])
+    _create_index('ix_users_username', 'users', ['username'], unique=True)
+    if not _has_table('categories'):
+        op.create_table('categories',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(length=100), nullable=False),
+        sa.Column('description', sa.Text(), nullable=True),
+        sa.Column('created_by', sa.Integer(), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.ForeignKeyConstraint(['created_by'], ['users.id'], ),
+        sa.PrimaryKeyConstraint('id')
+        )
+    _create_index('ix_categories_id', 'categories', ['id'])
+    _create_index('ix_categories_name', 'categories', ['name'], unique=True)
+    if not _has_table('tags'):
+        op.create_table('tags',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(length=50), nullable=False),
+        sa.Column('created_by', sa.Integer(), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.ForeignKeyConstraint(['created_by'], ['users.id'], ),
+        sa.PrimaryKeyConstraint('id')
+        )
+    _create_index('ix_tags_id', 'tags', ['id'])
+    _create_index('ix_tags_name', 'tags', ['name'], unique=True)
+    if not _has_table('cursor_rules'):
+        op.create_table('cursor_rules',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('title', sa.String(length=200), nullable=False),
+        sa.Column('filename', sa.String(length=100), nullable=False),
+        sa.Column('category_id', sa.Integer(), nullable=False),
+        sa.Column('description', sa.Text(), nullable=True),
+        sa.Column('content', sa.Text(), nullable=False),
+        sa.Column('example', sa.Text(), nullable=True),
+        sa.Column('author_id', sa.Integer(), nullable=False),
+        sa.Column('likes_count', sa.Integer(), nullable=True),
+        sa.Column('dislikes_count', sa.Integer(), nullable=True),
+        sa.Column('download_count', sa.Integer(), nullable=True),
+        sa.Column('view_count', sa.Integer(), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.ForeignKeyConstraint(['author_id'], ['users.id'], ),
+        sa.ForeignKeyConstraint(['category_id'], ['categories.id'], ),
+        sa.PrimaryKeyConstraint('id')
+        )
+    _create_index('ix_cursor_rules_author_created', 'cursor_rules', ['author_id', 'created_at'])
+    _create_index('ix_cursor_rules_category_created', 'cursor_rules', ['category_id', 'created_at'])
+    _create_index('ix_cursor_rules_created_at', 'cursor_rules', ['created_at'])
+    _create_index('ix_cursor_rules_download_count', 'cursor_rules', ['download_count'])
+    _create_index('ix_cursor_rules_id', 'cursor_rules', ['id'])
+    _create_index('ix_cursor_rules_title', 'cursor_rules', ['title'])
+    if not _has_table('cursor_rules_tags'):
+        op.create_table('cursor_rules_tags',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('cursor_rule_id', sa.Integer(), nullable=False),
+        sa.Column('tag_id', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['cursor_rule_id'], ['cursor_rules.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['tag_id'], ['tags.id'], ),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('cursor_rule_id', 'tag_id', name='unique_rule_tag')
+        )
+    _create_index('ix_cursor_rules_tags_id', 'cursor_rules_tags', ['id'])
+    _create_index('ix_cursor_rules_tags_tag_rule', 'cursor_rules_tags', ['tag_id', 'cursor_rule_id'])
+    if not _has_table('votes'):
+        op.create_table('votes',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('cursor_rule_id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=True),
+        sa.Column('ip_address', sa.String(length=45), nullable=False),
+        sa.Column('vote_type', sa.Enum('LIKE', 'DISLIKE', name='votetype'), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.ForeignKeyConstraint(['cursor_rule_id'], ['cursor_rules.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('cursor_rule_id', 'ip_address', name='unique_ip_rule'),
+        sa.UniqueConstraint('cursor_rule_id', 'user_id', name='unique_user_rule')
+        )
+    _create_index('ix_votes_id', 'votes', ['id'])
+    _create_index('ix_votes_rule_type', 'votes', ['cursor_rule_id', 'vote_type'])
+
+    # 全文检索索引（MySQL ngram 分词器，见 app/search.py）
+    if op.get_bind().dialect.name == "mysql":
+        _create_index(
+            'ft_cursor_rules', 'cursor_rules', ['title', 'description', 'content'],
+            mysql_prefix='FULLTEXT', mysql_with_parser='ngram'
+        )
+
+
+def downgrade() -> None:
+    # 表在迁移链建立之前已由 create_all 创建，回退时只移除本次新增的性能索引
+    if op.get_bind().dialect.name == "mysql":
+        op.drop_index('ft_cursor_rules', table_name='cursor_rules')
+    op.drop_index('ix_votes_rule_type', table_name='votes')
+    op.drop_index('ix_cursor_rules_tags_tag_rule', table_name='cursor_rules_tags')
+    op.drop_index('ix_cursor_rules_download_count', table_name='cursor_rules')
+    op.drop_index('ix_cursor_rules_created_at', table_name='cursor_rules')
+    op.drop_index('ix_cursor_rules_category_created', table_name='cursor_rules')
+    op.drop_index('ix_cursor_rules_author_created', table_name='cursor_rules')
@@ -0,0 +1,55 @@
+"""sort mode indexes
+
+Revision ID: a9f1a2e2bdc3
+Revises: 88d00741a64b
+Create Date: 2026-10-18 17:21:50.436319
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a9f1a2e2bdc3'
+down_revision: Union[str, None] = '88d00741a64b'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _has_column(table_name: str, column_name: str) -> bool:
+    columns = sa.inspect(op.get_bind()).get_columns(table_name)
+    return any(column["name"] == column_name for column in columns)
+
+
+def _create_index(index_name: str, table_name: str, columns, **kw) -> None:
+    """索引不存在时创建（兼容已由 create_all 建好表的库）"""
+    existing = {index["name"] for index in sa.inspect(op.get_bind()).get_indexes(table_name)}
+    if index_name not in existing:
+        op.create_index(index_name, table_name, columns, **kw)
+
+
+def upgrade() -> None:
+    # 净好评数：虚拟生成列，不占存储，只在索引中物化
+    if not _has_column('cursor_rules', 'net_score'):
+        op.add_column('cursor_rules', sa.Column('net_score', sa.Integer(), sa.Computed('likes_count - dislikes_count', persisted=False), nullable=True))
+    # 每种排序方式的全局索引和按分类索引
+    _create_index('ix_cursor_rules_category_downloads', 'cursor_rules', ['category_id', 'download_count'])
+    _create_index('ix_cursor_rules_likes_count', 'cursor_rules', ['likes_count'])
+    _create_index('ix_cursor_rules_category_likes', 'cursor_rules', ['category_id', 'likes_count'])
+    _create_index('ix_cursor_rules_view_count', 'cursor_rules', ['view_count'])
+    _create_index('ix_cursor_rules_category_views', 'cursor_rules', ['category_id', 'view_count'])
+    _create_index('ix_cursor_rules_net_score', 'cursor_rules', ['net_score'])
+    _create_index('ix_cursor_rules_category_net_score', 'cursor_rules', ['category_id', 'net_score'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_cursor_rules_category_net_score', table_name='cursor_rules')
+    op.drop_index('ix_cursor_rules_net_score', table_name='cursor_rules')
+    op.drop_index('ix_cursor_rules_category_views', table_name='cursor_rules')
+    op.drop_index('ix_cursor_rules_view_count', table_name='cursor_rules')
+    op.drop_index('ix_cursor_rules_category_likes', table_name='cursor_rules')
+    op.drop_index('ix_cursor_rules_likes_count', table_name='cursor_rules')
+    op.drop_index('ix_cursor_rules_category_downloads', table_name='cursor_rules')
+    op.drop_column('cursor_rules', 'net_score')
@@ -0,0 +1,37 @@
+"""rule content blobs
+
+Revision ID: c7d5e2a91b04
+Revises: 4fb9a080e23f
+Create Date: 2026-10-18 19:02:37.518204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c7d5e2a91b04'
+down_revision: Union[str, None] = '4fb9a080e23f'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # 规则正文预压缩数据（已由 create_all 建表的库跳过；存量规则在首次下载时补齐）
+    if sa.inspect(op.get_bind()).has_table('rule_content_blobs'):
+        return
+    op.create_table('rule_content_blobs',
+    sa.Column('cursor_rule_id', sa.Integer(), nullable=False),
+    sa.Column('crc32', sa.BigInteger(), nullable=False),
+    sa.Column('size', sa.Integer(), nullable=False),
+    sa.Column('compressed', sa.LargeBinary(length=16777216), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    sa.ForeignKeyConstraint(['cursor_rule_id'], ['cursor_rules.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('cursor_rule_id')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('rule_content_blobs')
@@ -0,0 +1,30 @@
+"""rule blob compression method
+
+Revision ID: e3b8f0c4d215
+Revises: c7d5e2a91b04
+Create Date: 2026-10-18 19:48:10.204117
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e3b8f0c4d215'
+down_revision: Union[str, None] = 'c7d5e2a91b04'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # 预压缩数据的 ZIP 压缩方法（短小正文以 STORED 存储），存量数据均为 deflate
+    columns = {column['name'] for column in sa.inspect(op.get_bind()).get_columns('rule_content_blobs')}
+    if 'method' in columns:
+        return
+    op.add_column('rule_content_blobs', sa.Column('method', sa.SmallInteger(), server_default='8', nullable=False))
+
+
+def downgrade() -> None:
+    op.drop_column('rule_content_blobs', 'method')
@@ -0,0 +1,47 @@
+"""rule change log
+
+Revision ID: f1a6c3d8e927
+Revises: e3b8f0c4d215
+Create Date: 2026-10-18 21:05:42.381920
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f1a6c3d8e927'
+down_revision: Union[str, None] = 'e3b8f0c4d215'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # 规则变更日志和序号计数（已由 create_all 建表的库跳过；存量规则在启动时补记，见 changelog.backfill）
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    if not inspector.has_table('rule_changes'):
+        op.create_table('rule_changes',
+        sa.Column('seq', sa.BigInteger(), autoincrement=False, nullable=False),
+        sa.Column('cursor_rule_id', sa.Integer(), nullable=False),
+        sa.Column('action', sa.String(length=10), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.PrimaryKeyConstraint('seq')
+        )
+    if not inspector.has_table('change_log_counter'):
+        op.create_table('change_log_counter',
+        sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column('last_seq', sa.BigInteger(), nullable=False),
+        sa.PrimaryKeyConstraint('id')
+        )
+    # 预先创建计数行，分配序号时只需更新，各 worker 不会并发插入
+    if bind.execute(sa.text('SELECT COUNT(*) FROM change_log_counter WHERE id = 1')).scalar() == 0:
+        counter = sa.table('change_log_counter', sa.column('id', sa.Integer), sa.column('last_seq', sa.BigInteger))
+        op.bulk_insert(counter, [{'id': 1, 'last_seq': 0}])
+
+
+def downgrade() -> None:
+    op.drop_table('change_log_counter')
+    op.drop_table('rule_changes')
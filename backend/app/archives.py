@@ -0,0 +1,142 @@
+import calendar
+import tarfile
+import zlib
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .config import settings
+from .zipstream import DateTime, ZIP_DEFLATED, stream_precompressed_zip
+
+try:
+    import zstandard
+except ImportError:  # 可选依赖，未安装时不提供 tar.zst 格式
+    zstandard = None
+
+# 归档条目：(文件路径, 预压缩数据, 压缩方法, CRC32, 原文大小, 修改时间)，与 stream_precompressed_zip 相同
+ArchiveEntry = Tuple[str, bytes, int, int, int, DateTime]
+
+# tar 块大小和记录大小（结尾补齐到整条记录，与 tarfile 一致）
+_TAR_BLOCK = tarfile.BLOCKSIZE
+_TAR_RECORD = tarfile.RECORDSIZE
+
+
+def inflate(data: bytes, method: int) -> bytes:
+    """还原预压缩数据（raw deflate 或 STORED）为原文"""
+    return zlib.decompress(data, -15) if method == ZIP_DEFLATED else data
+
+
+def tar_header(arcname: str, size: int, date_time: DateTime) -> bytes:
+    """普通文件的 tar 头（PAX 格式，非 ASCII 文件名写入扩展头）；属主、时间等固定，相同输入得到相同字节"""
+    info = tarfile.TarInfo(arcname)
+    info.size = size
+    info.mtime = calendar.timegm(tuple(date_time) + (0, 0, 0))
+    info.mode = 0o644
+    return info.tobuf(tarfile.PAX_FORMAT, "utf-8", "surrogateescape")
+
+
+class ArchiveFormat:
+    """可流式输出的归档格式
+
+    name 为 format 参数的取值，media_type 用于 Accept 协商，extension 为下载文件扩展名。
+    stream 逐条消费预压缩条目并产出归档字节，不在内存中保留整个归档。
+    """
+
+    name = ""
+    media_type = ""
+    extension = ""
+
+    def stream(self, entries: Iterable[ArchiveEntry]) -> Iterator[bytes]:
+        raise NotImplementedError
+
+
+class ZipFormat(ArchiveFormat):
+    """ZIP：直接拼接预压缩数据，不做任何压缩"""
+
+    name = "zip"
+    media_type = "application/zip"
+    extension = "zip"
+
+    def stream(self, entries: Iterable[ArchiveEntry]) -> Iterator[bytes]:
+        return stream_precompressed_zip(entries)
+
+
+class TarFormat(ArchiveFormat):
+    """tar 整体压缩（gzip / zstd）
+
+    与 ZIP 逐文件压缩不同，整个 tar 流使用同一个压缩器，大量相似的短小规则文件之间可以共享字典，
+    压缩率明显更高；预压缩数据需先还原为原文。
+    """
+
+    def __init__(self, name: str, media_type: str, compressor_factory):
+        self.name = name
+        self.media_type = media_type
+        self.extension = name
+        self._compressor_factory = compressor_factory
+
+    def stream(self, entries: Iterable[ArchiveEntry]) -> Iterator[bytes]:
+        compressor = self._compressor_factory()
+        offset = 0
+        for arcname, data, method, _, size, date_time in entries:
+            content = inflate(data, method)
+            padding = -len(content) % _TAR_BLOCK
+            block = tar_header(arcname, len(content), date_time) + content + b"\0" * padding
+            offset += len(block)
+            output = compressor.compress(block)
+            if output:
+                yield output
+        # 结尾两个空块，并补齐到整条记录
+        end = 2 * _TAR_BLOCK
+        end += -(offset + end) % _TAR_RECORD
+        yield compressor.compress(b"\0" * end) + compressor.flush()
+
+
+def _gzip_compressor():
+    # wbits=31 输出 gzip 格式，文件头中的时间为0，相同输入得到相同字节
+    return zlib.compressobj(settings.TAR_GZIP_LEVEL, zlib.DEFLATED, 31)
+
+
+def _zstd_compressor():
+    return zstandard.ZstdCompressor(level=settings.TAR_ZSTD_LEVEL).compressobj()
+
+
+# 支持的归档格式，按 format 参数取值索引（第一个为默认格式）
+ARCHIVE_FORMATS: Dict[str, ArchiveFormat] = {
+    "zip": ZipFormat(),
+    "tar.gz": TarFormat("tar.gz", "application/gzip", _gzip_compressor),
+}
+if zstandard is not None:
+    ARCHIVE_FORMATS["tar.zst"] = TarFormat("tar.zst", "application/zstd", _zstd_compressor)
+
+DEFAULT_ARCHIVE_FORMAT = ARCHIVE_FORMATS["zip"]
+
+
+def _parse_accept(accept: str) -> List[Tuple[str, float]]:
+    """解析 Accept 头为 [(媒体类型, q)]"""
+    media_ranges = []
+    for part in accept.split(","):
+        media_type, *params = [item.strip() for item in part.split(";")]
+        quality = 1.0
+        for param in params:
+            key, _, value = param.partition("=")
+            if key.strip() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if media_type:
+            media_ranges.append((media_type.lower(), quality))
+    return media_ranges
+
+
+def negotiate_format(format_name: Optional[str], accept: Optional[str]) -> Optional[ArchiveFormat]:
+    """选择归档格式：format 参数优先，其次按 Accept 中 q 值最高的已支持类型，都没有时为 ZIP
+
+    format 参数取值不支持时返回 None。
+    """
+    if format_name:
+        return ARCHIVE_FORMATS.get(format_name)
+    best, best_quality = DEFAULT_ARCHIVE_FORMAT, 0.0
+    for media_type, quality in _parse_accept(accept or ""):
+        for archive_format in ARCHIVE_FORMATS.values():
+            if archive_format.media_type == media_type and quality > best_quality:
+                best, best_quality = archive_format, quality
+    return best
@@ -71,6 +71,10 @@ def get_current_user(
         headers={"WWW-Authenticate": "Bearer"},
     )
     
+    # 未携带认证头（security 设置了 auto_error=False）
+    if credentials is None:
+        raise credentials_exception
+    
     token = credentials.credentials
     payload = verify_token(token)
     if payload is None:
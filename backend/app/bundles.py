@@ -0,0 +1,274 @@
+import hashlib
+import json
+import logging
+import os
+import struct
+import threading
+import time
+import uuid
+import zipfile
+from contextlib import nullcontext
+from typing import BinaryIO, Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from .config import settings
+from .models import CursorRule, CursorRuleTag, RuleContentBlob
+from .rule_blobs import blob_date_time, ensure_blobs
+from .zipstream import DateTime, ZipStreamWriter
+
+logger = logging.getLogger(__name__)
+
+# 整包下载的范围：分类下全部规则 / 标签下全部规则
+BUNDLE_KINDS = ("category", "tag")
+
+# 读取成员列表和预压缩数据时每批的行数（服务端游标，内存中只保留一批）
+BUNDLE_FETCH_BATCH_SIZE = 200
+
+# 本地文件头长度，文件名长度和扩展字段长度位于最后4个字节
+_LOCAL_HEADER_SIZE = 30
+
+# 成员：[规则ID, ZIP内路径, 压缩方法, CRC32, 原文大小, (年, 月, 日, 时, 分, 秒)]
+Member = list
+
+
+class BundleFile(NamedTuple):
+    """已生成的整包文件"""
+    path: str
+    token: str
+    size: int
+    count: int
+
+
+def _date_time(updated_at) -> List[int]:
+    # 清单保存为 JSON，时间以列表形式比较
+    return list(blob_date_time(updated_at))
+
+
+def read_entry(bundle_file: BinaryIO, header_offset: int, compress_size: int) -> bytes:
+    """从整包文件中读取一个条目的压缩数据"""
+    bundle_file.seek(header_offset + _LOCAL_HEADER_SIZE - 4)
+    name_length, extra_length = struct.unpack("<2H", bundle_file.read(4))
+    bundle_file.seek(name_length + extra_length, os.SEEK_CUR)
+    return bundle_file.read(compress_size)
+
+
+def iter_bundle_entries(bundle_file: BinaryIO) -> Iterator[Tuple[str, bytes, int, int, int, DateTime]]:
+    """逐条产出整包文件中的 (文件路径, 压缩数据, 压缩方法, CRC32, 原文大小, 修改时间)"""
+    with zipfile.ZipFile(bundle_file) as bundle_zip:
+        infos = bundle_zip.infolist()
+    for info in infos:
+        data = read_entry(bundle_file, info.header_offset, info.compress_size)
+        yield info.filename, data, info.compress_type, info.CRC, info.file_size, info.date_time
+
+
+class BundleCache:
+    """分类、标签整包的缓存
+
+    整包是拼接各规则预压缩数据（见 rule_blobs）生成的 ZIP 文件，保存在 directory 下，
+    旁边的 JSON 清单记录每个成员的路径、CRC32 和修改时间。下载时直接发送文件，不再逐请求打包。
+    整包文件名中的 token 由清单计算，可直接作为 ETag。
+
+    规则创建、修改、删除后（invalidate），或距上次校验超过 check_interval 秒后（其他 worker 的修改），
+    下一次下载会重新读取成员列表（只读元数据，不读正文）与清单比对：
+    没有变化直接使用原文件；有变化时增量重建——未变化的成员从旧文件中原样复制，
+    只有新增或修改的规则从数据库读取预压缩数据。
+    """
+
+    def __init__(self, directory: str, check_interval: float):
+        self.directory = directory
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._key_locks: Dict[Tuple[str, int], threading.Lock] = {}
+        # (类型, ID) -> (校验时的版本号, 校验时间)
+        self._checked: Dict[Tuple[str, int], Tuple[int, float]] = {}
+        self._generation = 0
+        self._builds = 0
+        self._copied = 0
+        self._fetched = 0
+
+    def invalidate(self) -> None:
+        """规则有变化，所有整包在下次下载时重新校验"""
+        with self._lock:
+            self._generation += 1
+
+    def _key_lock(self, key: Tuple[str, int]) -> threading.Lock:
+        with self._lock:
+            return self._key_locks.setdefault(key, threading.Lock())
+
+    def _manifest_path(self, kind: str, key_id: int) -> str:
+        return os.path.join(self.directory, f"{kind}-{key_id}.json")
+
+    def _zip_path(self, kind: str, key_id: int, token: str) -> str:
+        return os.path.join(self.directory, f"{kind}-{key_id}-{token}.zip")
+
+    def _load_manifest(self, kind: str, key_id: int) -> Optional[dict]:
+        try:
+            with open(self._manifest_path(kind, key_id), encoding="utf-8") as manifest_file:
+                return json.load(manifest_file)
+        except (OSError, ValueError):
+            return None
+
+    def _bundle_file(self, kind: str, key_id: int, manifest: dict) -> BundleFile:
+        path = self._zip_path(kind, key_id, manifest["token"])
+        return BundleFile(path, manifest["token"], manifest["size"], len(manifest["members"]))
+
+    def _scan_members(self, db: Session, kind: str, key_id: int, fill_missing: bool = True) -> List[Member]:
+        """读取整包当前的成员（只读元数据），顺带补齐缺少预压缩数据的规则"""
+        query = db.query(
+            CursorRule.id, CursorRule.filename, RuleContentBlob.method, RuleContentBlob.crc32,
+            RuleContentBlob.size, RuleContentBlob.updated_at
+        ).outerjoin(RuleContentBlob, RuleContentBlob.cursor_rule_id == CursorRule.id)
+        if kind == "category":
+            query = query.filter(CursorRule.category_id == key_id)
+        else:
+            query = query.join(CursorRuleTag, CursorRuleTag.cursor_rule_id == CursorRule.id).filter(
+                CursorRuleTag.tag_id == key_id
+            )
+        query = query.order_by(CursorRule.id)
+
+        members, missing = [], []
+        for rule_id, filename, method, crc32, size, updated_at in query.yield_per(BUNDLE_FETCH_BATCH_SIZE):
+            if crc32 is None:
+                missing.append(rule_id)
+            else:
+                members.append([rule_id, f".cursor/rules/{filename}.mdc", method, crc32, size, _date_time(updated_at)])
+        if not missing or not fill_missing:
+            return members
+        for start in range(0, len(missing), BUNDLE_FETCH_BATCH_SIZE):
+            ensure_blobs(db, missing[start:start + BUNDLE_FETCH_BATCH_SIZE])
+        return self._scan_members(db, kind, key_id, fill_missing=False)
+
+    def _build(self, db: Session, kind: str, key_id: int, members: List[Member], old: Optional[dict]) -> dict:
+        """增量重建整包，返回新的清单"""
+        old_members = {member[0]: member for member in old["members"]} if old else {}
+        old_path = self._zip_path(kind, key_id, old["token"]) if old else None
+        old_file: Optional[BinaryIO] = None
+        if old_path:
+            try:
+                old_file = open(old_path, "rb")
+            except FileNotFoundError:
+                # 旧文件已被其他 worker 重建删除，全部成员从数据库读取
+                old_path = None
+
+        os.makedirs(self.directory, exist_ok=True)
+        temp_path = os.path.join(self.directory, f"{kind}-{key_id}.{uuid.uuid4().hex}.tmp")
+        writer = ZipStreamWriter()
+        written: List[Member] = []
+        copied = fetched = 0
+        with old_file or nullcontext(), open(temp_path, "wb") as output:
+            # 规则ID -> 旧整包中条目的 (本地文件头偏移, 压缩数据大小)，清单与中央目录顺序一致
+            old_offsets: Dict[int, Tuple[int, int]] = {}
+            if old_file is not None:
+                with zipfile.ZipFile(old_file) as old_zip:
+                    old_offsets = {
+                        member[0]: (info.header_offset, info.compress_size)
+                        for member, info in zip(old["members"], old_zip.infolist())
+                    }
+            for start in range(0, len(members), BUNDLE_FETCH_BATCH_SIZE):
+                batch = members[start:start + BUNDLE_FETCH_BATCH_SIZE]
+                changed = {
+                    member[0] for member in batch
+                    if old_members.get(member[0]) != member or member[0] not in old_offsets
+                }
+                blobs = {}
+                if changed:
+                    # 以读到的预压缩数据为准（成员列表读取后规则可能又被修改）
+                    blobs = {
+                        rule_id: (compressed, method, crc32, size, _date_time(updated_at))
+                        for rule_id, compressed, method, crc32, size, updated_at in db.query(
+                            RuleContentBlob.cursor_rule_id, RuleContentBlob.compressed, RuleContentBlob.method,
+                            RuleContentBlob.crc32, RuleContentBlob.size, RuleContentBlob.updated_at
+                        ).filter(RuleContentBlob.cursor_rule_id.in_(changed))
+                    }
+                for member in batch:
+                    rule_id, arcname = member[0], member[1]
+                    if rule_id in blobs:
+                        data, method, crc32, size, date_time = blobs[rule_id]
+                        member = [rule_id, arcname, method, crc32, size, date_time]
+                        fetched += 1
+                    elif rule_id in changed:
+                        # 规则已被删除
+                        continue
+                    else:
+                        data = read_entry(old_file, *old_offsets[rule_id])
+                        copied += 1
+                    for chunk in writer.add_compressed(
+                        arcname, data, member[3], member[4], tuple(member[5]), member[2]
+                    ):
+                        output.write(chunk)
+                    written.append(member)
+            for chunk in writer.close():
+                output.write(chunk)
+            size = output.tell()
+        # 整包字节只取决于成员，token 由成员清单计算，各 worker 生成的相同整包 token 相同
+        token = hashlib.sha1(json.dumps(written).encode("utf-8")).hexdigest()[:16]
+        path = self._zip_path(kind, key_id, token)
+        os.replace(temp_path, path)
+
+        manifest = {"token": token, "size": size, "members": written}
+        manifest_path = self._manifest_path(kind, key_id)
+        with open(temp_path, "w", encoding="utf-8") as manifest_file:
+            manifest_file.write(json.dumps(manifest))
+        os.replace(temp_path, manifest_path)
+        if old_path and old_path != path:
+            # 正在发送旧文件的请求已打开文件，删除不影响其读取
+            try:
+                os.remove(old_path)
+            except FileNotFoundError:
+                pass
+
+        with self._lock:
+            self._builds += 1
+            self._copied += copied
+            self._fetched += fetched
+        logger.info("整包 %s-%s 已重建：复制 %s 条，读取 %s 条", kind, key_id, copied, fetched)
+        return manifest
+
+    def get(self, db: Session, kind: str, key_id: int, force_check: bool = False) -> Optional[BundleFile]:
+        """返回最新的整包文件，成员为空时返回 None"""
+        key = (kind, key_id)
+        with self._key_lock(key):
+            with self._lock:
+                generation = self._generation
+                checked = self._checked.get(key)
+            manifest = self._load_manifest(kind, key_id)
+            if (
+                not force_check and manifest is not None and checked is not None and checked[0] == generation
+                and time.monotonic() - checked[1] < self.check_interval
+            ):
+                return self._bundle_file(kind, key_id, manifest)
+
+            members = self._scan_members(db, kind, key_id)
+            if not members:
+                return None
+            if (
+                manifest is None or manifest["members"] != members
+                or not os.path.exists(self._zip_path(kind, key_id, manifest["token"]))
+            ):
+                manifest = self._build(db, kind, key_id, members, manifest)
+            with self._lock:
+                self._checked[key] = (generation, time.monotonic())
+            return self._bundle_file(kind, key_id, manifest)
+
+    def open(self, db: Session, kind: str, key_id: int) -> Optional[Tuple[BundleFile, BinaryIO]]:
+        """返回整包文件及已打开的文件对象（打开后即使被其他 worker 替换删除也能完整读取）"""
+        bundle = self.get(db, kind, key_id)
+        for _ in range(2):
+            if bundle is None:
+                return None
+            try:
+                return bundle, open(bundle.path, "rb")
+            except FileNotFoundError:
+                # 其他 worker 刚刚重建并删除了旧文件
+                bundle = self.get(db, kind, key_id, force_check=True)
+        raise RuntimeError(f"bundle {kind}-{key_id} keeps changing")
+
+    def metrics(self) -> Dict[str, int]:
+        """重建次数、复制和重新读取的成员数"""
+        with self._lock:
+            return {"builds": self._builds, "copied_members": self._copied, "fetched_members": self._fetched}
+
+
+# 全局整包缓存实例
+bundle_cache = BundleCache(settings.BUNDLE_CACHE_DIR, settings.BUNDLE_CHECK_INTERVAL_SECONDS)
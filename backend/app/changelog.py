@@ -0,0 +1,91 @@
+from typing import List, Tuple
+
+from sqlalchemy import func, insert, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from .models import ChangeLogCounter, CursorRule, RuleChange
+
+# 变更类型
+CHANGE_CREATE = "create"
+CHANGE_UPDATE = "update"
+CHANGE_DELETE = "delete"
+
+# 计数行的主键
+_COUNTER_ID = 1
+# 补记存量规则时每批写入的行数
+_BACKFILL_BATCH = 5000
+
+
+def _next_seq(db: Session) -> int:
+    """分配下一个序号
+
+    先更新计数行再读取：计数行的行锁一直持有到事务提交，并发写入按序号顺序依次提交，
+    客户端按已同步的最大序号增量拉取时，不会漏掉序号较小但提交较晚的变更。
+    """
+    result = db.execute(
+        update(ChangeLogCounter).where(ChangeLogCounter.id == _COUNTER_ID).values(
+            last_seq=ChangeLogCounter.last_seq + 1
+        )
+    )
+    if result.rowcount == 0:
+        # 计数行由迁移或启动时的 backfill 创建，不在请求中创建（多个 worker 并发插入会主键冲突）
+        raise RuntimeError("change log counter row is missing, run init_change_log first")
+    return db.query(ChangeLogCounter.last_seq).filter(ChangeLogCounter.id == _COUNTER_ID).scalar()
+
+
+def record_change(db: Session, cursor_rule_id: int, action: str) -> None:
+    """在规则写入的事务中记录一条变更
+
+    在提交事务前调用，且应尽量靠近提交，以缩短计数行锁的持有时间。
+    """
+    db.add(RuleChange(seq=_next_seq(db), cursor_rule_id=cursor_rule_id, action=action))
+
+
+def latest_seq(db: Session) -> int:
+    """当前最大序号"""
+    return db.query(ChangeLogCounter.last_seq).filter(ChangeLogCounter.id == _COUNTER_ID).scalar() or 0
+
+
+def _ensure_counter(db: Session) -> None:
+    """创建计数行（迁移已创建时跳过）；多个 worker 同时启动时只有一个插入成功，其余忽略主键冲突"""
+    if db.get(ChangeLogCounter, _COUNTER_ID) is not None:
+        return
+    db.add(ChangeLogCounter(id=_COUNTER_ID, last_seq=0))
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+
+
+def backfill(db: Session) -> int:
+    """首次启用变更日志时为已有规则补记 create 变更（按规则ID顺序编号），返回补记条数
+
+    每个 worker 启动时都会调用：锁住计数行后检查，还没有分配过序号时才补记，
+    并发启动的 worker 依次拿到行锁，只有第一个补记。
+    """
+    _ensure_counter(db)
+    counter = db.query(ChangeLogCounter).filter(ChangeLogCounter.id == _COUNTER_ID).with_for_update().one()
+    if counter.last_seq > 0:
+        db.rollback()
+        return 0
+    rule_ids = [rule_id for rule_id, in db.query(CursorRule.id).order_by(CursorRule.id)]
+    for start in range(0, len(rule_ids), _BACKFILL_BATCH):
+        db.execute(insert(RuleChange), [
+            {"seq": start + offset + 1, "cursor_rule_id": rule_id, "action": CHANGE_CREATE}
+            for offset, rule_id in enumerate(rule_ids[start:start + _BACKFILL_BATCH])
+        ])
+    counter.last_seq = len(rule_ids)
+    db.commit()
+    return len(rule_ids)
+
+
+def changes_since(db: Session, since: int, limit: int) -> List[Tuple[int, int]]:
+    """序号大于 since 的变更，每条规则只取最后一次，按序号升序返回 [(规则ID, 序号)]
+
+    只扫描 since 之后的日志，耗时与变更数量成正比，与规则总数无关。
+    """
+    latest = db.query(
+        RuleChange.cursor_rule_id, func.max(RuleChange.seq).label("seq")
+    ).filter(RuleChange.seq > since).group_by(RuleChange.cursor_rule_id).subquery()
+    return db.query(latest.c.cursor_rule_id, latest.c.seq).order_by(latest.c.seq).limit(limit).all()
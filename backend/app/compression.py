@@ -0,0 +1,118 @@
+import threading
+import time
+import zlib
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, List, Optional, Tuple, TypeVar
+
+from .config import settings
+from .zipstream import ZIP_DEFLATED, ZIP_STORED
+
+T = TypeVar("T")
+
+
+class CompressionBusy(Exception):
+    """压缩队列已满，等待超时"""
+
+
+def compress_bytes(data: bytes, level: int, store_threshold: int) -> Tuple[bytes, int]:
+    """压缩为 ZIP 条目数据，返回 (数据, 压缩方法)
+
+    小于 store_threshold 字节的内容，或压缩后没有变小的内容，直接以 STORED 方式存储。
+    """
+    if len(data) < store_threshold:
+        return data, ZIP_STORED
+    compressor = zlib.compressobj(level, zlib.DEFLATED, -15)
+    compressed = compressor.compress(data) + compressor.flush()
+    if len(compressed) >= len(data):
+        return data, ZIP_STORED
+    return compressed, ZIP_DEFLATED
+
+
+class CompressionPool:
+    """有界压缩线程池
+
+    压缩任务交给固定数量的工作线程执行（zlib 压缩期间释放GIL），不占用处理请求的线程池，
+    大批量打包时其他请求仍能及时得到处理。排队任务数有上限：队列满时提交方最多等待
+    queue_timeout 秒，超时抛出 CompressionBusy（由路由转为 503），形成背压。
+    workers 为 0 时在调用线程内直接执行。
+    """
+
+    def __init__(self, workers: int, queue_limit: int, queue_timeout: float):
+        self.workers = workers
+        self.queue_limit = queue_limit
+        self.queue_timeout = queue_timeout
+        self._executor = ThreadPoolExecutor(workers, thread_name_prefix="compress") if workers > 0 else None
+        self._slots = threading.BoundedSemaphore(workers + queue_limit) if workers > 0 else None
+        self._lock = threading.Lock()
+        self._queued = 0
+        self._active = 0
+        self._max_depth = 0
+        self._completed = 0
+        self._rejected = 0
+        self._wait_seconds = 0.0
+        self._busy_seconds = 0.0
+
+    def _run(self, func: Callable[..., T], args: tuple, submitted: float) -> T:
+        started = time.perf_counter()
+        with self._lock:
+            self._queued -= 1
+            self._active += 1
+            self._wait_seconds += started - submitted
+        try:
+            return func(*args)
+        finally:
+            with self._lock:
+                self._active -= 1
+                self._completed += 1
+                self._busy_seconds += time.perf_counter() - started
+            self._slots.release()
+
+    def submit(self, func: Callable[..., T], *args) -> "Future[T]":
+        """提交任务；队列已满时等待空位，超时抛出 CompressionBusy"""
+        if self._executor is None:
+            future: Future = Future()
+            future.set_result(func(*args))
+            return future
+        if not self._slots.acquire(timeout=self.queue_timeout):
+            with self._lock:
+                self._rejected += 1
+            raise CompressionBusy()
+        with self._lock:
+            self._queued += 1
+            self._max_depth = max(self._max_depth, self._queued)
+        return self._executor.submit(self._run, func, args, time.perf_counter())
+
+    def map(self, func: Callable[..., T], items: Iterable) -> List[T]:
+        """对每个元素执行 func 并按顺序返回结果"""
+        return [future.result() for future in [self.submit(func, item) for item in items]]
+
+    def metrics(self) -> Dict[str, float]:
+        """队列深度等运行指标"""
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "queue_limit": self.queue_limit,
+                "queued": self._queued,
+                "active": self._active,
+                "max_queued": self._max_depth,
+                "completed": self._completed,
+                "rejected": self._rejected,
+                "avg_wait_ms": round(self._wait_seconds / self._completed * 1000, 3) if self._completed else 0.0,
+                "avg_busy_ms": round(self._busy_seconds / self._completed * 1000, 3) if self._completed else 0.0,
+            }
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+
+
+def create_compression_pool(workers: Optional[int] = None) -> CompressionPool:
+    return CompressionPool(
+        settings.COMPRESSION_WORKERS if workers is None else workers,
+        settings.COMPRESSION_QUEUE_LIMIT,
+        settings.COMPRESSION_QUEUE_TIMEOUT_SECONDS,
+    )
+
+
+# 全局压缩线程池实例
+compression_pool = create_compression_pool()
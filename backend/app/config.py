@@ -14,6 +14,12 @@ class Settings(BaseSettings):
     DATABASE_URL: str = "sqlite:///./cursor_rules.db"
     DATABASE_ECHO: bool = True
     
+    # 数据库并发配置：路由为同步函数，在线程池中执行数据库操作，
+    # 线程池大小应与连接池容量（POOL_SIZE + MAX_OVERFLOW）匹配
+    DB_POOL_SIZE: int = 20
+    DB_MAX_OVERFLOW: int = 10
+    DB_THREAD_POOL_SIZE: int = 30
+    
     # JWT配置
     SECRET_KEY: str = "your-super-secret-key-here-change-in-production"
     ALGORITHM: str = "HS256"
@@ -33,9 +39,72 @@ class Settings(BaseSettings):
     
     # 下载配置
     MAX_BATCH_DOWNLOAD: int = 50  # 最大批量下载文件数
+    ZIP_COMPRESS_LEVEL: int = 9  # 规则正文预压缩级别（每条规则只压缩一次）
+    ZIP_STORE_THRESHOLD_BYTES: int = 128  # 小于此字节数的正文不压缩，直接存储
+    COMPRESSION_WORKERS: int = 2  # 压缩线程数，0 为在请求线程内直接压缩
+    COMPRESSION_QUEUE_LIMIT: int = 64  # 最多排队的压缩任务数
+    COMPRESSION_QUEUE_TIMEOUT_SECONDS: float = 10.0  # 队列满时的最长等待，超时返回 503
+    BUNDLE_CACHE_DIR: str = "bundle_cache"  # 分类、标签整包文件的保存目录
+    BUNDLE_CHECK_INTERVAL_SECONDS: float = 30.0  # 整包最迟多久重新校验一次（覆盖其他 worker 的修改）
+    DOWNLOAD_CACHE_MAX_AGE_SECONDS: int = 60  # 下载响应可被浏览器和 nginx 缓存的秒数，过期后凭 ETag 重新校验
+    TAR_GZIP_LEVEL: int = 6  # tar.gz 下载的压缩级别
+    TAR_ZSTD_LEVEL: int = 3  # tar.zst 下载的压缩级别（需安装 zstandard）
     
-    # 速率限制配置
+    # 速率限制配置（令牌桶：登录用户按用户，未登录按IP）
+    RATE_LIMIT_ENABLED: bool = True
     RATE_LIMIT_PER_MINUTE: int = 60
+    RATE_LIMIT_BACKEND: str = "memory"  # memory（进程内）/redis（多 worker 共享限额）
+    RATE_LIMIT_REDIS_URL: str = "redis://localhost:6379/0"
+    RATE_LIMIT_SHARDS: int = 64  # 进程内存储的分片数
+    # 各路由每次请求消耗的令牌数（"方法 路径前缀" 或 "路径前缀"，最长前缀优先，未配置的为1，0为不限流）
+    RATE_LIMIT_ROUTE_COSTS: dict[str, int] = {
+        "POST /api/download/batch": 10,
+        "GET /api/download/single": 2,
+        "GET /api/download/category": 10,
+        "GET /api/download/tag": 10,
+        "POST /api/auth/login": 5,
+        "POST /api/auth/register": 5,
+        "/health": 0,
+        "/docs": 0,
+        "/redoc": 0,
+        "/openapi.json": 0,
+    }
+    
+    # 全文检索配置
+    SEARCH_BACKEND: str = "auto"  # auto/mysql/sqlite/memory，auto按数据库方言选择
+    SEARCH_NGRAM_TOKEN_SIZE: int = 2  # MySQL ngram_token_size，短于此长度的词改用 LIKE 匹配
+    SEARCH_MEMORY_REFRESH_SECONDS: int = 300  # 进程内索引全量重建间隔（同步其他 worker 的写入）
+    
+    # 分页总数缓存配置
+    COUNT_CACHE_TTL_SECONDS: int = 60
+    COUNT_CACHE_MAX_ENTRIES: int = 1024
+    
+    # 分类标签缓存配置
+    TAXONOMY_CACHE_TTL_SECONDS: int = 300
+    
+    # 标签索引配置
+    TAG_INDEX_REFRESH_SECONDS: int = 300  # 全量重建间隔（同步其他 worker 的写入）
+    TAG_FILTER_MAX_IN_IDS: int = 2000  # 命中数不超过此值时按ID列表查询，否则回退为SQL半连接
+    
+    # 分面统计缓存配置
+    FACET_CACHE_TTL_SECONDS: int = 60
+    FACET_CACHE_MAX_ENTRIES: int = 512
+    
+    # 浏览量、下载量写后聚合配置
+    COUNTER_FLUSH_INTERVAL_SECONDS: float = 5.0  # 增量批量写入数据库的间隔
+    
+    # 独立访客统计配置（HyperLogLog）
+    UNIQUE_VIEW_PRECISION: int = 10  # 每条规则 2^10 个寄存器（1KB），标准误差约3.3%
+    UNIQUE_VIEW_CHECKPOINT_SECONDS: float = 60.0  # 草图写回数据库的间隔
+    
+    # 平台统计配置
+    STATS_MAX_STALENESS_SECONDS: float = 60.0  # 统计快照全量重算的间隔，即跨 worker 数据的最大滞后
+    
+    # 热度排行配置
+    TRENDING_HALF_LIFE_HOURS: float = 24.0  # 热度半衰期
+    TRENDING_WINDOW_HOURS: int = 72  # 只统计最近这么多小时的活动（每小时一个桶）
+    TRENDING_TOP_K: int = 200  # 每个分类保留的榜单长度
+    TRENDING_SWEEP_SECONDS: float = 300.0  # 淘汰过期桶的间隔
     
     class Config:
         env_file = ".env"
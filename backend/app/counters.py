@@ -0,0 +1,134 @@
+import asyncio
+import logging
+import threading
+from collections import defaultdict
+from typing import Dict, Optional
+
+from sqlalchemy import func
+
+from .config import settings
+from .database import SessionLocal
+from .models import CursorRule
+
+logger = logging.getLogger(__name__)
+
+# 由聚合器累加的计数字段
+COUNTER_FIELDS = ("view_count", "download_count")
+
+# 单条 UPDATE 中 IN 列表的最大ID数
+_FLUSH_CHUNK_SIZE = 500
+
+
+def _empty() -> Dict[str, Dict[int, int]]:
+    return {field: defaultdict(int) for field in COUNTER_FIELDS}
+
+
+class CounterAggregator:
+    """浏览量、下载量的写后聚合器
+
+    请求只在内存中累加增量，后台任务定期把增量合并为
+    UPDATE cursor_rules SET x = x + n WHERE id IN (...) 批量写入（相同增量的规则共用一条语句），
+    避免热门规则上的行锁竞争和读改写丢失更新。应用关闭时写入剩余增量。
+    读取计数时用 pending 合并尚未落库的增量。
+    """
+
+    def __init__(self, flush_interval: float):
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._pending = _empty()
+        self._inflight = _empty()
+        self._task: Optional[asyncio.Task] = None
+
+    def increment(self, field: str, rule_id: int, amount: int = 1) -> None:
+        """累加计数增量"""
+        with self._lock:
+            self._pending[field][rule_id] += amount
+
+    def pending(self, field: str, rule_id: int) -> int:
+        """尚未落库的增量（含正在写入的部分）"""
+        with self._lock:
+            return self._pending[field].get(rule_id, 0) + self._inflight[field].get(rule_id, 0)
+
+    def pending_total(self, field: str) -> int:
+        """所有规则尚未落库的增量之和"""
+        with self._lock:
+            return sum(self._pending[field].values()) + sum(self._inflight[field].values())
+
+    def merged(self, field: str, rule_id: int, persisted: Optional[int]) -> int:
+        """已落库值与未落库增量之和"""
+        return (persisted or 0) + self.pending(field, rule_id)
+
+    def discard(self, rule_id: int) -> None:
+        """丢弃已删除规则尚未落库的增量"""
+        with self._lock:
+            for deltas in self._pending.values():
+                deltas.pop(rule_id, None)
+
+    def flush(self) -> int:
+        """把当前增量写入数据库，返回写入的规则计数项数；失败时增量退回缓冲区"""
+        with self._flush_lock:
+            with self._lock:
+                batch, self._pending = self._pending, _empty()
+                self._inflight = batch
+            entries = sum(len(deltas) for deltas in batch.values())
+            if not entries:
+                return 0
+
+            db = SessionLocal()
+            try:
+                for field, deltas in batch.items():
+                    column = getattr(CursorRule, field)
+                    by_amount = defaultdict(list)
+                    for rule_id, amount in deltas.items():
+                        by_amount[amount].append(rule_id)
+                    for amount, rule_ids in by_amount.items():
+                        for start in range(0, len(rule_ids), _FLUSH_CHUNK_SIZE):
+                            db.query(CursorRule).filter(
+                                CursorRule.id.in_(rule_ids[start:start + _FLUSH_CHUNK_SIZE])
+                            ).update(
+                                {column: func.coalesce(column, 0) + amount}, synchronize_session=False
+                            )
+                db.commit()
+            except Exception:
+                db.rollback()
+                with self._lock:
+                    for field, deltas in batch.items():
+                        for rule_id, amount in deltas.items():
+                            self._pending[field][rule_id] += amount
+                    self._inflight = _empty()
+                raise
+            finally:
+                db.close()
+
+            with self._lock:
+                self._inflight = _empty()
+            return entries
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await asyncio.to_thread(self.flush)
+            except Exception:
+                logger.exception("计数增量写入失败，下个周期重试")
+
+    def start(self) -> None:
+        """启动后台定期写入任务（需在事件循环中调用）"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """停止后台任务并写入剩余增量"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await asyncio.to_thread(self.flush)
+
+
+# 全局计数聚合器实例
+counter_aggregator = CounterAggregator(settings.COUNTER_FLUSH_INTERVAL_SECONDS)
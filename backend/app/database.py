@@ -2,15 +2,21 @@ from sqlalchemy import create_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, Session
 from typing import Generator
+import os
 
 from .config import settings
 
+# Alembic 迁移脚本目录
+ALEMBIC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "alembic")
+
 # 创建数据库引擎
 engine = create_engine(
     settings.DATABASE_URL,
     echo=settings.DATABASE_ECHO,
     pool_pre_ping=True,
     pool_recycle=300,
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW,
 )
 
 # 创建会话工厂
@@ -21,7 +27,11 @@ Base = declarative_base()
 
 
 def get_db() -> Generator[Session, None, None]:
-    """获取数据库会话的依赖函数"""
+    """获取数据库会话的依赖函数
+
+    使用数据库会话的路由均声明为同步函数，由FastAPI放到线程池执行，
+    避免阻塞事件循环；线程池大小见 configure_thread_pool。
+    """
     db = SessionLocal()
     try:
         yield db
@@ -29,6 +39,87 @@ def get_db() -> Generator[Session, None, None]:
         db.close()
 
 
-def create_tables():
-    """创建所有数据库表"""
-    Base.metadata.create_all(bind=engine) 
\ No newline at end of file
+def configure_thread_pool():
+    """设置同步路由线程池大小（需在事件循环中调用）"""
+    from anyio import to_thread
+
+    to_thread.current_default_thread_limiter().total_tokens = settings.DB_THREAD_POOL_SIZE
+
+
+def alembic_config():
+    """Alembic 配置（不读取 alembic.ini，避免覆盖应用的日志配置；数据库地址由 env.py 取自应用配置）"""
+    from alembic.config import Config
+
+    config = Config()
+    config.set_main_option("script_location", ALEMBIC_DIR)
+    return config
+
+
+def upgrade_database():
+    """执行迁移到最新版本（开发、测试和种子脚本使用；部署时由 docker-entrypoint.sh 执行）"""
+    from alembic import command
+
+    command.upgrade(alembic_config(), "head")
+
+
+def check_schema():
+    """确认数据库已迁移到最新版本
+
+    表结构只由 Alembic 迁移维护（create_all 不会修改已有的表，新增的列和索引到不了已部署的库），
+    启动时版本不一致直接报错，而不是在查询新列时才失败。
+    """
+    from alembic.runtime.migration import MigrationContext
+    from alembic.script import ScriptDirectory
+
+    heads = set(ScriptDirectory.from_config(alembic_config()).get_heads())
+    with engine.connect() as connection:
+        current = set(MigrationContext.configure(connection).get_current_heads())
+    if current != heads:
+        raise RuntimeError(
+            f"database schema is at {sorted(current) or 'no revision'}, expected {sorted(heads)}; "
+            "run `alembic upgrade head` first"
+        )
+
+
+def init_search_index():
+    """初始化全文检索索引"""
+    from .search import search_engine
+
+    db = SessionLocal()
+    try:
+        search_engine.init(db)
+    finally:
+        db.close()
+
+
+def init_tag_index():
+    """构建标签倒排索引"""
+    from .tag_index import tag_index
+
+    db = SessionLocal()
+    try:
+        tag_index.load(db)
+    finally:
+        db.close()
+
+
+def init_change_log():
+    """首次启用变更日志时为已有规则补记变更"""
+    from . import changelog
+
+    db = SessionLocal()
+    try:
+        changelog.backfill(db)
+    finally:
+        db.close()
+
+
+def init_trending():
+    """从投票记录恢复热度排行"""
+    from .trending import trending
+
+    db = SessionLocal()
+    try:
+        trending.load(db)
+    finally:
+        db.close()
@@ -0,0 +1,71 @@
+from typing import Dict, List, Optional, Sequence
+
+from sqlalchemy.orm import Session
+
+from .config import settings
+from .pagination import CountCache
+from .schemas import FacetCount
+from .tag_index import TagExpr, ids_bitmap, tag_index
+from .taxonomy import taxonomy_cache
+
+# 支持的分面字段
+FACET_FIELDS = ("category", "tag")
+
+# 分面统计缓存（按筛选条件签名缓存，规则、分类、标签变更时整体失效）
+facet_cache = CountCache(settings.FACET_CACHE_TTL_SECONDS, settings.FACET_CACHE_MAX_ENTRIES)
+
+
+def parse_facet_fields(facets: Optional[str]) -> List[str]:
+    """解析 facets 参数，包含不支持的字段时抛出 ValueError"""
+    fields = list(dict.fromkeys(field.strip() for field in (facets or "").split(",") if field.strip()))
+    unknown = [field for field in fields if field not in FACET_FIELDS]
+    if unknown:
+        raise ValueError(", ".join(unknown))
+    return fields
+
+
+def compute_facets(
+    db: Session,
+    fields: Sequence[str],
+    tag_filter: Optional[TagExpr] = None,
+    keyword: Optional[str] = None,
+    ranked_ids: Optional[Sequence[int]] = None,
+    category_id: Optional[int] = None,
+    author_id: Optional[int] = None,
+    trending_ids: Optional[Sequence[int]] = None,
+) -> Dict[str, List[FacetCount]]:
+    """计算筛选结果的分面统计，每个分面按数量降序排列
+
+    计数来自标签索引的位图交集，不访问规则表；名称来自分类标签缓存。
+    trending_ids 为热度榜单时只统计榜单内的规则，与列表结果一致。
+    """
+    signature = (tuple(fields), tag_filter, keyword, category_id, author_id)
+    if trending_ids is not None:
+        signature += (tuple(trending_ids),)
+    cached = facet_cache.get(signature)
+    if cached is not None:
+        return cached
+
+    restrict = ids_bitmap(ranked_ids) if ranked_ids is not None else None
+    if trending_ids is not None:
+        trending_bits = ids_bitmap(trending_ids)
+        restrict = trending_bits if restrict is None else restrict & trending_bits
+    counts = tag_index.facet_counts(db, fields, tag_filter, category_id, author_id, restrict)
+    names = {}
+    if "category" in counts:
+        categories = taxonomy_cache.categories(db, counts["category"])
+        names["category"] = {cid: category.name for cid, category in categories.items()}
+    if "tag" in counts:
+        tags = taxonomy_cache.tags(db, counts["tag"])
+        names["tag"] = {tid: tag.name for tid, tag in tags.items()}
+
+    facets = {}
+    for field in fields:
+        field_counts = counts.get(field, {})
+        facets[field] = [
+            FacetCount(id=value_id, name=names[field][value_id], count=count)
+            for value_id, count in sorted(field_counts.items(), key=lambda item: (-item[1], item[0]))
+            if value_id in names[field]
+        ]
+    facet_cache.set(signature, facets)
+    return facets
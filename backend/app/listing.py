@@ -0,0 +1,94 @@
+from collections import defaultdict
+from typing import Dict, List, Sequence
+
+from sqlalchemy.orm import Session
+
+from .counters import counter_aggregator
+from .models import CursorRule, CursorRuleTag, User
+from .schemas import CursorRuleListResponse, UserResponse
+from .taxonomy import taxonomy_cache
+from .unique_views import unique_views
+
+# 排序方式 -> 排序列，每种方式都有全局和按分类的索引支撑
+SORT_MODES = {
+    "newest": "created_at",
+    "most_liked": "likes_count",
+    "most_downloaded": "download_count",
+    "most_viewed": "view_count",
+    "net_score": "net_score",
+}
+
+# 兼容旧的按字段名排序参数
+SORT_ALIASES = {
+    "created_at": "newest",
+    "likes_count": "most_liked",
+    "download_count": "most_downloaded",
+    "view_count": "most_viewed",
+}
+
+# 列表页需要的规则字段
+LIST_COLUMNS = (
+    CursorRule.id,
+    CursorRule.title,
+    CursorRule.filename,
+    CursorRule.description,
+    CursorRule.category_id,
+    CursorRule.author_id,
+    CursorRule.likes_count,
+    CursorRule.dislikes_count,
+    CursorRule.download_count,
+    CursorRule.view_count,
+    CursorRule.created_at,
+)
+
+
+def hydrate_rules(db: Session, rule_ids: Sequence[int]) -> List[dict]:
+    """按ID批量组装列表项（两阶段查询的第二阶段）
+
+    第一阶段只查出当前页的规则ID；这里用固定次数的 IN 查询补全数据：
+    规则摘要字段、作者、标签关联各一次，分类和标签详情来自内存缓存。
+    返回结果保持 rule_ids 的顺序。
+    """
+    if not rule_ids:
+        return []
+
+    # 只取列表字段，不读取 content/example 大字段
+    rules = {rule.id: rule for rule in db.query(*LIST_COLUMNS).filter(CursorRule.id.in_(rule_ids))}
+
+    author_ids = {rule.author_id for rule in rules.values()}
+    authors: Dict[int, UserResponse] = {
+        user.id: UserResponse.from_orm(user)
+        for user in db.query(User).filter(User.id.in_(author_ids))
+    }
+
+    rule_tag_ids: Dict[int, List[int]] = defaultdict(list)
+    for cursor_rule_id, tag_id in db.query(CursorRuleTag.cursor_rule_id, CursorRuleTag.tag_id).filter(
+        CursorRuleTag.cursor_rule_id.in_(rule_ids)
+    ).order_by(CursorRuleTag.id):
+        rule_tag_ids[cursor_rule_id].append(tag_id)
+
+    unique_view_counts = unique_views.counts(db, rules)
+    categories = taxonomy_cache.categories(db, {rule.category_id for rule in rules.values()})
+    tags = taxonomy_cache.tags(db, {tid for tids in rule_tag_ids.values() for tid in tids})
+
+    items = []
+    for rule_id in rule_ids:
+        rule = rules.get(rule_id)
+        if rule is None:
+            continue
+        items.append(CursorRuleListResponse(
+            id=rule.id,
+            title=rule.title,
+            filename=rule.filename,
+            description=rule.description,
+            likes_count=rule.likes_count or 0,
+            dislikes_count=rule.dislikes_count or 0,
+            download_count=counter_aggregator.merged("download_count", rule.id, rule.download_count),
+            view_count=counter_aggregator.merged("view_count", rule.id, rule.view_count),
+            unique_view_count=unique_view_counts[rule.id],
+            created_at=rule.created_at,
+            author=authors.get(rule.author_id),
+            category=categories.get(rule.category_id),
+            tags=[tags[tid] for tid in rule_tag_ids[rule.id] if tid in tags],
+        ).dict())
+    return items
@@ -5,14 +5,48 @@ from contextlib import asynccontextmanager
 import time
 
 from .config import settings
-from .database import create_tables
+from .database import (
+    check_schema, init_search_index, init_tag_index, init_trending, init_change_log, configure_thread_pool
+)
+from .counters import counter_aggregator
+from .unique_views import unique_views
+from .trending import trending
+from .stats import site_stats
+from .compression import compression_pool, CompressionBusy
+from .rate_limit import rate_limiter
+from .auth import verify_token
+from .routers.cursor_rules import get_client_ip
 
 # 应用启动时执行
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    # 启动时创建数据库表
-    create_tables()
+    # 设置同步路由线程池大小
+    configure_thread_pool()
+    # 确认数据库已迁移到最新版本（迁移由 docker-entrypoint.sh 在启动前执行）
+    check_schema()
+    # 初始化全文检索索引
+    init_search_index()
+    # 构建标签倒排索引
+    init_tag_index()
+    # 恢复热度排行
+    init_trending()
+    # 补记变更日志
+    init_change_log()
+    # 启动浏览量、下载量的定期批量写入
+    counter_aggregator.start()
+    # 启动独立访客草图的定期写回
+    unique_views.start()
+    # 启动热度过期桶的定期淘汰
+    trending.start()
+    # 启动平台统计的定期全量重算
+    site_stats.start()
     yield
+    # 关闭时写入剩余的计数增量和草图
+    await counter_aggregator.stop()
+    await unique_views.stop()
+    await trending.stop()
+    await site_stats.stop()
+    compression_pool.shutdown()
 
 
 # 创建FastAPI应用
@@ -23,6 +57,34 @@ app = FastAPI(
     lifespan=lifespan,
 )
 
+# 添加限流中间件（在CORS中间件之内，429响应同样带CORS头）
+@app.middleware("http")
+async def rate_limit(request: Request, call_next):
+    cost = rate_limiter.cost(request.method, request.url.path) if settings.RATE_LIMIT_ENABLED else 0
+    if cost <= 0:
+        return await call_next(request)
+    
+    # 登录用户按用户限流，未登录按客户端IP限流
+    key = f"ip:{get_client_ip(request)}"
+    authorization = request.headers.get("Authorization", "")
+    if authorization.lower().startswith("bearer "):
+        payload = verify_token(authorization[7:].strip())
+        if payload and payload.get("sub"):
+            key = f"user:{payload['sub']}"
+    
+    allowed, remaining = await rate_limiter.acquire(key, cost)
+    headers = {
+        "X-RateLimit-Limit": str(rate_limiter.capacity),
+        "X-RateLimit-Remaining": str(int(remaining)),
+    }
+    if not allowed:
+        headers["Retry-After"] = str(rate_limiter.retry_after(cost, remaining))
+        return JSONResponse(status_code=429, content={"detail": "Rate limit exceeded"}, headers=headers)
+    response = await call_next(request)
+    response.headers.update(headers)
+    return response
+
+
 # 配置CORS
 app.add_middleware(
     CORSMiddleware,
@@ -43,6 +105,16 @@ async def add_process_time_header(request: Request, call_next):
     return response
 
 
+# 压缩队列已满（背压）
+@app.exception_handler(CompressionBusy)
+async def compression_busy_handler(request: Request, exc: CompressionBusy):
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Server is busy compressing files, please retry"},
+        headers={"Retry-After": "5"}
+    )
+
+
 # 全局异常处理
 @app.exception_handler(Exception)
 async def global_exception_handler(request: Request, exc: Exception):
@@ -79,10 +151,11 @@ async def root():
 
 
 # 导入并注册路由
-from .routers import auth, cursor_rules, categories, tags, download
+from .routers import auth, cursor_rules, categories, tags, download, changes
 
 app.include_router(auth.router, prefix="/api/auth", tags=["认证"])
 app.include_router(cursor_rules.router, prefix="/api/cursor-rules", tags=["Cursor Rules"])
 app.include_router(categories.router, prefix="/api/categories", tags=["分类"])
 app.include_router(tags.router, prefix="/api/tags", tags=["标签"])
-app.include_router(download.router, prefix="/api/download", tags=["下载"]) 
\ No newline at end of file
+app.include_router(download.router, prefix="/api/download", tags=["下载"])
+app.include_router(changes.router, prefix="/api/changes", tags=["增量同步"])
\ No newline at end of file
@@ -1,5 +1,8 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Enum, UniqueConstraint
-from sqlalchemy.orm import relationship
+from sqlalchemy import (
+    Column, Integer, SmallInteger, String, Text, DateTime, ForeignKey, Enum, UniqueConstraint, Index, Computed,
+    LargeBinary, BigInteger
+)
+from sqlalchemy.orm import relationship, deferred
 from sqlalchemy.sql import func
 from enum import Enum as PyEnum
 
@@ -66,13 +69,16 @@ class CursorRule(Base):
     filename = Column(String(100), nullable=False)
     category_id = Column(Integer, ForeignKey("categories.id"), nullable=False)
     description = Column(Text)
-    content = Column(Text, nullable=False)
-    example = Column(Text)
+    # 正文和示例体积大，默认延迟加载，需要时用 undefer_group("body") 显式加载
+    content = deferred(Column(Text, nullable=False), group="body")
+    example = deferred(Column(Text), group="body")
     author_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     likes_count = Column(Integer, default=0)
     dislikes_count = Column(Integer, default=0)
     download_count = Column(Integer, default=0)
     view_count = Column(Integer, default=0)
+    # 净好评数（虚拟生成列，由数据库根据点赞点踩数计算，可建索引）
+    net_score = Column(Integer, Computed("likes_count - dislikes_count", persisted=False))
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
     
@@ -81,6 +87,22 @@ class CursorRule(Base):
     author = relationship("User", back_populates="cursor_rules")
     tags = relationship("Tag", secondary="cursor_rules_tags", back_populates="cursor_rules")
     votes = relationship("Vote", back_populates="cursor_rule", cascade="all, delete-orphan")
+    
+    # 列表、筛选和统计查询使用的索引（InnoDB 二级索引隐含主键，可直接支持 (排序列, id) 排序）
+    # 每种排序方式（见 listing.SORT_MODES）都有全局和按分类两个索引，Top-N 查询只需顺序读取索引
+    __table_args__ = (
+        Index("ix_cursor_rules_created_at", "created_at"),
+        Index("ix_cursor_rules_category_created", "category_id", "created_at"),
+        Index("ix_cursor_rules_author_created", "author_id", "created_at"),
+        Index("ix_cursor_rules_download_count", "download_count"),
+        Index("ix_cursor_rules_category_downloads", "category_id", "download_count"),
+        Index("ix_cursor_rules_likes_count", "likes_count"),
+        Index("ix_cursor_rules_category_likes", "category_id", "likes_count"),
+        Index("ix_cursor_rules_view_count", "view_count"),
+        Index("ix_cursor_rules_category_views", "category_id", "view_count"),
+        Index("ix_cursor_rules_net_score", "net_score"),
+        Index("ix_cursor_rules_category_net_score", "category_id", "net_score"),
+    )
 
 
 class CursorRuleTag(Base):
@@ -91,8 +113,11 @@ class CursorRuleTag(Base):
     cursor_rule_id = Column(Integer, ForeignKey("cursor_rules.id", ondelete="CASCADE"), nullable=False)
     tag_id = Column(Integer, ForeignKey("tags.id"), nullable=False)
     
-    # 唯一约束
-    __table_args__ = (UniqueConstraint('cursor_rule_id', 'tag_id', name='unique_rule_tag'),)
+    # 唯一约束；按标签查规则使用 (tag_id, cursor_rule_id) 覆盖索引
+    __table_args__ = (
+        UniqueConstraint('cursor_rule_id', 'tag_id', name='unique_rule_tag'),
+        Index("ix_cursor_rules_tags_tag_rule", "tag_id", "cursor_rule_id"),
+    )
 
 
 class Vote(Base):
@@ -114,4 +139,46 @@ class Vote(Base):
     __table_args__ = (
         UniqueConstraint('cursor_rule_id', 'user_id', name='unique_user_rule'),
         UniqueConstraint('cursor_rule_id', 'ip_address', name='unique_ip_rule'),
-    )
\ No newline at end of file
+        Index("ix_votes_rule_type", "cursor_rule_id", "vote_type"),
+    )
+
+
+class RuleViewSketch(Base):
+    """规则独立访客 HyperLogLog 草图表（寄存器经 zlib 压缩存储，见 unique_views.py）"""
+    __tablename__ = "rule_view_sketches"
+    
+    cursor_rule_id = Column(Integer, ForeignKey("cursor_rules.id", ondelete="CASCADE"), primary_key=True)
+    precision = Column(SmallInteger, nullable=False)
+    registers = Column(LargeBinary, nullable=False)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+
+class RuleContentBlob(Base):
+    """规则正文的预压缩数据表（ZIP 条目数据和 CRC32，打包下载时直接拼接，见 rule_blobs.py）"""
+    __tablename__ = "rule_content_blobs"
+    
+    cursor_rule_id = Column(Integer, ForeignKey("cursor_rules.id", ondelete="CASCADE"), primary_key=True)
+    method = Column(SmallInteger, nullable=False, server_default="8")  # ZIP 压缩方法：8 deflate，0 不压缩
+    crc32 = Column(BigInteger, nullable=False)
+    size = Column(Integer, nullable=False)  # 原文（UTF-8）字节数
+    compressed = Column(LargeBinary(length=2 ** 24), nullable=False)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+
+class RuleChange(Base):
+    """规则变更日志表（序号单调递增，删除记录即墓碑，见 changelog.py）"""
+    __tablename__ = "rule_changes"
+    
+    seq = Column(BigInteger, primary_key=True, autoincrement=False)
+    # 不设外键：规则删除后仍需保留其墓碑
+    cursor_rule_id = Column(Integer, nullable=False)
+    action = Column(String(10), nullable=False)  # create / update / delete
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+class ChangeLogCounter(Base):
+    """变更日志序号计数（单行，分配序号时的行锁保证序号顺序与提交顺序一致）"""
+    __tablename__ = "change_log_counter"
+    
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    last_seq = Column(BigInteger, nullable=False, default=0)
@@ -0,0 +1,219 @@
+import base64
+import binascii
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, List, Optional, Tuple
+
+from fastapi import HTTPException, status
+from sqlalchemy import String, and_, asc, desc, literal, or_, text, type_coerce
+from sqlalchemy.orm import Query, Session
+
+from .config import settings
+from .models import CursorRule
+
+
+def encode_cursor(payload: dict) -> str:
+    """编码游标（URL安全的base64 JSON）"""
+    raw = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode("ascii")
+
+
+def decode_cursor(cursor: str) -> dict:
+    """解码游标"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except (ValueError, binascii.Error, UnicodeError):
+        payload = None
+    if (
+        not isinstance(payload, dict) or not isinstance(payload.get("id"), int)
+        or not isinstance(payload.get("value"), (int, float, str))
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
+    return payload
+
+
+def cursor_value(value: Any) -> Any:
+    """排序值写入游标：数值原样保存，时间等类型保存数据库返回的原始文本"""
+    if isinstance(value, (int, float, str)):
+        return value
+    return str(value)
+
+
+def keyset_filter(order_expr, descending: bool, value: Any, last_id: int):
+    """构造位于 (锚点排序值, 锚点ID) 之后的行的过滤条件"""
+    # 文本按原样绑定，不经过 DateTime 等类型的格式化，与数据库中的取值逐字比较
+    anchor = literal(value, String) if isinstance(value, str) else literal(value)
+    if descending:
+        return or_(order_expr < anchor, and_(order_expr == anchor, CursorRule.id < last_id))
+    return or_(order_expr > anchor, and_(order_expr == anchor, CursorRule.id > last_id))
+
+
+def paginate(
+    query: Query,
+    order_expr,
+    descending: bool,
+    scope: str,
+    page: int,
+    size: int,
+    cursor: Optional[str] = None,
+) -> Tuple[List[Any], Optional[str]]:
+    """分页查询，返回 (当前页数据, 下一页游标)
+
+    传入游标时走 keyset 分页：按 (排序值, id) 定位，深分页与首页代价相同；
+    否则按页码偏移分页，保持兼容。scope 标识排序方式，游标不能跨排序方式使用。
+    游标保存上一页最后一行的排序值，该行被删除或排序值（点赞数等）变化后，分页边界不变。
+    """
+    direction = desc if descending else asc
+    # 排序值按原始类型取出（不做 DateTime 转换），写入游标后原样用于比较
+    query = query.add_columns(type_coerce(order_expr, String).label("sort_value"))
+    query = query.order_by(direction(order_expr), direction(CursorRule.id))
+
+    if cursor:
+        payload = decode_cursor(cursor)
+        if payload.get("scope") != scope:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Cursor does not match current sort"
+            )
+        query = query.filter(keyset_filter(order_expr, descending, payload["value"], payload["id"]))
+    else:
+        query = query.offset((page - 1) * size)
+
+    # 多取一行用于判断是否还有下一页
+    items = query.limit(size + 1).all()
+    next_cursor = None
+    if len(items) > size:
+        items = items[:size]
+        last = items[-1]
+        next_cursor = encode_cursor({"scope": scope, "id": last.id, "value": cursor_value(last.sort_value)})
+    return items, next_cursor
+
+
+def paginate_ids(
+    ids: List[int],
+    scope: str,
+    page: int,
+    size: int,
+    cursor: Optional[str] = None,
+) -> Tuple[List[int], Optional[str]]:
+    """对进程内已排好序的ID列表（检索相关度、热度榜单）分页，返回 (当前页ID, 下一页游标)
+
+    排序值没有数据库列可比较，游标保存上一页最后一条的ID和名次：
+    该ID仍在列表中时从它之后继续，已被删除或移出列表时从原名次继续。
+    """
+    if cursor:
+        payload = decode_cursor(cursor)
+        if payload.get("scope") != scope or not isinstance(payload["value"], int):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Cursor does not match current sort"
+            )
+        try:
+            start = ids.index(payload["id"]) + 1
+        except ValueError:
+            # 锚点已移出列表，其后的条目前移一位，原名次上就是下一条
+            start = payload["value"]
+    else:
+        start = (page - 1) * size
+
+    page_ids = ids[start:start + size]
+    next_cursor = None
+    if page_ids and start + size < len(ids):
+        next_cursor = encode_cursor({"scope": scope, "id": page_ids[-1], "value": start + size - 1})
+    return page_ids, next_cursor
+
+
+class CountCache:
+    """统计结果缓存（精确总数、分面计数）
+
+    按筛选条件签名缓存 count 结果，规则写操作时整体失效；
+    TTL 兜底多进程部署下其他 worker 的写入。
+    """
+
+    def __init__(self, ttl: int, max_entries: int):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, Tuple[float, int]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, signature: Hashable) -> Optional[int]:
+        with self._lock:
+            entry = self._entries.get(signature)
+            if entry is None:
+                return None
+            expires_at, total = entry
+            if expires_at < time.monotonic():
+                del self._entries[signature]
+                return None
+            self._entries.move_to_end(signature)
+            return total
+
+    def set(self, signature: Hashable, total: int) -> None:
+        with self._lock:
+            self._entries[signature] = (time.monotonic() + self.ttl, total)
+            self._entries.move_to_end(signature)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self) -> None:
+        """规则写操作后清空缓存"""
+        with self._lock:
+            self._entries.clear()
+
+
+# 全局总数缓存实例
+count_cache = CountCache(settings.COUNT_CACHE_TTL_SECONDS, settings.COUNT_CACHE_MAX_ENTRIES)
+
+
+def estimate_table_rows(db: Session, table_name: str) -> Optional[int]:
+    """从表统计信息读取估算行数，不可用时返回None"""
+    dialect = db.get_bind().dialect.name
+    try:
+        if dialect == "mysql":
+            return db.execute(text(
+                "SELECT table_rows FROM information_schema.tables "
+                "WHERE table_schema = DATABASE() AND table_name = :table_name"
+            ), {"table_name": table_name}).scalar()
+        if dialect == "sqlite":
+            # 需要先执行过 ANALYZE；stat 的第一个数即表（或索引）行数
+            stat = db.execute(text(
+                "SELECT stat FROM sqlite_stat1 WHERE tbl = :table_name LIMIT 1"
+            ), {"table_name": table_name}).scalar()
+            return int(stat.split()[0]) if stat else None
+    except Exception:
+        db.rollback()
+    return None
+
+
+def count_total(
+    db: Session,
+    query: Query,
+    signature: Hashable,
+    with_total: bool = True,
+    estimate: bool = False,
+) -> Tuple[Optional[int], bool]:
+    """计算分页总数，返回 (总数, 是否为估算值)
+
+    - with_total=False：不计数（无限滚动客户端）
+    - estimate=True：从表统计信息估算，仅适用于无筛选条件的列表
+    - 其他情况：精确计数，按筛选条件签名缓存
+    """
+    if not with_total:
+        return None, False
+
+    if estimate:
+        estimated = estimate_table_rows(db, CursorRule.__tablename__)
+        if estimated is not None:
+            return estimated, True
+
+    total = count_cache.get(signature)
+    if total is None:
+        total = query.count()
+        count_cache.set(signature, total)
+    return total, False
@@ -0,0 +1,160 @@
+import asyncio
+import logging
+import math
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from typing import Dict, Tuple
+
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+# 每次请求顺带检查的空闲键数（惰性淘汰，摊还 O(1)）
+_EVICT_PER_CALL = 2
+
+
+class MemoryBucketStore:
+    """进程内令牌桶存储
+
+    按键哈希分片，每个分片一把锁和一个按最近访问排序的 OrderedDict。
+    空闲超过“桶回满时间”的键与不存在的键等价，每次访问时从分片头部顺带淘汰，无需后台清理。
+    只在单个进程内生效，多 worker 部署时每个 worker 各自限流。
+    """
+
+    blocking = False
+
+    def __init__(self, shards: int = 64):
+        self._shards = [(threading.Lock(), OrderedDict()) for _ in range(shards)]
+
+    def take(self, key: str, cost: int, capacity: int, rate: float) -> Tuple[bool, float]:
+        """从桶中取出 cost 个令牌，返回 (是否放行, 剩余令牌数)"""
+        now = time.monotonic()
+        lock, buckets = self._shards[zlib.crc32(key.encode()) % len(self._shards)]
+        with lock:
+            state = buckets.pop(key, None)
+            tokens = capacity if state is None else min(capacity, state[0] + (now - state[1]) * rate)
+
+            idle = capacity / rate
+            for _ in range(_EVICT_PER_CALL):
+                if not buckets:
+                    break
+                _, (_, last_seen) = next(iter(buckets.items()))
+                if now - last_seen < idle:
+                    break
+                buckets.popitem(last=False)
+
+            allowed = tokens >= cost
+            if allowed:
+                tokens -= cost
+            buckets[key] = (tokens, now)
+            return allowed, tokens
+
+    def __len__(self) -> int:
+        return sum(len(buckets) for _, buckets in self._shards)
+
+
+# 令牌桶的原子更新（时间取 Redis 服务器时间，多个 worker 之间不受时钟偏差影响）
+_REDIS_TAKE_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or capacity
+local last_seen = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - last_seen) * rate)
+local allowed = 0
+if tokens >= cost then
+    tokens = tokens - cost
+    allowed = 1
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate))
+return {allowed, tostring(tokens)}
+"""
+
+
+class RedisBucketStore:
+    """Redis 令牌桶存储，多个 worker 共享同一限额
+
+    每个键一次 Lua 脚本调用完成补充和扣减，键在桶回满后自动过期。需要安装 redis 包。
+    """
+
+    blocking = True
+
+    def __init__(self, url: str, prefix: str = "ratelimit:"):
+        try:
+            import redis
+        except ImportError as e:
+            raise RuntimeError("RATE_LIMIT_BACKEND=redis 需要安装 redis 包") from e
+        self.prefix = prefix
+        self._client = redis.Redis.from_url(url, socket_timeout=0.5)
+        self._script = self._client.register_script(_REDIS_TAKE_SCRIPT)
+
+    def take(self, key: str, cost: int, capacity: int, rate: float) -> Tuple[bool, float]:
+        allowed, tokens = self._script(keys=[self.prefix + key], args=[capacity, rate, cost])
+        return bool(allowed), float(tokens)
+
+
+def create_bucket_store(backend: str):
+    """按配置创建令牌桶存储：memory/redis"""
+    if backend == "redis":
+        return RedisBucketStore(settings.RATE_LIMIT_REDIS_URL)
+    if backend == "memory":
+        return MemoryBucketStore(settings.RATE_LIMIT_SHARDS)
+    raise ValueError(f"Unknown RATE_LIMIT_BACKEND: {backend}")
+
+
+class RateLimiter:
+    """按客户端（登录用户按用户，未登录按IP）的令牌桶限流
+
+    桶容量为每分钟限额，令牌按限额/60每秒匀速补充；不同路由按配置扣除不同令牌数。
+    """
+
+    def __init__(self, store, per_minute: int, route_costs: Dict[str, int]):
+        self.store = store
+        self.capacity = per_minute
+        self.rate = per_minute / 60.0
+        # 按前缀长度从长到短匹配，"METHOD /path" 优先于同前缀的 "/path"
+        self._routes = sorted(
+            (self._parse_route(route) + (cost,) for route, cost in route_costs.items()),
+            key=lambda item: (len(item[1]), item[0] is not None),
+            reverse=True,
+        )
+
+    @staticmethod
+    def _parse_route(route: str):
+        method, _, path = route.strip().rpartition(" ")
+        return (method.upper() or None, path)
+
+    def cost(self, method: str, path: str) -> int:
+        """请求的令牌消耗，0 表示不限流"""
+        for route_method, prefix, cost in self._routes:
+            if path.startswith(prefix) and route_method in (None, method):
+                return min(cost, self.capacity)
+        return 1
+
+    def retry_after(self, cost: int, tokens: float) -> int:
+        """令牌不足时需要等待的秒数"""
+        return max(1, math.ceil((cost - tokens) / self.rate))
+
+    async def acquire(self, key: str, cost: int) -> Tuple[bool, float]:
+        """扣除令牌，返回 (是否放行, 剩余令牌数)；共享存储不可用时放行"""
+        try:
+            if self.store.blocking:
+                return await asyncio.to_thread(self.store.take, key, cost, self.capacity, self.rate)
+            return self.store.take(key, cost, self.capacity, self.rate)
+        except Exception:
+            logger.exception("限流存储不可用，本次请求不限流")
+            return True, float(self.capacity)
+
+
+# 全局限流器实例
+rate_limiter = RateLimiter(
+    create_bucket_store(settings.RATE_LIMIT_BACKEND) if settings.RATE_LIMIT_ENABLED else MemoryBucketStore(1),
+    settings.RATE_LIMIT_PER_MINUTE,
+    settings.RATE_LIMIT_ROUTE_COSTS,
+)
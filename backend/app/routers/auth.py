@@ -5,15 +5,17 @@ from ..database import get_db
 from ..schemas import UserCreate, UserLogin, UserResponse, Token, ResponseModel
 from ..auth import authenticate_user, create_access_token, create_user, get_current_user
 from ..models import User
+from ..stats import site_stats
 
 router = APIRouter()
 
 
 @router.post("/register", response_model=ResponseModel)
-async def register(user_data: UserCreate, db: Session = Depends(get_db)):
+def register(user_data: UserCreate, db: Session = Depends(get_db)):
     """用户注册"""
     try:
         user = create_user(db, user_data.username, user_data.password)
+        site_stats.add("total_users")
         return ResponseModel(
             success=True,
             message="User registered successfully",
@@ -29,7 +31,7 @@ async def register(user_data: UserCreate, db: Session = Depends(get_db)):
 
 
 @router.post("/login", response_model=Token)
-async def login(user_data: UserLogin, db: Session = Depends(get_db)):
+def login(user_data: UserLogin, db: Session = Depends(get_db)):
     """用户登录"""
     user = authenticate_user(db, user_data.username, user_data.password)
     if not user:
@@ -48,7 +50,7 @@ async def login(user_data: UserLogin, db: Session = Depends(get_db)):
 
 
 @router.get("/profile", response_model=UserResponse)
-async def get_profile(current_user: User = Depends(get_current_user)):
+def get_profile(current_user: User = Depends(get_current_user)):
     """获取当前用户信息"""
     return UserResponse.from_orm(current_user)
 
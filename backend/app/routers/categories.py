@@ -5,20 +5,23 @@ from typing import List
 from ..database import get_db
 from ..schemas import CategoryCreate, CategoryResponse, ResponseModel
 from ..auth import get_current_user
+from ..taxonomy import taxonomy_cache
+from ..facets import facet_cache
+from ..stats import site_stats
 from ..models import User, Category
 
 router = APIRouter()
 
 
 @router.get("", response_model=List[CategoryResponse])
-async def get_categories(db: Session = Depends(get_db)):
+def get_categories(db: Session = Depends(get_db)):
     """获取所有分类"""
     categories = db.query(Category).order_by(Category.created_at.desc()).all()
     return [CategoryResponse.from_orm(category) for category in categories]
 
 
 @router.post("", response_model=ResponseModel)
-async def create_category(
+def create_category(
     category_data: CategoryCreate,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
@@ -43,6 +46,9 @@ async def create_category(
     db.add(category)
     db.commit()
     db.refresh(category)
+    taxonomy_cache.invalidate()
+    facet_cache.invalidate()
+    site_stats.add("total_categories")
     
     return ResponseModel(
         success=True,
@@ -52,7 +58,7 @@ async def create_category(
 
 
 @router.get("/{category_id}", response_model=CategoryResponse)
-async def get_category(category_id: int, db: Session = Depends(get_db)):
+def get_category(category_id: int, db: Session = Depends(get_db)):
     """获取单个分类详情"""
     category = db.query(Category).filter(Category.id == category_id).first()
     if not category:
@@ -0,0 +1,68 @@
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.orm import Session, undefer
+
+from ..database import get_db
+from ..schemas import ChangesResponse, RuleChangeItem
+from ..models import CursorRule, CursorRuleTag
+from ..changelog import changes_since, latest_seq
+
+router = APIRouter()
+
+# 每次最多返回的变更数
+MAX_CHANGES_LIMIT = 1000
+
+
+@router.get("", response_model=ChangesResponse)
+def get_changes(
+    since: int = Query(0, ge=0, description="上次同步得到的 next_since，0 为全量同步"),
+    limit: int = Query(200, ge=1, le=MAX_CHANGES_LIMIT, description="每次最多返回的变更数"),
+    db: Session = Depends(get_db)
+):
+    """增量同步：返回 since 之后创建、修改或删除的规则
+
+    同一规则多次变更只返回一次（当前内容，序号为最后一次变更的序号），
+    已删除的规则返回墓碑。耗时与变更数量成正比，与规则总数无关。
+    """
+    changes = changes_since(db, since, limit + 1)
+    has_more = len(changes) > limit
+    changes = changes[:limit]
+    rule_ids = [rule_id for rule_id, _ in changes]
+
+    rules = {
+        cursor_rule.id: cursor_rule
+        for cursor_rule in db.query(CursorRule).options(undefer(CursorRule.content)).filter(
+            CursorRule.id.in_(rule_ids)
+        )
+    } if rule_ids else {}
+    tag_ids = {}
+    if rules:
+        for rule_id, tag_id in db.query(CursorRuleTag.cursor_rule_id, CursorRuleTag.tag_id).filter(
+            CursorRuleTag.cursor_rule_id.in_(list(rules))
+        ).order_by(CursorRuleTag.cursor_rule_id, CursorRuleTag.tag_id):
+            tag_ids.setdefault(rule_id, []).append(tag_id)
+
+    items = []
+    for rule_id, seq in changes:
+        cursor_rule = rules.get(rule_id)
+        if cursor_rule is None:
+            # 规则已删除（或创建后又被删除）：墓碑
+            items.append(RuleChangeItem(seq=seq, id=rule_id, deleted=True))
+            continue
+        items.append(RuleChangeItem(
+            seq=seq,
+            id=rule_id,
+            title=cursor_rule.title,
+            filename=cursor_rule.filename,
+            description=cursor_rule.description,
+            content=cursor_rule.content,
+            category_id=cursor_rule.category_id,
+            tag_ids=tag_ids.get(rule_id, []),
+            updated_at=cursor_rule.updated_at or cursor_rule.created_at,
+        ))
+
+    return ChangesResponse(
+        items=items,
+        next_since=changes[-1][1] if changes else since,
+        has_more=has_more,
+        latest_seq=latest_seq(db),
+    )
@@ -1,16 +1,29 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Query, Request
-from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import or_, and_, desc, asc
-from typing import List, Optional
+from sqlalchemy.orm import Session, joinedload, undefer_group
+from typing import Optional
 import math
 
+from ..config import settings
 from ..database import get_db
 from ..schemas import (
-    CursorRuleCreate, CursorRuleUpdate, CursorRuleResponse, CursorRuleListResponse,
+    CursorRuleCreate, CursorRuleUpdate, CursorRuleResponse,
     PaginatedResponse, VoteRequest, VoteResponse, ResponseModel
 )
 from ..auth import get_current_user, get_current_user_optional
-from ..models import User, CursorRule, Category, Tag, CursorRuleTag, Vote, VoteType
+from ..models import User, CursorRule, Category, Tag, CursorRuleTag
+from ..search import search_engine
+from ..pagination import paginate, paginate_ids, count_total, count_cache
+from ..listing import hydrate_rules, SORT_MODES, SORT_ALIASES
+from ..tag_index import tag_index, build_tag_filter, tag_expression_sql, bitmap_ids, ids_bitmap
+from ..facets import facet_cache, parse_facet_fields, compute_facets
+from ..counters import counter_aggregator
+from ..unique_views import unique_views, visitor_key
+from ..trending import trending, EVENT_WEIGHTS
+from ..stats import site_stats
+from ..rule_blobs import store_blob, remove_blob
+from ..bundles import bundle_cache
+from ..changelog import record_change, CHANGE_CREATE, CHANGE_UPDATE, CHANGE_DELETE
+from ..votes import cast_vote, user_votes, RuleNotFound, VoteConflict
 
 router = APIRouter()
 
@@ -23,109 +36,210 @@ def get_client_ip(request: Request) -> str:
     return request.client.host
 
 
+def with_live_counts(db: Session, response_data: CursorRuleResponse) -> CursorRuleResponse:
+    """合并计数聚合器中尚未落库的浏览量、下载量，并填充独立访客数"""
+    response_data.unique_view_count = unique_views.counts(db, [response_data.id])[response_data.id]
+    response_data.view_count = counter_aggregator.merged("view_count", response_data.id, response_data.view_count)
+    response_data.download_count = counter_aggregator.merged(
+        "download_count", response_data.id, response_data.download_count
+    )
+    return response_data
+
+
 @router.get("", response_model=PaginatedResponse)
-async def get_cursor_rules(
+def get_cursor_rules(
+    request: Request,
     page: int = Query(1, ge=1, description="页码"),
     size: int = Query(20, ge=1, le=100, description="每页大小"),
     keyword: Optional[str] = Query(None, description="关键词搜索"),
     category_id: Optional[int] = Query(None, description="分类筛选"),
     tag_ids: Optional[str] = Query(None, description="标签筛选(逗号分隔)"),
+    tag_match: str = Query("any", description="标签匹配方式：any（任一标签）/all（全部标签）"),
+    tag_expr: Optional[str] = Query(None, description="标签表达式，如 1 and (2 or 3) and not 4"),
     author_id: Optional[int] = Query(None, description="作者筛选"),
-    sort_by: str = Query("created_at", description="排序字段"),
+    sort_by: str = Query(
+        "newest",
+        description="排序方式：newest/most_liked/most_downloaded/most_viewed/net_score/trending，有关键词时可用relevance"
+    ),
     sort_order: str = Query("desc", description="排序方向"),
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = Query(None, description="游标（取自上一页的next_cursor，传入时忽略page）"),
+    with_total: bool = Query(True, description="是否返回总数（无限滚动可传false跳过计数）"),
+    estimate_total: bool = Query(False, description="无筛选条件时使用表统计估算总数"),
+    facets: Optional[str] = Query(None, description="分面统计字段(逗号分隔)：category,tag"),
+    include_user_vote: bool = Query(False, description="是否返回当前用户（未登录按IP）对每条规则的投票状态"),
+    db: Session = Depends(get_db),
+    current_user: Optional[User] = Depends(get_current_user_optional)
 ):
-    """获取cursor rules列表"""
-    query = db.query(CursorRule).options(
-        joinedload(CursorRule.author),
-        joinedload(CursorRule.category),
-        joinedload(CursorRule.tags)
-    )
-    
-    # 关键词搜索
+    """获取cursor rules列表
+
+    两阶段查询：先按筛选和排序只查出当前页的规则ID（去重），
+    再由 hydrate_rules 批量补全作者、分类和标签。
+    标签条件在进程内标签索引上求值，命中数即总数，不再执行 COUNT。
+    trending 排序直接取热度榜单（每个分类前 TRENDING_TOP_K 条），不在请求中聚合活动记录；
+    榜单为空（冷启动、重启后尚无活动）时列出全部规则并按最新排序。
+    relevance、trending 排序的名次在进程内确定，筛选和分页都在ID列表上完成，
+    只把当前页的ID交给数据库。
+    """
+    query = db.query(CursorRule.id)
+    
+    # 关键词搜索（全文索引）
+    ranked_ids = None
     if keyword:
-        search_filter = or_(
-            CursorRule.title.contains(keyword),
-            CursorRule.description.contains(keyword),
-            CursorRule.content.contains(keyword)
+        ranked_ids = [rule_id for rule_id, _ in search_engine.search(db, keyword)]
+    
+    # 热度排序（只列出榜单内的规则；榜单为空时按最新排序）
+    trending_ids = None
+    if sort_by == "trending":
+        trending_ids = trending.top(category_id) or None
+    
+    # 按名次排序：relevance 用检索结果（无命中时为空列表），trending 用榜单
+    order_ids = {"relevance": ranked_ids, "trending": trending_ids}.get(sort_by)
+    if order_ids is None and ranked_ids is not None:
+        # 按列排序的关键词搜索仍在SQL中筛选命中的规则
+        query = query.filter(CursorRule.id.in_(ranked_ids))
+    
+    # 标签筛选（标签索引位图上求值，并合并分类、作者条件）
+    tag_id_list = sorted({int(tid.strip()) for tid in (tag_ids or "").split(",") if tid.strip().isdigit()})
+    try:
+        tag_filter = build_tag_filter(tag_id_list, tag_match.lower() == "all", tag_expr)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid tag_expr: {e}"
+        )
+    try:
+        facet_fields = parse_facet_fields(facets)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid facets: {e}, allowed: category, tag"
         )
-        query = query.filter(search_filter)
+    matched_total = None
+    if order_ids is not None:
+        if tag_filter is not None or category_id or author_id:
+            # 分类、作者、标签条件在标签索引位图上求值，保持名次顺序
+            bits = tag_index.select(db, tag_filter, category_id, author_id)
+            if trending_ids is not None and ranked_ids is not None:
+                bits &= ids_bitmap(ranked_ids)
+            order_ids = [rule_id for rule_id in order_ids if bits >> rule_id & 1]
+        elif trending_ids is not None and ranked_ids is not None:
+            ranked = set(ranked_ids)
+            order_ids = [rule_id for rule_id in order_ids if rule_id in ranked]
+        matched_total = len(order_ids)
+    elif tag_filter is not None:
+        bits = tag_index.select(db, tag_filter, category_id, author_id)
+        if ranked_ids is not None:
+            bits &= ids_bitmap(ranked_ids)
+        matched_total = bits.bit_count()
+        if matched_total <= settings.TAG_FILTER_MAX_IN_IDS:
+            query = query.filter(CursorRule.id.in_(bitmap_ids(bits)))
+        else:
+            # 命中过多时不展开ID列表，改为等价的SQL半连接
+            query = query.filter(tag_expression_sql(tag_filter))
     
     # 分类筛选
     if category_id:
         query = query.filter(CursorRule.category_id == category_id)
     
-    # 标签筛选
-    if tag_ids:
-        tag_id_list = [int(tid.strip()) for tid in tag_ids.split(",") if tid.strip().isdigit()]
-        if tag_id_list:
-            query = query.join(CursorRuleTag).filter(CursorRuleTag.tag_id.in_(tag_id_list))
-    
     # 作者筛选
     if author_id:
         query = query.filter(CursorRule.author_id == author_id)
     
-    # 排序
-    if hasattr(CursorRule, sort_by):
-        order_column = getattr(CursorRule, sort_by)
-        if sort_order.lower() == "asc":
-            query = query.order_by(asc(order_column))
-        else:
-            query = query.order_by(desc(order_column))
-    
-    # 分页
-    total = query.count()
-    offset = (page - 1) * size
-    items = query.offset(offset).limit(size).all()
+    # 总数（标签筛选直接使用索引命中数，其余按筛选条件签名缓存）
+    if matched_total is not None:
+        total, total_estimated = (matched_total if with_total else None), False
+    else:
+        filtered = bool(keyword or category_id or author_id)
+        signature = ("list", keyword, category_id, author_id)
+        total, total_estimated = count_total(
+            db, query, signature, with_total, estimate_total and not filtered
+        )
     
-    # 转换为响应格式
-    cursor_rules = []
-    for item in items:
-        cursor_rule_data = CursorRuleListResponse.from_orm(item)
-        cursor_rules.append(cursor_rule_data.dict())
+    # 排序（排序值相同时按id排序，保证游标分页稳定）
+    descending = sort_order.lower() != "asc"
+    if order_ids is not None:
+        # 按检索相关度或热度榜单的名次分页（只取当前页的ID）
+        page_ids, next_cursor = paginate_ids(order_ids, sort_by, page, size, cursor)
+    else:
+        sort_mode = SORT_ALIASES.get(sort_by, sort_by)
+        if sort_mode in ("relevance", "trending"):
+            # 没有关键词或榜单为空时按最新排序
+            sort_mode = "newest"
+        if sort_mode not in SORT_MODES:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Invalid sort_by, allowed: {', '.join([*SORT_MODES, 'trending'])}"
+            )
+        sort_column = SORT_MODES[sort_mode]
+        order_expr = getattr(CursorRule, sort_column)
+        scope = f"{sort_mode}:{'desc' if descending else 'asc'}"
+        # 分页（只查ID）
+        rows, next_cursor = paginate(query, order_expr, descending, scope, page, size, cursor)
+        page_ids = [row.id for row in rows]
+    
+    # 批量补全列表数据
+    cursor_rules = hydrate_rules(db, page_ids)
+    
+    # 当前页的投票状态（一次 IN 查询）
+    if include_user_vote and cursor_rules:
+        votes = user_votes(
+            db, [item["id"] for item in cursor_rules],
+            current_user.id if current_user else None, get_client_ip(request)
+        )
+        for item in cursor_rules:
+            item["user_vote"] = votes.get(item["id"])
+    
+    # 分面统计（与列表使用同一组筛选条件）
+    facet_counts = None
+    if facet_fields:
+        facet_counts = compute_facets(
+            db, facet_fields, tag_filter, keyword, ranked_ids, category_id, author_id, trending_ids
+        )
     
     return PaginatedResponse(
         items=cursor_rules,
         total=total,
         page=page,
         size=size,
-        pages=math.ceil(total / size)
+        pages=math.ceil(total / size) if total is not None else None,
+        total_estimated=total_estimated,
+        next_cursor=next_cursor,
+        facets=facet_counts
     )
 
 
 @router.get("/my", response_model=PaginatedResponse)
-async def get_my_cursor_rules(
+def get_my_cursor_rules(
     page: int = Query(1, ge=1, description="页码"),
     size: int = Query(20, ge=1, le=100, description="每页大小"),
+    cursor: Optional[str] = Query(None, description="游标（取自上一页的next_cursor，传入时忽略page）"),
+    with_total: bool = Query(True, description="是否返回总数（无限滚动可传false跳过计数）"),
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """获取我的cursor rules"""
-    query = db.query(CursorRule).options(
-        joinedload(CursorRule.category),
-        joinedload(CursorRule.tags)
-    ).filter(CursorRule.author_id == current_user.id).order_by(desc(CursorRule.created_at))
+    query = db.query(CursorRule.id).filter(CursorRule.author_id == current_user.id)
     
-    total = query.count()
-    offset = (page - 1) * size
-    items = query.offset(offset).limit(size).all()
+    total, total_estimated = count_total(db, query, ("my", current_user.id), with_total)
+    rows, next_cursor = paginate(
+        query, CursorRule.created_at, True, "created_at:desc", page, size, cursor
+    )
     
-    cursor_rules = []
-    for item in items:
-        cursor_rule_data = CursorRuleListResponse.from_orm(item)
-        cursor_rules.append(cursor_rule_data.dict())
+    cursor_rules = hydrate_rules(db, [row.id for row in rows])
     
     return PaginatedResponse(
         items=cursor_rules,
         total=total,
         page=page,
         size=size,
-        pages=math.ceil(total / size)
+        pages=math.ceil(total / size) if total is not None else None,
+        total_estimated=total_estimated,
+        next_cursor=next_cursor
     )
 
 
 @router.get("/{cursor_rule_id}", response_model=CursorRuleResponse)
-async def get_cursor_rule(
+def get_cursor_rule(
     cursor_rule_id: int, 
     request: Request, 
     db: Session = Depends(get_db),
@@ -135,7 +249,8 @@ async def get_cursor_rule(
     cursor_rule = db.query(CursorRule).options(
         joinedload(CursorRule.author),
         joinedload(CursorRule.category),
-        joinedload(CursorRule.tags)
+        joinedload(CursorRule.tags),
+        undefer_group("body")
     ).filter(CursorRule.id == cursor_rule_id).first()
     
     if not cursor_rule:
@@ -144,47 +259,26 @@ async def get_cursor_rule(
             detail="Cursor rule not found"
         )
     
-    # 获取用户投票状态（优先使用用户ID，其次使用IP地址）
-    ip_address = get_client_ip(request)
-    if current_user:
-        user_vote = db.query(Vote).filter(
-            Vote.cursor_rule_id == cursor_rule_id,
-            Vote.user_id == current_user.id
-        ).first()
-    else:
-        user_vote = db.query(Vote).filter(
-            Vote.cursor_rule_id == cursor_rule_id,
-            Vote.ip_address == ip_address,
-            Vote.user_id.is_(None)
-        ).first()
-    
-    # 实时计算统计数据
-    likes_count = db.query(Vote).filter(
-        Vote.cursor_rule_id == cursor_rule_id,
-        Vote.vote_type == VoteType.LIKE
-    ).count()
-    
-    dislikes_count = db.query(Vote).filter(
-        Vote.cursor_rule_id == cursor_rule_id,
-        Vote.vote_type == VoteType.DISLIKE
-    ).count()
-    
-    # 转换为响应模型
+    # 获取用户投票状态（识别方式与投票时相同）
+    user_vote = user_votes(
+        db, [cursor_rule_id], current_user.id if current_user else None, get_client_ip(request)
+    ).get(cursor_rule_id)
+    
+    # 转换为响应模型（点赞点踩数使用投票时维护的计数，偏差由 scripts.reconcile_votes 离线修复）
     response_data = CursorRuleResponse.from_orm(cursor_rule)
-    response_data.user_vote = user_vote.vote_type if user_vote else None
-    response_data.likes_count = likes_count
-    response_data.dislikes_count = dislikes_count
+    response_data.user_vote = user_vote
     
-    return response_data
+    return with_live_counts(db, response_data)
 
 
 @router.get("/{cursor_rule_id}/view", response_model=CursorRuleResponse)
-async def view_cursor_rule(cursor_rule_id: int, db: Session = Depends(get_db)):
+def view_cursor_rule(cursor_rule_id: int, db: Session = Depends(get_db)):
     """查看单个cursor rule详情（view路由别名）"""
     cursor_rule = db.query(CursorRule).options(
         joinedload(CursorRule.author),
         joinedload(CursorRule.category),
-        joinedload(CursorRule.tags)
+        joinedload(CursorRule.tags),
+        undefer_group("body")
     ).filter(CursorRule.id == cursor_rule_id).first()
     
     if not cursor_rule:
@@ -193,16 +287,22 @@ async def view_cursor_rule(cursor_rule_id: int, db: Session = Depends(get_db)):
             detail="Cursor rule not found"
         )
     
-    return CursorRuleResponse.from_orm(cursor_rule)
+    return with_live_counts(db, CursorRuleResponse.from_orm(cursor_rule))
 
 
 @router.post("/{cursor_rule_id}/view", response_model=CursorRuleResponse)
-async def record_view(cursor_rule_id: int, db: Session = Depends(get_db)):
-    """记录浏览量"""
+def record_view(
+    cursor_rule_id: int,
+    request: Request,
+    db: Session = Depends(get_db),
+    current_user: Optional[User] = Depends(get_current_user_optional)
+):
+    """记录浏览量（原始浏览量每次累加，独立访客按用户ID或IP去重）"""
     cursor_rule = db.query(CursorRule).options(
         joinedload(CursorRule.author),
         joinedload(CursorRule.category),
-        joinedload(CursorRule.tags)
+        joinedload(CursorRule.tags),
+        undefer_group("body")
     ).filter(CursorRule.id == cursor_rule_id).first()
     
     if not cursor_rule:
@@ -211,16 +311,19 @@ async def record_view(cursor_rule_id: int, db: Session = Depends(get_db)):
             detail="Cursor rule not found"
         )
     
-    # 增加浏览计数
-    cursor_rule.view_count += 1
-    db.commit()
-    db.refresh(cursor_rule)
+    # 增加浏览计数（写入聚合器，定期批量落库）
+    counter_aggregator.increment("view_count", cursor_rule_id)
+    trending.record(cursor_rule_id, cursor_rule.category_id, EVENT_WEIGHTS["view"])
+    # 记录独立访客（只更新内存中的草图）
+    unique_views.record(
+        db, cursor_rule_id, visitor_key(current_user.id if current_user else None, get_client_ip(request))
+    )
     
-    return CursorRuleResponse.from_orm(cursor_rule)
+    return with_live_counts(db, CursorRuleResponse.from_orm(cursor_rule))
 
 
 @router.post("", response_model=ResponseModel)
-async def create_cursor_rule(
+def create_cursor_rule(
     cursor_rule_data: CursorRuleCreate,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
@@ -262,8 +365,21 @@ async def create_cursor_rule(
             cursor_rule_tag = CursorRuleTag(cursor_rule_id=cursor_rule.id, tag_id=tag_id)
             db.add(cursor_rule_tag)
     
+    # 更新全文索引和预压缩数据
+    search_engine.index_rule(db, cursor_rule)
+    store_blob(db, cursor_rule.id, cursor_rule.content)
+    
+    # 记录变更（最后一步，缩短变更序号的锁持有时间）
+    record_change(db, cursor_rule.id, CHANGE_CREATE)
     db.commit()
     db.refresh(cursor_rule)
+    tag_index.update_rule(
+        cursor_rule.id, cursor_rule.category_id, cursor_rule.author_id, cursor_rule_data.tag_ids or []
+    )
+    count_cache.invalidate()
+    facet_cache.invalidate()
+    bundle_cache.invalidate()
+    site_stats.add("total_rules")
     
     return ResponseModel(
         success=True,
@@ -273,7 +389,7 @@ async def create_cursor_rule(
 
 
 @router.put("/{cursor_rule_id}", response_model=ResponseModel)
-async def update_cursor_rule(
+def update_cursor_rule(
     cursor_rule_id: int,
     cursor_rule_data: CursorRuleUpdate,
     current_user: User = Depends(get_current_user),
@@ -312,7 +428,24 @@ async def update_cursor_rule(
                 cursor_rule_tag = CursorRuleTag(cursor_rule_id=cursor_rule_id, tag_id=tag_id)
                 db.add(cursor_rule_tag)
     
+    # 检索字段变更时更新全文索引
+    if update_data.keys() & {"title", "description", "content"}:
+        search_engine.index_rule(db, cursor_rule)
+    
+    # 正文变更时重新生成预压缩数据
+    if "content" in update_data:
+        store_blob(db, cursor_rule_id, cursor_rule.content)
+    
+    category_id, author_id = cursor_rule.category_id, cursor_rule.author_id
+    record_change(db, cursor_rule_id, CHANGE_UPDATE)
     db.commit()
+    tag_index.update_rule(cursor_rule_id, category_id, author_id, tag_ids)
+    trending.update_category(cursor_rule_id, category_id)
+    if "title" in update_data:
+        site_stats.update_rule(cursor_rule_id, update_data["title"])
+    count_cache.invalidate()
+    facet_cache.invalidate()
+    bundle_cache.invalidate()
     
     return ResponseModel(
         success=True,
@@ -321,7 +454,7 @@ async def update_cursor_rule(
 
 
 @router.delete("/{cursor_rule_id}", response_model=ResponseModel)
-async def delete_cursor_rule(
+def delete_cursor_rule(
     cursor_rule_id: int,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
@@ -341,8 +474,20 @@ async def delete_cursor_rule(
             detail="Not authorized to delete this cursor rule"
         )
     
+    download_count = counter_aggregator.merged("download_count", cursor_rule_id, cursor_rule.download_count)
     db.delete(cursor_rule)
+    search_engine.remove_rule(db, cursor_rule_id)
+    unique_views.remove_rule(db, cursor_rule_id)
+    remove_blob(db, cursor_rule_id)
+    record_change(db, cursor_rule_id, CHANGE_DELETE)
     db.commit()
+    tag_index.remove_rule(cursor_rule_id)
+    trending.remove_rule(cursor_rule_id)
+    counter_aggregator.discard(cursor_rule_id)
+    site_stats.remove_rule(cursor_rule_id, download_count)
+    count_cache.invalidate()
+    facet_cache.invalidate()
+    bundle_cache.invalidate()
     
     return ResponseModel(
         success=True,
@@ -351,102 +496,35 @@ async def delete_cursor_rule(
 
 
 @router.post("/{cursor_rule_id}/vote", response_model=VoteResponse)
-async def vote_cursor_rule(
+def vote_cursor_rule(
     cursor_rule_id: int,
     vote_data: VoteRequest,
     request: Request,
     db: Session = Depends(get_db),
     current_user: Optional[User] = Depends(get_current_user_optional)
 ):
-    """投票（点赞/点踩）"""
-    # 检查cursor rule是否存在
-    cursor_rule = db.query(CursorRule).filter(CursorRule.id == cursor_rule_id).first()
-    if not cursor_rule:
+    """投票（点赞/点踩）
+
+    投票记录和计数增量在一个事务中写入，详见 votes.cast_vote。
+    """
+    try:
+        likes_count, dislikes_count, user_vote = cast_vote(
+            db, cursor_rule_id, vote_data.vote_type,
+            current_user.id if current_user else None, get_client_ip(request)
+        )
+    except RuleNotFound:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Cursor rule not found"
         )
-    
-    ip_address = get_client_ip(request)
-    
-    # 检查是否已投票
-    if current_user:
-        # 登录用户：先检查user_id约束
-        existing_vote = db.query(Vote).filter(
-            Vote.cursor_rule_id == cursor_rule_id,
-            Vote.user_id == current_user.id
-        ).first()
-        
-        # 如果没有找到用户投票记录，检查是否有相同IP的记录（可能是之前未登录时投的票）
-        if not existing_vote:
-            existing_vote = db.query(Vote).filter(
-                Vote.cursor_rule_id == cursor_rule_id,
-                Vote.ip_address == ip_address
-            ).first()
-            # 如果找到了相同IP的记录，将其转换为登录用户的记录
-            if existing_vote:
-                existing_vote.user_id = current_user.id
-    else:
-        # 未登录用户：检查ip_address约束（不管user_id是什么）
-        existing_vote = db.query(Vote).filter(
-            Vote.cursor_rule_id == cursor_rule_id,
-            Vote.ip_address == ip_address
-        ).first()
-    
-    if existing_vote:
-        if existing_vote.vote_type == vote_data.vote_type:
-            # 取消投票
-            db.delete(existing_vote)
-        else:
-            # 更新投票类型
-            existing_vote.vote_type = vote_data.vote_type
-    else:
-        # 新增投票
-        new_vote = Vote(
-            cursor_rule_id=cursor_rule_id,
-            user_id=current_user.id if current_user else None,
-            ip_address=ip_address,
-            vote_type=vote_data.vote_type
+    except VoteConflict:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Vote conflict, please retry"
         )
-        db.add(new_vote)
-    
-    # 提交投票操作
-    db.commit()
-    
-    # 重新计算统计数据（确保数据一致性）
-    likes_count = db.query(Vote).filter(
-        Vote.cursor_rule_id == cursor_rule_id,
-        Vote.vote_type == VoteType.LIKE
-    ).count()
-    
-    dislikes_count = db.query(Vote).filter(
-        Vote.cursor_rule_id == cursor_rule_id,
-        Vote.vote_type == VoteType.DISLIKE
-    ).count()
-    
-    # 更新cursor_rule表中的计数
-    cursor_rule.likes_count = likes_count
-    cursor_rule.dislikes_count = dislikes_count
-    
-    # 再次提交更新的计数
-    db.commit()
-    
-    # 获取用户当前投票状态
-    if current_user:
-        # 登录用户：根据user_id查询
-        current_vote = db.query(Vote).filter(
-            Vote.cursor_rule_id == cursor_rule_id,
-            Vote.user_id == current_user.id
-        ).first()
-    else:
-        # 未登录用户：根据ip_address查询（不管user_id是什么）
-        current_vote = db.query(Vote).filter(
-            Vote.cursor_rule_id == cursor_rule_id,
-            Vote.ip_address == ip_address
-        ).first()
     
     return VoteResponse(
         likes_count=likes_count,
         dislikes_count=dislikes_count,
-        user_vote=current_vote.vote_type if current_vote else None
-    )
\ No newline at end of file
+        user_vote=user_vote
+    )
@@ -1,64 +1,268 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
 from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from sqlalchemy import func
-from typing import List
-import zipfile
-from io import BytesIO
-import uuid
+from typing import BinaryIO, Dict, Iterator, List, Optional, Tuple
+import hashlib
 
-from ..database import get_db
+from ..database import SessionLocal, get_db
 from ..schemas import BatchDownloadRequest, ResponseModel
-from ..models import CursorRule, User, Category, Tag
+from ..models import Category, CursorRule, RuleContentBlob, Tag, User
+from ..auth import get_current_user
 from ..config import settings
+from ..counters import counter_aggregator
+from ..trending import trending, EVENT_WEIGHTS
+from ..stats import site_stats
+from ..compression import compression_pool
+from ..rule_blobs import blob_date_time, ensure_blobs
+from ..zipstream import DateTime
+from ..bundles import bundle_cache, iter_bundle_entries
+from ..archives import ARCHIVE_FORMATS, ArchiveFormat, negotiate_format
 
 router = APIRouter()
 
+# 打包下载时每批从数据库读取的规则数
+ZIP_FETCH_BATCH_SIZE = 20
 
-def create_zip_response(cursor_rules: List[CursorRule], filename_prefix: str = "cursor-rules") -> StreamingResponse:
-    """创建ZIP文件响应"""
-    zip_buffer = BytesIO()
-    
-    with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zip_file:
-        for cursor_rule in cursor_rules:
+# 发送整包文件时每次读取的字节数
+BUNDLE_CHUNK_SIZE = 64 * 1024
+
+
+def iter_rule_entries(cursor_rule_ids: List[int]) -> Iterator[Tuple[str, bytes, int, int, int, DateTime]]:
+    """逐条读取规则的预压缩数据，产出 (ZIP内路径, 条目数据, 压缩方法, CRC32, 原文大小, 修改时间)
+
+    响应体在路由返回后才开始生成，因此使用独立的数据库会话；
+    按批读取，内存中只保留当前一批规则的压缩数据。
+    """
+    db = SessionLocal()
+    try:
+        rows = db.query(
+            CursorRule.filename, RuleContentBlob.compressed, RuleContentBlob.method,
+            RuleContentBlob.crc32, RuleContentBlob.size, RuleContentBlob.updated_at
+        ).join(
+            RuleContentBlob, RuleContentBlob.cursor_rule_id == CursorRule.id
+        ).filter(
+            CursorRule.id.in_(cursor_rule_ids)
+        ).order_by(CursorRule.id).yield_per(ZIP_FETCH_BATCH_SIZE)
+        for filename, compressed, method, crc32, size, updated_at in rows:
             # 文件路径：.cursor/rules/文件名.mdc
-            file_path = f".cursor/rules/{cursor_rule.filename}.mdc"
-            zip_file.writestr(file_path, cursor_rule.content)
-    
-    zip_buffer.seek(0)
-    
-    # 生成随机文件名
-    random_name = str(uuid.uuid4())[:8]
-    zip_filename = f"{filename_prefix}-{random_name}.zip"
+            yield f".cursor/rules/{filename}.mdc", compressed, method, crc32, size, blob_date_time(updated_at)
+    finally:
+        db.close()
+
+
+def get_archive_format(
+    request: Request,
+    format_name: Optional[str] = Query(None, alias="format", description="归档格式：zip、tar.gz、tar.zst（需安装 zstandard）")
+) -> ArchiveFormat:
+    """归档格式：format 参数优先，否则按 Accept 头协商，默认 ZIP"""
+    archive_format = negotiate_format(format_name, request.headers.get("accept"))
+    if archive_format is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unsupported archive format, expected one of: {', '.join(ARCHIVE_FORMATS)}"
+        )
+    return archive_format
+
+
+def create_archive_response(
+    db: Session, cursor_rule_ids: List[int], archive_format: ArchiveFormat, filename_prefix: str = "cursor-rules"
+) -> StreamingResponse:
+    """创建归档文件响应
+
+    规则正文在写入时已压缩（见 rule_blobs），边读取边打包边发送；ZIP 直接拼接预压缩数据。
+    """
+    ensure_blobs(db, cursor_rule_ids)
     
     return StreamingResponse(
-        BytesIO(zip_buffer.read()),
-        media_type='application/zip',
-        headers={"Content-Disposition": f"attachment; filename={zip_filename}"}
+        archive_format.stream(iter_rule_entries(cursor_rule_ids)),
+        media_type=archive_format.media_type,
+        headers={
+            "Content-Disposition": f"attachment; filename={filename_prefix}.{archive_format.extension}",
+            "Vary": "Accept",
+        }
     )
 
 
+def iter_file(bundle_file: BinaryIO, start: int = 0, length: Optional[int] = None) -> Iterator[bytes]:
+    """分块读取已打开的整包文件（从 start 开始读 length 字节，默认读到末尾），读完后关闭"""
+    try:
+        bundle_file.seek(start)
+        remaining = length
+        while remaining is None or remaining > 0:
+            chunk = bundle_file.read(BUNDLE_CHUNK_SIZE if remaining is None else min(BUNDLE_CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            if remaining is not None:
+                remaining -= len(chunk)
+            yield chunk
+    finally:
+        bundle_file.close()
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match 是否命中（弱比较，忽略 W/ 前缀）"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return etag in (tag.strip().removeprefix("W/") for tag in if_none_match.split(","))
+
+
+def parse_range(request: Request, etag: str, size: int) -> Optional[Tuple[int, int]]:
+    """解析单段 Range 头，返回 (起始, 结束) 字节位置（含结束位置）
+
+    没有 Range、多段 Range、格式无法识别或 If-Range 与 ETag 不一致时返回 None（发送完整内容），
+    起始位置超出文件大小时返回 416。
+    """
+    range_header = request.headers.get("range")
+    if not range_header or not range_header.startswith("bytes=") or "," in range_header:
+        return None
+    if_range = request.headers.get("if-range")
+    if if_range and if_range.strip() != etag:
+        return None
+    start_text, _, end_text = range_header[len("bytes="):].strip().partition("-")
+    try:
+        if start_text:
+            start = int(start_text)
+            end = int(end_text) if end_text else size - 1
+        else:
+            # bytes=-N：最后 N 个字节
+            start, end = max(0, size - int(end_text)), size - 1
+    except ValueError:
+        return None
+    if start >= size or end < start:
+        raise HTTPException(
+            status_code=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE,
+            detail="Requested range not satisfiable",
+            headers={"Content-Range": f"bytes */{size}"}
+        )
+    return start, min(end, size - 1)
+
+
+def cache_headers(etag: str) -> Dict[str, str]:
+    """下载响应的缓存头：内容由 ETag 唯一确定，浏览器和 nginx 可缓存，过期后用 If-None-Match 重新校验"""
+    return {
+        "ETag": etag,
+        "Cache-Control": f"public, max-age={settings.DOWNLOAD_CACHE_MAX_AGE_SECONDS}",
+        "Accept-Ranges": "bytes",
+        "Vary": "Accept",
+    }
+
+
+def ranged_response(
+    byte_range: Optional[Tuple[int, int]], size: int, body: Iterator[bytes], headers: Dict[str, str],
+    media_type: str = "application/zip"
+) -> StreamingResponse:
+    """完整内容返回 200，Range 请求返回 206 和 Content-Range；body 只需产出所请求范围内的字节"""
+    status_code = status.HTTP_200_OK
+    length = size
+    if byte_range is not None:
+        start, end = byte_range
+        status_code = status.HTTP_206_PARTIAL_CONTENT
+        length = end - start + 1
+        headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    headers["Content-Length"] = str(length)
+    return StreamingResponse(body, status_code=status_code, media_type=media_type, headers=headers)
+
+
+def iter_converted_bundle(bundle_file: BinaryIO, archive_format: ArchiveFormat) -> Iterator[bytes]:
+    """把已打开的 ZIP 整包流式转换为其他归档格式，读完后关闭"""
+    try:
+        yield from archive_format.stream(iter_bundle_entries(bundle_file))
+    finally:
+        bundle_file.close()
+
+
+def create_bundle_response(
+    request: Request, db: Session, kind: str, key_id: int, archive_format: ArchiveFormat
+) -> Response:
+    """发送分类或标签的整包（见 bundles.BundleCache），支持 If-None-Match
+
+    ZIP 直接发送缓存的整包文件，支持 Range；其他格式从整包文件逐条转换后流式发送，
+    字节同样只取决于整包内容，但长度事先未知，不支持 Range。
+    """
+    opened = bundle_cache.open(db, kind, key_id)
+    if opened is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="No cursor rules found"
+        )
+    bundle, bundle_file = opened
+    etag = f'"{kind}-{key_id}-{bundle.token}.{archive_format.extension}"'
+    headers = cache_headers(etag)
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        bundle_file.close()
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    headers["Content-Disposition"] = f"attachment; filename=cursor-rules-{kind}-{key_id}.{archive_format.extension}"
+    if archive_format.name != "zip":
+        headers["Accept-Ranges"] = "none"
+        return StreamingResponse(
+            iter_converted_bundle(bundle_file, archive_format), media_type=archive_format.media_type, headers=headers
+        )
+    try:
+        byte_range = parse_range(request, etag, bundle.size)
+    except HTTPException:
+        bundle_file.close()
+        raise
+    start, end = byte_range or (0, bundle.size - 1)
+    return ranged_response(byte_range, bundle.size, iter_file(bundle_file, start, end - start + 1), headers)
+
+
 @router.get("/single/{cursor_rule_id}")
-async def download_single(cursor_rule_id: int, db: Session = Depends(get_db)):
-    """单个文件下载"""
-    cursor_rule = db.query(CursorRule).filter(CursorRule.id == cursor_rule_id).first()
+def download_single(
+    cursor_rule_id: int,
+    request: Request,
+    archive_format: ArchiveFormat = Depends(get_archive_format),
+    db: Session = Depends(get_db)
+):
+    """单个文件下载
+
+    归档字节只取决于格式、规则ID、文件名和预压缩数据（含其修改时间），ETag 由这些信息计算，
+    If-None-Match 命中时返回 304；支持 Range 断点续传。
+    """
+    cursor_rule = db.query(CursorRule).filter(
+        CursorRule.id == cursor_rule_id
+    ).first()
     if not cursor_rule:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Cursor rule not found"
         )
     
-    # 增加下载计数
-    cursor_rule.download_count += 1
-    db.commit()
+    ensure_blobs(db, [cursor_rule.id])
+    blob = db.get(RuleContentBlob, cursor_rule.id)
+    entry = (
+        f".cursor/rules/{cursor_rule.filename}.mdc", blob.compressed, blob.method, blob.crc32, blob.size,
+        blob_date_time(blob.updated_at)
+    )
+    digest = hashlib.sha1(repr((entry[0],) + entry[2:]).encode("utf-8")).hexdigest()[:16]
+    etag = f'"rule-{cursor_rule.id}-{digest}.{archive_format.extension}"'
+    headers = cache_headers(etag)
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    archive = b"".join(archive_format.stream([entry]))
+    byte_range = parse_range(request, etag, len(archive))
+    
+    # 增加下载计数（写入聚合器，定期批量落库）；断点续传的后续请求不重复计数
+    if byte_range is None or byte_range[0] == 0:
+        counter_aggregator.increment("download_count", cursor_rule.id)
+        trending.record(cursor_rule.id, cursor_rule.category_id, EVENT_WEIGHTS["download"])
+        site_stats.record_download(
+            cursor_rule.id, cursor_rule.title,
+            counter_aggregator.merged("download_count", cursor_rule.id, cursor_rule.download_count)
+        )
     
-    # 生成ZIP响应
-    return create_zip_response([cursor_rule], "cursor-rule")
+    headers["Content-Disposition"] = f"attachment; filename=cursor-rule-{cursor_rule.id}.{archive_format.extension}"
+    start, end = byte_range or (0, len(archive) - 1)
+    return ranged_response(
+        byte_range, len(archive), iter([archive[start:end + 1]]), headers, archive_format.media_type
+    )
 
 
 @router.post("/batch")
-async def download_batch(
+def download_batch(
     download_data: BatchDownloadRequest,
+    archive_format: ArchiveFormat = Depends(get_archive_format),
     db: Session = Depends(get_db)
 ):
     """批量下载"""
@@ -84,59 +288,75 @@ async def download_batch(
             detail="Some cursor rules not found"
         )
     
-    # 增加下载计数
+    # 增加下载计数（写入聚合器，定期批量落库）
     for cursor_rule in cursor_rules:
-        cursor_rule.download_count += 1
-    db.commit()
+        counter_aggregator.increment("download_count", cursor_rule.id)
+        trending.record(cursor_rule.id, cursor_rule.category_id, EVENT_WEIGHTS["download"])
+        site_stats.record_download(
+            cursor_rule.id, cursor_rule.title,
+            counter_aggregator.merged("download_count", cursor_rule.id, cursor_rule.download_count)
+        )
     
-    # 生成ZIP响应
-    return create_zip_response(cursor_rules, "cursor-rules-batch")
+    # 生成归档响应
+    return create_archive_response(
+        db, [cursor_rule.id for cursor_rule in cursor_rules], archive_format, "cursor-rules-batch"
+    )
+
+
+@router.get("/category/{category_id}")
+def download_category(
+    category_id: int,
+    request: Request,
+    archive_format: ArchiveFormat = Depends(get_archive_format),
+    db: Session = Depends(get_db)
+):
+    """分类整包下载（分类下全部规则，不计入各规则的下载量）"""
+    if not db.query(Category.id).filter(Category.id == category_id).first():
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Category not found"
+        )
+    return create_bundle_response(request, db, "category", category_id, archive_format)
+
+
+@router.get("/tag/{tag_id}")
+def download_tag(
+    tag_id: int,
+    request: Request,
+    archive_format: ArchiveFormat = Depends(get_archive_format),
+    db: Session = Depends(get_db)
+):
+    """标签整包下载（带该标签的全部规则，不计入各规则的下载量）"""
+    if not db.query(Tag.id).filter(Tag.id == tag_id).first():
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Tag not found"
+        )
+    return create_bundle_response(request, db, "tag", tag_id, archive_format)
+
+
+@router.get("/bundle-stats")
+def bundle_stats(current_user: User = Depends(get_current_user)):
+    """整包缓存运行指标（重建次数、复制和重新读取的成员数），内部指标，需要登录"""
+    return bundle_cache.metrics()
 
 
 @router.get("/stats")
-async def download_stats(db: Session = Depends(get_db)):
-    """下载统计"""
-    total_downloads = db.query(func.sum(CursorRule.download_count)).scalar() or 0
-    
-    most_downloaded = db.query(CursorRule).order_by(
-        CursorRule.download_count.desc()
-    ).limit(10).all()
-    
+def download_stats(db: Session = Depends(get_db)):
+    """下载统计（读取内存中的统计快照）"""
     return {
-        "total_downloads": total_downloads,
-        "most_downloaded": [
-            {
-                "id": rule.id,
-                "title": rule.title,
-                "download_count": rule.download_count
-            }
-            for rule in most_downloaded
-        ]
+        "total_downloads": site_stats.totals(db)["total_downloads"],
+        "most_downloaded": site_stats.top_downloads(db)
     }
 
 
+@router.get("/compression-stats")
+def compression_stats(current_user: User = Depends(get_current_user)):
+    """压缩线程池运行指标（队列深度、等待和压缩耗时、被拒绝的任务数），内部指标，需要登录"""
+    return compression_pool.metrics()
+
+
 @router.get("/platform-stats")
-async def platform_stats(db: Session = Depends(get_db)):
-    """平台统计信息"""
-    # 统计总用户数
-    total_users = db.query(User).count()
-    
-    # 统计总规则数
-    total_rules = db.query(CursorRule).count()
-    
-    # 统计总下载数
-    total_downloads = db.query(func.sum(CursorRule.download_count)).scalar() or 0
-    
-    # 统计总分类数
-    total_categories = db.query(Category).count()
-    
-    # 统计总标签数
-    total_tags = db.query(Tag).count()
-    
-    return {
-        "total_users": total_users,
-        "total_rules": total_rules,
-        "total_downloads": total_downloads,
-        "total_categories": total_categories,
-        "total_tags": total_tags
-    } 
\ No newline at end of file
+def platform_stats(db: Session = Depends(get_db)):
+    """平台统计信息（读取内存中的统计快照，详见 stats.PlatformStats）"""
+    return site_stats.totals(db)
@@ -5,20 +5,23 @@ from typing import List
 from ..database import get_db
 from ..schemas import TagCreate, TagResponse, ResponseModel
 from ..auth import get_current_user
+from ..taxonomy import taxonomy_cache
+from ..facets import facet_cache
+from ..stats import site_stats
 from ..models import User, Tag
 
 router = APIRouter()
 
 
 @router.get("", response_model=List[TagResponse])
-async def get_tags(db: Session = Depends(get_db)):
+def get_tags(db: Session = Depends(get_db)):
     """获取所有标签"""
     tags = db.query(Tag).order_by(Tag.created_at.desc()).all()
     return [TagResponse.from_orm(tag) for tag in tags]
 
 
 @router.post("", response_model=ResponseModel)
-async def create_tag(
+def create_tag(
     tag_data: TagCreate,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
@@ -40,6 +43,9 @@ async def create_tag(
     db.add(tag)
     db.commit()
     db.refresh(tag)
+    taxonomy_cache.invalidate()
+    facet_cache.invalidate()
+    site_stats.add("total_tags")
     
     return ResponseModel(
         success=True,
@@ -49,7 +55,7 @@ async def create_tag(
 
 
 @router.get("/{tag_id}", response_model=TagResponse)
-async def get_tag(tag_id: int, db: Session = Depends(get_db)):
+def get_tag(tag_id: int, db: Session = Depends(get_db)):
     """获取单个标签详情"""
     tag = db.query(Tag).filter(Tag.id == tag_id).first()
     if not tag:
@@ -0,0 +1,76 @@
+import zlib
+from datetime import datetime
+from typing import Iterable, Tuple
+
+from sqlalchemy import insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from .compression import compress_bytes, compression_pool
+from .config import settings
+from .models import CursorRule, RuleContentBlob
+from .zipstream import DateTime
+
+# 补齐预压缩数据时的最大尝试次数（并发下载同时补齐同一规则会触发主键冲突）
+_ENSURE_MAX_ATTEMPTS = 3
+
+
+def blob_date_time(updated_at: datetime) -> DateTime:
+    """预压缩数据的修改时间，作为 ZIP 条目时间（同一份数据打包出的字节总是相同）"""
+    # ZIP 的 DOS 时间从1980年开始
+    return max(tuple(updated_at.timetuple()[:6]), (1980, 1, 1, 0, 0, 0))
+
+
+def _zip_entry(data: bytes) -> Tuple[bytes, int, int, int]:
+    """返回 (条目数据, 压缩方法, CRC32, 原文字节数)，短小的正文以 STORED 方式存储"""
+    compressed, method = compress_bytes(data, settings.ZIP_COMPRESS_LEVEL, settings.ZIP_STORE_THRESHOLD_BYTES)
+    return compressed, method, zlib.crc32(data), len(data)
+
+
+def compress_content(content: str) -> Tuple[bytes, int, int, int]:
+    """在压缩线程池中压缩规则正文，结果可直接作为 ZIP 条目（见 _zip_entry）"""
+    return compression_pool.submit(_zip_entry, content.encode("utf-8")).result()
+
+
+def store_blob(db: Session, cursor_rule_id: int, content: str) -> None:
+    """写入或替换规则的预压缩数据（创建、修改正文时在提交事务前调用）"""
+    compressed, method, crc32, size = compress_content(content)
+    blob = db.get(RuleContentBlob, cursor_rule_id)
+    if blob is None:
+        db.add(RuleContentBlob(
+            cursor_rule_id=cursor_rule_id, method=method, crc32=crc32, size=size, compressed=compressed
+        ))
+    else:
+        blob.method, blob.crc32, blob.size, blob.compressed = method, crc32, size, compressed
+
+
+def remove_blob(db: Session, cursor_rule_id: int) -> None:
+    """删除规则的预压缩数据（在提交事务前调用）"""
+    db.query(RuleContentBlob).filter(RuleContentBlob.cursor_rule_id == cursor_rule_id).delete(
+        synchronize_session=False
+    )
+
+
+def ensure_blobs(db: Session, cursor_rule_ids: Iterable[int]) -> int:
+    """为缺少预压缩数据的规则（如迁移前的存量规则）补齐，返回补齐的条数"""
+    cursor_rule_ids = list(cursor_rule_ids)
+    for _ in range(_ENSURE_MAX_ATTEMPTS):
+        missing = db.query(CursorRule.id, CursorRule.content).outerjoin(
+            RuleContentBlob, RuleContentBlob.cursor_rule_id == CursorRule.id
+        ).filter(CursorRule.id.in_(cursor_rule_ids), RuleContentBlob.cursor_rule_id.is_(None)).all()
+        if not missing:
+            return 0
+        # 各规则并行压缩，队列满时等待空位（超时抛出 CompressionBusy）
+        results = compression_pool.map(_zip_entry, [content.encode("utf-8") for _, content in missing])
+        rows = [
+            {"cursor_rule_id": cursor_rule_id, "method": method, "crc32": crc32, "size": size, "compressed": compressed}
+            for (cursor_rule_id, _), (compressed, method, crc32, size) in zip(missing, results)
+        ]
+        try:
+            db.execute(insert(RuleContentBlob), rows)
+            db.commit()
+            return len(rows)
+        except IntegrityError:
+            # 其他请求已补齐部分规则，回滚后重新查询缺少的规则
+            db.rollback()
+    return 0
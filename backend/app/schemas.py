@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import Optional, List
+from typing import Dict, Optional, List
 from datetime import datetime
 
 from .models import VoteType
@@ -124,6 +124,7 @@ class CursorRuleResponse(CursorRuleBase):
     dislikes_count: int = 0
     download_count: int = 0
     view_count: int = 0
+    unique_view_count: int = 0  # 独立访客数（估算值）
     created_at: datetime
     updated_at: datetime
     user_vote: Optional[VoteType] = None
@@ -147,6 +148,7 @@ class CursorRuleListResponse(BaseModel):
     dislikes_count: int = 0
     download_count: int = 0
     view_count: int = 0
+    unique_view_count: int = 0  # 独立访客数（估算值）
     created_at: datetime
     
     # 关联数据
@@ -154,6 +156,9 @@ class CursorRuleListResponse(BaseModel):
     category: Optional[CategoryResponse] = None
     tags: List[TagResponse] = []
     
+    # 当前用户投票状态（include_user_vote=true 时填充）
+    user_vote: Optional[VoteType] = None
+    
     class Config:
         from_attributes = True
 
@@ -165,13 +170,23 @@ class PaginationParams(BaseModel):
     size: int = Field(20, ge=1, le=100, description="每页大小")
 
 
+class FacetCount(BaseModel):
+    """分面统计项"""
+    id: int
+    name: str
+    count: int
+
+
 class PaginatedResponse(BaseModel):
     """分页响应模型"""
     items: List[dict]
-    total: int
+    total: Optional[int] = None  # with_total=false 时为空
     page: int
     size: int
-    pages: int
+    pages: Optional[int] = None
+    total_estimated: bool = False  # 总数是否为表统计估算值
+    next_cursor: Optional[str] = None
+    facets: Optional[Dict[str, List[FacetCount]]] = None  # 按 facets 参数返回的分面统计
 
 
 # 搜索和筛选模型
@@ -211,4 +226,27 @@ class StatsResponse(BaseModel):
     total_downloads: int
     total_users: int
     total_categories: int
-    total_tags: int
\ No newline at end of file
+    total_tags: int
+
+
+# 增量同步模型
+class RuleChangeItem(BaseModel):
+    """规则变更：deleted 为 true 时是墓碑，只有 id 和 seq"""
+    seq: int
+    id: int
+    deleted: bool = False
+    title: Optional[str] = None
+    filename: Optional[str] = None
+    description: Optional[str] = None
+    content: Optional[str] = None
+    category_id: Optional[int] = None
+    tag_ids: List[int] = []
+    updated_at: Optional[datetime] = None
+
+
+class ChangesResponse(BaseModel):
+    """增量同步响应：客户端保存 next_since，下次以其作为 since 请求；has_more 为 true 时继续拉取"""
+    items: List[RuleChangeItem]
+    next_since: int
+    has_more: bool
+    latest_seq: int
@@ -0,0 +1,379 @@
+import math
+import re
+import threading
+import time
+from collections import Counter, defaultdict
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import or_, text
+from sqlalchemy.orm import Session
+
+from .config import settings
+from .models import CursorRule
+
+# 字段权重：标题 > 描述 > 内容
+FIELD_WEIGHTS = {"title": 3.0, "description": 2.0, "content": 1.0}
+
+# BM25参数
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# 中日韩字符范围
+_CJK = "\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff\uac00-\ud7af"
+_TOKEN_RE = re.compile(rf"[{_CJK}]+|[^\W_{_CJK}]+")
+_CJK_RE = re.compile(rf"[{_CJK}]")
+
+
+def tokenize(value: Optional[str]) -> List[str]:
+    """分词：中日韩文本切分为二元组（bigram），其余按单词小写切分
+
+    中日韩连续片段末尾额外输出一个单字，保证每个字都是某个词元的首字，
+    单字查询可以按前缀命中。
+    """
+    tokens = []
+    for match in _TOKEN_RE.finditer(value or ""):
+        chunk = match.group()
+        if _CJK_RE.match(chunk):
+            tokens.extend(chunk[i:i + 2] for i in range(len(chunk) - 1))
+            tokens.append(chunk[-1])
+        else:
+            tokens.append(chunk.lower())
+    return tokens
+
+
+def _query_terms(keyword: str) -> List[Tuple[str, bool]]:
+    """查询分词（去重并保持顺序），返回 (词元, 是否按前缀匹配)
+
+    单个中日韩字符无法匹配二元组，按前缀查询；最后一个拉丁词元按前缀查询，
+    输入中的半个单词（如 Fast）也能命中完整单词（FastAPI）。
+    """
+    terms = list(dict.fromkeys(tokenize(keyword)))
+    latin = [term for term in terms if not _CJK_RE.match(term)]
+    last_latin = latin[-1] if latin else None
+    return [(term, term == last_latin or (len(term) == 1 and bool(_CJK_RE.match(term)))) for term in terms]
+
+
+def _like_search(db: Session, keyword: str, limit: Optional[int]) -> List[Tuple[int, float]]:
+    """没有可检索词元的关键词（如只有标点符号）按子串匹配标题、描述和内容，新规则在前"""
+    keyword = keyword.strip()
+    if not keyword:
+        return []
+    pattern = "%" + re.sub(r"([\\%_])", r"\\\1", keyword) + "%"
+    query = db.query(CursorRule.id).filter(or_(
+        CursorRule.title.like(pattern, escape="\\"),
+        CursorRule.description.like(pattern, escape="\\"),
+        CursorRule.content.like(pattern, escape="\\"),
+    )).order_by(CursorRule.id.desc())
+    if limit is not None:
+        query = query.limit(limit)
+    return [(rule_id, 0.0) for rule_id, in query]
+
+
+class SearchBackend:
+    """检索后端基类"""
+    name = "base"
+
+    def setup(self, db: Session) -> None:
+        """初始化索引结构，必要时全量重建"""
+
+    def rebuild(self, db: Session) -> None:
+        """全量重建索引"""
+
+    def index_rule(self, db: Session, cursor_rule: CursorRule) -> None:
+        """写入或更新单条规则的索引"""
+
+    def remove_rule(self, db: Session, cursor_rule_id: int) -> None:
+        """删除单条规则的索引"""
+
+    def search(self, db: Session, keyword: str, limit: Optional[int] = None) -> List[Tuple[int, float]]:
+        """检索，返回按相关度降序排列的 (规则ID, 分数) 列表；limit 为 None 时返回全部命中"""
+        raise NotImplementedError
+
+
+class MySQLSearchBackend(SearchBackend):
+    """MySQL FULLTEXT 索引（ngram 分词器），索引由 InnoDB 自动维护"""
+    name = "mysql"
+    index_name = "ft_cursor_rules"
+
+    def setup(self, db: Session) -> None:
+        exists = db.execute(text(
+            "SELECT COUNT(*) FROM information_schema.statistics "
+            "WHERE table_schema = DATABASE() AND table_name = 'cursor_rules' "
+            "AND index_name = :index_name"
+        ), {"index_name": self.index_name}).scalar()
+        if not exists:
+            db.execute(text(
+                f"ALTER TABLE cursor_rules ADD FULLTEXT INDEX {self.index_name} "
+                "(title, description, content) WITH PARSER ngram"
+            ))
+            db.commit()
+
+    def search(self, db: Session, keyword: str, limit: Optional[int] = None) -> List[Tuple[int, float]]:
+        words = list(dict.fromkeys(w.replace('"', "") for w in keyword.split()))
+        words = [w for w in words if w]
+        if not words:
+            return []
+        # 短于 ngram 词元长度的词（如单个汉字）不在全文索引中，改用 LIKE 匹配；
+        # 长词按短语匹配 ngram，本身就能命中单词中的片段（如 Fast 命中 FastAPI）
+        token_size = settings.SEARCH_NGRAM_TOKEN_SIZE
+        # 只有标点符号的词不产生 ngram 词元，同样用 LIKE 匹配
+        long_words = [w for w in words if len(w) >= token_size and _TOKEN_RE.search(w)]
+        short_words = [w for w in words if w not in long_words]
+
+        params = {}
+        conditions = []
+        if long_words:
+            # 布尔模式：每个词都必须出现，双引号让 ngram 按短语匹配
+            params["q"] = " ".join(f'+"{w}"' for w in long_words)
+            score = "MATCH(title, description, content) AGAINST (:q IN BOOLEAN MODE)"
+            conditions.append(score)
+        else:
+            score = "0"
+        for index, word in enumerate(short_words):
+            params[f"w{index}"] = "%" + re.sub(r"([\\%_])", r"\\\1", word) + "%"
+            conditions.append(
+                f"(title LIKE :w{index} OR description LIKE :w{index} OR content LIKE :w{index})"
+            )
+        sql = (
+            f"SELECT id, {score} AS score FROM cursor_rules "
+            f"WHERE {' AND '.join(conditions)} ORDER BY score DESC, id DESC"
+        )
+        if limit is not None:
+            sql += " LIMIT :limit"
+            params["limit"] = limit
+        rows = db.execute(text(sql), params).all()
+        return [(row.id, float(row.score)) for row in rows]
+
+
+class SQLiteSearchBackend(SearchBackend):
+    """SQLite FTS5 虚拟表，写入预分词文本，使用内置 bm25() 排序"""
+    name = "sqlite"
+    table_name = "cursor_rules_fts"
+
+    def setup(self, db: Session) -> None:
+        db.execute(text(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {self.table_name} "
+            "USING fts5(title, description, content)"
+        ))
+        db.commit()
+        indexed = db.execute(text(f"SELECT COUNT(*) FROM {self.table_name}")).scalar()
+        total = db.query(CursorRule).count()
+        if indexed != total:
+            self.rebuild(db)
+
+    def rebuild(self, db: Session) -> None:
+        db.execute(text(f"DELETE FROM {self.table_name}"))
+        rows = db.query(
+            CursorRule.id, CursorRule.title, CursorRule.description, CursorRule.content
+        ).yield_per(500)
+        for row in rows:
+            self._insert(db, row)
+        db.commit()
+
+    def _insert(self, db: Session, cursor_rule) -> None:
+        db.execute(text(
+            f"INSERT INTO {self.table_name} (rowid, title, description, content) "
+            "VALUES (:id, :title, :description, :content)"
+        ), {
+            "id": cursor_rule.id,
+            "title": " ".join(tokenize(cursor_rule.title)),
+            "description": " ".join(tokenize(cursor_rule.description)),
+            "content": " ".join(tokenize(cursor_rule.content)),
+        })
+
+    def index_rule(self, db: Session, cursor_rule: CursorRule) -> None:
+        self.remove_rule(db, cursor_rule.id)
+        self._insert(db, cursor_rule)
+
+    def remove_rule(self, db: Session, cursor_rule_id: int) -> None:
+        db.execute(text(f"DELETE FROM {self.table_name} WHERE rowid = :id"), {"id": cursor_rule_id})
+
+    def search(self, db: Session, keyword: str, limit: Optional[int] = None) -> List[Tuple[int, float]]:
+        terms = _query_terms(keyword)
+        if not terms:
+            return _like_search(db, keyword, limit)
+        match = " AND ".join(f'"{term}"*' if prefix else f'"{term}"' for term, prefix in terms)
+        weights = ", ".join(str(w) for w in FIELD_WEIGHTS.values())
+        # LIMIT -1 即不限制
+        rows = db.execute(text(
+            f"SELECT rowid AS id, bm25({self.table_name}, {weights}) AS score "
+            f"FROM {self.table_name} WHERE {self.table_name} MATCH :match "
+            "ORDER BY score, rowid DESC LIMIT :limit"
+        ), {"match": match, "limit": -1 if limit is None else limit}).all()
+        # bm25() 越小越相关，取反后与其他后端保持一致
+        return [(row.id, -float(row.score)) for row in rows]
+
+
+class MemorySearchBackend(SearchBackend):
+    """进程内倒排索引（BM25F 简化版），用于不支持原生全文索引的数据库
+
+    本进程的增删改在提交前同步更新索引；其他 worker 的写入靠定期全量重建兜底。
+    """
+    name = "memory"
+
+    def __init__(self, refresh_seconds: Optional[int] = None):
+        self.refresh_seconds = settings.SEARCH_MEMORY_REFRESH_SECONDS if refresh_seconds is None else refresh_seconds
+        self._lock = threading.RLock()
+        self._load_lock = threading.Lock()
+        self._postings: Dict[str, Dict[int, float]] = defaultdict(dict)
+        self._doc_terms: Dict[int, Dict[str, float]] = {}
+        self._doc_len: Dict[int, float] = {}
+        self._total_len = 0.0
+        self._loaded_at: Optional[float] = None
+
+    def setup(self, db: Session) -> None:
+        self.rebuild(db)
+
+    def rebuild(self, db: Session) -> None:
+        # 在新实例上构建，完成后整体替换，重建期间检索继续使用旧索引
+        fresh = MemorySearchBackend(self.refresh_seconds)
+        rows = db.query(
+            CursorRule.id, CursorRule.title, CursorRule.description, CursorRule.content
+        ).yield_per(500)
+        for row in rows:
+            fresh._add(row)
+        with self._lock:
+            self._postings = fresh._postings
+            self._doc_terms = fresh._doc_terms
+            self._doc_len = fresh._doc_len
+            self._total_len = fresh._total_len
+            self._loaded_at = time.monotonic()
+
+    def _ensure(self, db: Session) -> None:
+        loaded_at = self._loaded_at
+        if loaded_at is not None and time.monotonic() - loaded_at <= self.refresh_seconds:
+            return
+        # 只由一个线程重建；已有索引时其他线程不等待，继续使用旧索引
+        if not self._load_lock.acquire(blocking=loaded_at is None):
+            return
+        try:
+            if self._loaded_at == loaded_at:
+                self.rebuild(db)
+        finally:
+            self._load_lock.release()
+
+    def _add(self, cursor_rule) -> None:
+        weighted = Counter()
+        for field, weight in FIELD_WEIGHTS.items():
+            for token in tokenize(getattr(cursor_rule, field)):
+                weighted[token] += weight
+        for term, tf in weighted.items():
+            self._postings[term][cursor_rule.id] = tf
+        self._doc_terms[cursor_rule.id] = dict(weighted)
+        self._doc_len[cursor_rule.id] = sum(weighted.values())
+        self._total_len += self._doc_len[cursor_rule.id]
+
+    def _remove(self, cursor_rule_id: int) -> None:
+        terms = self._doc_terms.pop(cursor_rule_id, None)
+        if terms is None:
+            return
+        for term in terms:
+            postings = self._postings.get(term)
+            if postings is not None:
+                postings.pop(cursor_rule_id, None)
+                if not postings:
+                    del self._postings[term]
+        self._total_len -= self._doc_len.pop(cursor_rule_id)
+
+    def index_rule(self, db: Session, cursor_rule: CursorRule) -> None:
+        with self._lock:
+            self._remove(cursor_rule.id)
+            self._add(cursor_rule)
+
+    def remove_rule(self, db: Session, cursor_rule_id: int) -> None:
+        with self._lock:
+            self._remove(cursor_rule_id)
+
+    def _term_postings(self, term: str, prefix: bool) -> Dict[int, float]:
+        if not prefix:
+            return self._postings.get(term, {})
+        merged: Dict[int, float] = defaultdict(float)
+        for candidate, postings in self._postings.items():
+            if candidate.startswith(term):
+                for doc_id, tf in postings.items():
+                    merged[doc_id] += tf
+        return merged
+
+    def search(self, db: Session, keyword: str, limit: Optional[int] = None) -> List[Tuple[int, float]]:
+        terms = _query_terms(keyword)
+        if not terms:
+            return _like_search(db, keyword, limit)
+        self._ensure(db)
+        with self._lock:
+            doc_count = len(self._doc_len)
+            if not doc_count:
+                return []
+            avg_len = self._total_len / doc_count
+            term_postings = sorted((self._term_postings(term, prefix) for term, prefix in terms), key=len)
+            # 所有词都必须命中，从最短的倒排链开始求交
+            candidates = set(term_postings[0])
+            for postings in term_postings[1:]:
+                candidates.intersection_update(postings)
+                if not candidates:
+                    return []
+            scores = dict.fromkeys(candidates, 0.0)
+            for postings in term_postings:
+                idf = math.log(1 + (doc_count - len(postings) + 0.5) / (len(postings) + 0.5))
+                for doc_id in candidates:
+                    tf = postings[doc_id]
+                    norm = BM25_K1 * (1 - BM25_B + BM25_B * self._doc_len[doc_id] / avg_len)
+                    scores[doc_id] += idf * tf * (BM25_K1 + 1) / (tf + norm)
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], -item[0]))
+        return ranked if limit is None else ranked[:limit]
+
+
+_BACKENDS = {
+    "mysql": MySQLSearchBackend,
+    "sqlite": SQLiteSearchBackend,
+    "memory": MemorySearchBackend,
+}
+
+
+class SearchEngine:
+    """全文检索入口，按数据库方言选择后端"""
+
+    def __init__(self):
+        self.backend: Optional[SearchBackend] = None
+        self._lock = threading.Lock()
+
+    def _select_backend(self, db: Session) -> SearchBackend:
+        name = settings.SEARCH_BACKEND
+        if name == "auto":
+            name = db.get_bind().dialect.name
+        backend = _BACKENDS.get(name, MemorySearchBackend)()
+        try:
+            backend.setup(db)
+        except Exception:
+            # 原生全文索引不可用（如未编译FTS5、无ngram解析器）时回退到进程内索引
+            db.rollback()
+            if isinstance(backend, MemorySearchBackend):
+                raise
+            backend = MemorySearchBackend()
+            backend.setup(db)
+        return backend
+
+    def init(self, db: Session) -> None:
+        """初始化检索后端（应用启动时调用）"""
+        with self._lock:
+            self.backend = self._select_backend(db)
+
+    def _get_backend(self, db: Session) -> SearchBackend:
+        if self.backend is None:
+            self.init(db)
+        return self.backend
+
+    def index_rule(self, db: Session, cursor_rule: CursorRule) -> None:
+        """写入规则索引（在提交事务前调用）"""
+        self._get_backend(db).index_rule(db, cursor_rule)
+
+    def remove_rule(self, db: Session, cursor_rule_id: int) -> None:
+        """删除规则索引（在提交事务前调用）"""
+        self._get_backend(db).remove_rule(db, cursor_rule_id)
+
+    def search(self, db: Session, keyword: str, limit: Optional[int] = None) -> List[Tuple[int, float]]:
+        """检索关键词，返回按相关度降序排列的 (规则ID, 分数) 列表；limit 为 None 时返回全部命中"""
+        return self._get_backend(db).search(db, keyword, limit)
+
+
+# 全局检索引擎实例
+search_engine = SearchEngine()
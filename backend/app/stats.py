@@ -0,0 +1,161 @@
+import asyncio
+import logging
+import threading
+import time
+from typing import Dict, List, Optional
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from .config import settings
+from .counters import counter_aggregator
+from .database import SessionLocal
+from .models import Category, CursorRule, Tag, User
+
+logger = logging.getLogger(__name__)
+
+# 下载排行的条数
+TOP_DOWNLOADS_LIMIT = 10
+
+
+class PlatformStats:
+    """平台统计快照
+
+    总数和下载排行保存在内存中，注册、创建规则/分类/标签、下载时由写路径增量更新，读取不查询数据库。
+    后台任务每 max_staleness / 2 秒全量重算一次，校正其他 worker 的写入和增量误差；
+    读取时快照缺失或超过该时长未重算（如后台任务失败）则同步重算，因此数据最多滞后 max_staleness 秒。
+    """
+
+    def __init__(self, max_staleness: float):
+        self.max_staleness = max_staleness
+        self._lock = threading.Lock()
+        self._recompute_lock = threading.Lock()
+        self._totals: Optional[Dict[str, int]] = None
+        # 下载排行：按下载量从高到低的 [id, 标题, 下载量]
+        self._top: List[list] = []
+        self._top_stale = False
+        self._computed_at = 0.0
+        self._task: Optional[asyncio.Task] = None
+
+    def recompute(self, db: Session) -> None:
+        """全量重算所有统计"""
+        with self._recompute_lock:
+            started = time.monotonic()
+            totals = {
+                "total_users": db.query(func.count(User.id)).scalar(),
+                "total_rules": db.query(func.count(CursorRule.id)).scalar(),
+                "total_downloads": (db.query(func.sum(CursorRule.download_count)).scalar() or 0)
+                + counter_aggregator.pending_total("download_count"),
+                "total_categories": db.query(func.count(Category.id)).scalar(),
+                "total_tags": db.query(func.count(Tag.id)).scalar(),
+            }
+            top = [
+                [rule_id, title, counter_aggregator.merged("download_count", rule_id, download_count)]
+                for rule_id, title, download_count in db.query(
+                    CursorRule.id, CursorRule.title, CursorRule.download_count
+                ).order_by(CursorRule.download_count.desc()).limit(TOP_DOWNLOADS_LIMIT)
+            ]
+            top.sort(key=lambda entry: entry[2], reverse=True)
+            with self._lock:
+                self._totals = totals
+                self._top = top
+                self._top_stale = False
+                self._computed_at = started
+
+    def _ensure(self, db: Session) -> None:
+        with self._lock:
+            fresh = (
+                self._totals is not None and not self._top_stale
+                and time.monotonic() - self._computed_at <= self.max_staleness
+            )
+        if not fresh:
+            self.recompute(db)
+
+    def totals(self, db: Session) -> Dict[str, int]:
+        """平台总数"""
+        self._ensure(db)
+        with self._lock:
+            return dict(self._totals)
+
+    def top_downloads(self, db: Session) -> List[dict]:
+        """下载最多的规则"""
+        self._ensure(db)
+        with self._lock:
+            return [
+                {"id": rule_id, "title": title, "download_count": count}
+                for rule_id, title, count in self._top
+            ]
+
+    def add(self, field: str, n: int = 1) -> None:
+        """写路径提交后增量更新总数（快照尚未加载时忽略，首次读取会全量计算）"""
+        with self._lock:
+            if self._totals is not None:
+                self._totals[field] += n
+
+    def record_download(self, rule_id: int, title: str, download_count: int) -> None:
+        """记录一次下载，download_count 为计入本次下载后的下载量"""
+        with self._lock:
+            if self._totals is None:
+                return
+            self._totals["total_downloads"] += 1
+            for entry in self._top:
+                if entry[0] == rule_id:
+                    entry[1], entry[2] = title, max(entry[2], download_count)
+                    break
+            else:
+                # 下载量只增不减，超过榜尾即可直接入榜
+                if len(self._top) >= TOP_DOWNLOADS_LIMIT and download_count <= self._top[-1][2]:
+                    return
+                self._top.append([rule_id, title, download_count])
+            self._top.sort(key=lambda entry: entry[2], reverse=True)
+            del self._top[TOP_DOWNLOADS_LIMIT:]
+
+    def update_rule(self, rule_id: int, title: str) -> None:
+        """规则改名后同步下载排行"""
+        with self._lock:
+            for entry in self._top:
+                if entry[0] == rule_id:
+                    entry[1] = title
+
+    def remove_rule(self, rule_id: int, download_count: int) -> None:
+        """删除规则后扣减总数；排行中的规则被删除时，下次读取重算排行"""
+        with self._lock:
+            if self._totals is None:
+                return
+            self._totals["total_rules"] -= 1
+            self._totals["total_downloads"] -= download_count
+            if any(entry[0] == rule_id for entry in self._top):
+                self._top_stale = True
+
+    def _recompute_in_session(self) -> None:
+        db = SessionLocal()
+        try:
+            self.recompute(db)
+        finally:
+            db.close()
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.max_staleness / 2)
+            try:
+                await asyncio.to_thread(self._recompute_in_session)
+            except Exception:
+                logger.exception("平台统计重算失败，下个周期重试")
+
+    def start(self) -> None:
+        """启动后台定期重算任务（需在事件循环中调用）"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+# 全局平台统计实例
+site_stats = PlatformStats(settings.STATS_MAX_STALENESS_SECONDS)
@@ -0,0 +1,307 @@
+import re
+import threading
+import time
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import and_, not_, or_, select
+from sqlalchemy.orm import Session
+
+from .config import settings
+from .models import CursorRule, CursorRuleTag
+
+# 标签表达式语法树：("tag", 标签ID) / ("and", 子式...) / ("or", 子式...) / ("not", 子式)
+TagExpr = tuple
+
+_EXPR_TOKEN_RE = re.compile(r"\s*(\d+|\(|\)|&|\||!|-|and\b|or\b|not\b)", re.IGNORECASE)
+_OPERATORS = {"&": "and", "|": "or", "!": "not", "-": "not"}
+
+# 每个字节值对应的置位下标，位图转ID列表时按字节查表
+_BYTE_BITS = [tuple(bit for bit in range(8) if value >> bit & 1) for value in range(256)]
+
+
+def parse_tag_expression(text: str) -> TagExpr:
+    """解析标签表达式
+
+    支持 and/&、or/|、not/!/-、括号，优先级 not > and > or，
+    例如 "1 and (2 or 3) and not 4"。格式错误时抛出 ValueError。
+    """
+    tokens = []
+    position = 0
+    text = text.strip()
+    while position < len(text):
+        match = _EXPR_TOKEN_RE.match(text, position)
+        if not match:
+            raise ValueError(f"unexpected character at {position}")
+        token = match.group(1).lower()
+        tokens.append(_OPERATORS.get(token, token))
+        position = match.end()
+        while position < len(text) and text[position].isspace():
+            position += 1
+    if not tokens:
+        raise ValueError("empty expression")
+
+    def parse_or(index):
+        node, index = parse_and(index)
+        children = [node]
+        while index < len(tokens) and tokens[index] == "or":
+            node, index = parse_and(index + 1)
+            children.append(node)
+        return (children[0] if len(children) == 1 else ("or", *children)), index
+
+    def parse_and(index):
+        node, index = parse_not(index)
+        children = [node]
+        while index < len(tokens) and tokens[index] == "and":
+            node, index = parse_not(index + 1)
+            children.append(node)
+        return (children[0] if len(children) == 1 else ("and", *children)), index
+
+    def parse_not(index):
+        if index < len(tokens) and tokens[index] == "not":
+            node, index = parse_not(index + 1)
+            return ("not", node), index
+        return parse_atom(index)
+
+    def parse_atom(index):
+        if index >= len(tokens):
+            raise ValueError("unexpected end of expression")
+        token = tokens[index]
+        if token == "(":
+            node, index = parse_or(index + 1)
+            if index >= len(tokens) or tokens[index] != ")":
+                raise ValueError("missing closing parenthesis")
+            return node, index + 1
+        if token.isdigit():
+            return ("tag", int(token)), index + 1
+        raise ValueError(f"unexpected token {token!r}")
+
+    expr, index = parse_or(0)
+    if index != len(tokens):
+        raise ValueError(f"unexpected token {tokens[index]!r}")
+    return expr
+
+
+def tag_expression_sql(expr: TagExpr):
+    """把标签表达式编译为 SQL 条件（每个标签一个半连接，结果集过大时使用）"""
+    kind = expr[0]
+    if kind == "tag":
+        return CursorRule.id.in_(select(CursorRuleTag.cursor_rule_id).where(CursorRuleTag.tag_id == expr[1]))
+    if kind == "not":
+        return not_(tag_expression_sql(expr[1]))
+    children = [tag_expression_sql(child) for child in expr[1:]]
+    return and_(*children) if kind == "and" else or_(*children)
+
+
+def bitmap_ids(bits: int) -> List[int]:
+    """位图转为升序ID列表"""
+    ids = []
+    data = bits.to_bytes((bits.bit_length() + 7) // 8, "little")
+    for offset, byte in enumerate(data):
+        if byte:
+            base = offset * 8
+            ids.extend(base + bit for bit in _BYTE_BITS[byte])
+    return ids
+
+
+def ids_bitmap(ids: Iterable[int]) -> int:
+    """ID集合转为位图（先写入字节数组再整体转换，避免逐个对大整数做位或）"""
+    ids = list(ids)
+    if not ids:
+        return 0
+    data = bytearray(max(ids) // 8 + 1)
+    for rule_id in ids:
+        data[rule_id >> 3] |= 1 << (rule_id & 7)
+    return int.from_bytes(data, "little")
+
+
+def build_tag_filter(
+    tag_ids: Optional[Iterable[int]] = None, match_all: bool = False, expression: Optional[str] = None
+) -> Optional[TagExpr]:
+    """组合标签ID列表（任一/全部匹配）和标签表达式，无标签条件时返回 None"""
+    parts = []
+    tag_ids = sorted(set(tag_ids or ()))
+    if tag_ids:
+        leaves = [("tag", tag_id) for tag_id in tag_ids]
+        parts.append(leaves[0] if len(leaves) == 1 else ("and" if match_all else "or", *leaves))
+    if expression and expression.strip():
+        parts.append(parse_tag_expression(expression))
+    if not parts:
+        return None
+    return parts[0] if len(parts) == 1 else ("and", *parts)
+
+
+class TagIndex:
+    """标签倒排索引（进程内位图）
+
+    每个标签、分类维护一个以规则ID为位下标的位图（Python 大整数），
+    标签的与/或/非和分类筛选都是整数位运算，结果的计数即 popcount，不需要访问数据库。
+    作者的规则数少且作者数量多，按集合存储，筛选时再转为位图。
+
+    本进程的增删改在提交后同步更新索引；其他 worker 的写入靠定期全量重建兜底。
+    """
+
+    def __init__(self, refresh_seconds: int):
+        self.refresh_seconds = refresh_seconds
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+        self._all = 0
+        self._tags: Dict[int, int] = defaultdict(int)
+        self._categories: Dict[int, int] = defaultdict(int)
+        self._authors: Dict[int, Set[int]] = defaultdict(set)
+        self._rules: Dict[int, Tuple[int, int, Tuple[int, ...]]] = {}
+        self._loaded_at: Optional[float] = None
+
+    def load(self, db: Session) -> None:
+        """从数据库全量构建索引"""
+        rule_tags: Dict[int, List[int]] = defaultdict(list)
+        for cursor_rule_id, tag_id in db.query(CursorRuleTag.cursor_rule_id, CursorRuleTag.tag_id).order_by(
+            CursorRuleTag.id
+        ):
+            rule_tags[cursor_rule_id].append(tag_id)
+        rules = {
+            rule_id: (category_id, author_id, tuple(rule_tags.get(rule_id, ())))
+            for rule_id, category_id, author_id in db.query(
+                CursorRule.id, CursorRule.category_id, CursorRule.author_id
+            )
+        }
+
+        # 先按分组收集ID再一次性转位图
+        tag_members: Dict[int, List[int]] = defaultdict(list)
+        category_members: Dict[int, List[int]] = defaultdict(list)
+        authors: Dict[int, Set[int]] = defaultdict(set)
+        for rule_id, (category_id, author_id, tag_ids) in rules.items():
+            category_members[category_id].append(rule_id)
+            authors[author_id].add(rule_id)
+            for tag_id in tag_ids:
+                tag_members[tag_id].append(rule_id)
+
+        with self._lock:
+            self._rules = rules
+            self._all = ids_bitmap(rules)
+            self._tags = defaultdict(int, {tid: ids_bitmap(ids) for tid, ids in tag_members.items()})
+            self._categories = defaultdict(
+                int, {cid: ids_bitmap(ids) for cid, ids in category_members.items()}
+            )
+            self._authors = authors
+            self._loaded_at = time.monotonic()
+
+    def _ensure(self, db: Session) -> None:
+        loaded_at = self._loaded_at
+        if loaded_at is not None and time.monotonic() - loaded_at <= self.refresh_seconds:
+            return
+        # 只由一个线程重建；已有索引时其他线程不等待，继续使用旧索引
+        if not self._load_lock.acquire(blocking=loaded_at is None):
+            return
+        try:
+            if self._loaded_at == loaded_at:
+                self.load(db)
+        finally:
+            self._load_lock.release()
+
+    def _clear(self, rule_id: int) -> None:
+        entry = self._rules.pop(rule_id, None)
+        if entry is None:
+            return
+        category_id, author_id, tag_ids = entry
+        mask = ~(1 << rule_id)
+        self._all &= mask
+        self._categories[category_id] &= mask
+        self._authors[author_id].discard(rule_id)
+        for tag_id in tag_ids:
+            self._tags[tag_id] &= mask
+
+    def update_rule(
+        self, rule_id: int, category_id: int, author_id: int, tag_ids: Optional[Iterable[int]] = None
+    ) -> None:
+        """写入或更新规则（在提交事务后调用）；tag_ids 为 None 时保留原有标签"""
+        with self._lock:
+            if tag_ids is None:
+                tag_ids = self._rules.get(rule_id, (None, None, ()))[2]
+            tag_ids = tuple(dict.fromkeys(tag_ids))
+            self._clear(rule_id)
+            bit = 1 << rule_id
+            self._rules[rule_id] = (category_id, author_id, tag_ids)
+            self._all |= bit
+            self._categories[category_id] |= bit
+            self._authors[author_id].add(rule_id)
+            for tag_id in tag_ids:
+                self._tags[tag_id] |= bit
+
+    def remove_rule(self, rule_id: int) -> None:
+        """删除规则（在提交事务后调用）"""
+        with self._lock:
+            self._clear(rule_id)
+
+    def _evaluate(self, expr: TagExpr) -> int:
+        kind = expr[0]
+        if kind == "tag":
+            return self._tags.get(expr[1], 0)
+        if kind == "not":
+            return self._all & ~self._evaluate(expr[1])
+        bits = self._evaluate(expr[1])
+        for child in expr[2:]:
+            if kind == "and":
+                bits &= self._evaluate(child)
+            else:
+                bits |= self._evaluate(child)
+        return bits
+
+    def _base(self, expr: Optional[TagExpr], author_id: Optional[int]) -> int:
+        bits = self._evaluate(expr) if expr is not None else self._all
+        if author_id:
+            bits &= ids_bitmap(self._authors.get(author_id, ()))
+        return bits
+
+    def select(
+        self,
+        db: Session,
+        expr: Optional[TagExpr] = None,
+        category_id: Optional[int] = None,
+        author_id: Optional[int] = None,
+    ) -> int:
+        """按标签表达式、分类、作者筛选，返回命中规则的位图"""
+        self._ensure(db)
+        with self._lock:
+            bits = self._base(expr, author_id)
+            if category_id:
+                bits &= self._categories.get(category_id, 0)
+        return bits
+
+    def facet_counts(
+        self,
+        db: Session,
+        fields: Iterable[str],
+        expr: Optional[TagExpr] = None,
+        category_id: Optional[int] = None,
+        author_id: Optional[int] = None,
+        restrict: Optional[int] = None,
+    ) -> Dict[str, Dict[int, int]]:
+        """统计筛选结果在各分类、各标签下的规则数（restrict 为额外的ID位图，如关键词命中）
+
+        筛选条件只求值一次，每个分面值再做一次位与和 popcount。
+        分类分面不应用当前的分类筛选，便于展示切换到其他分类后的数量。
+        """
+        self._ensure(db)
+        counts: Dict[str, Dict[int, int]] = {}
+        with self._lock:
+            bits = self._base(expr, author_id)
+            if restrict is not None:
+                bits &= restrict
+            if "category" in fields:
+                counts["category"] = {
+                    cid: count for cid, cat_bits in self._categories.items()
+                    if (count := (bits & cat_bits).bit_count())
+                }
+            if category_id:
+                bits &= self._categories.get(category_id, 0)
+            if "tag" in fields:
+                counts["tag"] = {
+                    tid: count for tid, tag_bits in self._tags.items()
+                    if (count := (bits & tag_bits).bit_count())
+                }
+        return counts
+
+
+# 全局标签索引实例
+tag_index = TagIndex(settings.TAG_INDEX_REFRESH_SECONDS)
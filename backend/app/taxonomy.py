@@ -0,0 +1,59 @@
+import threading
+import time
+from typing import Dict, Iterable, Optional
+
+from sqlalchemy.orm import Session
+
+from .config import settings
+from .models import Category, Tag
+from .schemas import CategoryResponse, TagResponse
+
+
+class TaxonomyCache:
+    """分类与标签的进程内缓存
+
+    分类和标签数量少、读多写少，列表页直接从内存组装，不再逐页关联查询。
+    本进程创建分类/标签时主动失效，TTL 兜底其他 worker 的写入；
+    查询到缓存中不存在的ID时也会立即重新加载。
+    """
+
+    def __init__(self, ttl: int):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._categories: Dict[int, CategoryResponse] = {}
+        self._tags: Dict[int, TagResponse] = {}
+        self._loaded_at: Optional[float] = None
+
+    def _load(self, db: Session) -> None:
+        self._categories = {
+            category.id: CategoryResponse.from_orm(category) for category in db.query(Category).all()
+        }
+        self._tags = {tag.id: TagResponse.from_orm(tag) for tag in db.query(Tag).all()}
+        self._loaded_at = time.monotonic()
+
+    def _ensure(self, db: Session, category_ids: Iterable[int] = (), tag_ids: Iterable[int] = ()) -> None:
+        with self._lock:
+            expired = self._loaded_at is None or time.monotonic() - self._loaded_at > self.ttl
+            missing = any(cid not in self._categories for cid in category_ids) or \
+                any(tid not in self._tags for tid in tag_ids)
+            if expired or missing:
+                self._load(db)
+
+    def categories(self, db: Session, category_ids: Iterable[int] = ()) -> Dict[int, CategoryResponse]:
+        """获取分类映射，确保包含指定ID"""
+        self._ensure(db, category_ids=category_ids)
+        return self._categories
+
+    def tags(self, db: Session, tag_ids: Iterable[int] = ()) -> Dict[int, TagResponse]:
+        """获取标签映射，确保包含指定ID"""
+        self._ensure(db, tag_ids=tag_ids)
+        return self._tags
+
+    def invalidate(self) -> None:
+        """分类或标签变更后清空缓存"""
+        with self._lock:
+            self._loaded_at = None
+
+
+# 全局分类标签缓存实例
+taxonomy_cache = TaxonomyCache(settings.TAXONOMY_CACHE_TTL_SECONDS)
@@ -0,0 +1,255 @@
+import asyncio
+import heapq
+import logging
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Set
+
+from sqlalchemy.orm import Session
+
+from .config import settings
+from .models import CursorRule, Vote, VoteType
+
+logger = logging.getLogger(__name__)
+
+# 各类活动对热度的权重（取消点赞、改为点踩等按增量记为负值）
+EVENT_WEIGHTS = {"view": 1.0, "download": 3.0, "like": 5.0, "dislike": -3.0}
+
+# 基准时间与当前时间相差超过这么多个半衰期时平移基准，避免分数溢出
+_REBASE_HALF_LIVES = 256
+
+
+def current_hour(timestamp: Optional[float] = None) -> int:
+    """时间戳所在的小时序号"""
+    return int((time.time() if timestamp is None else timestamp) // 3600)
+
+
+def vote_weight(likes_delta: int, dislikes_delta: int) -> float:
+    """投票变化对应的热度增量"""
+    return likes_delta * EVENT_WEIGHTS["like"] + dislikes_delta * EVENT_WEIGHTS["dislike"]
+
+
+class _Ring:
+    """按小时分桶的环形缓冲：槽位 hour % size 存该小时的加权活动量"""
+
+    __slots__ = ("hours", "weights")
+
+    def __init__(self, size: int):
+        self.hours = [-1] * size
+        self.weights = [0.0] * size
+
+
+class TrendingTracker:
+    """按时间衰减的热度排行
+
+    每条规则一个小时桶环，只保留最近 window_hours 小时的活动。热度按半衰期指数衰减，
+    采用前向衰减：小时 h 的活动按 2^((h - 基准小时) / 半衰期) 放大后累加，
+    随时间推移所有规则同比例衰减、相对顺序不变，因此记录活动时只需增量更新一个分数。
+    每个分类（及全站）维护前 top_k 条的有序列表：分数上升时直接插入，
+    榜内规则分数下降时标记失效，读取时重新选出。后台任务定期淘汰过期的桶。
+
+    活动只记录在本进程内，启动时从 votes 表恢复窗口内的投票；浏览和下载没有事件表，重启后重新累积。
+    """
+
+    def __init__(self, half_life_hours: float, window_hours: int, top_k: int, sweep_interval: float):
+        self.half_life_hours = half_life_hours
+        self.window_hours = window_hours
+        self.top_k = top_k
+        self.sweep_interval = sweep_interval
+        self._lock = threading.Lock()
+        self._origin = current_hour()
+        self._rings: Dict[int, _Ring] = {}
+        self._scores: Dict[int, float] = {}
+        self._categories: Dict[int, Optional[int]] = {}
+        self._members: Dict[Optional[int], Set[int]] = defaultdict(set)
+        # 小时 -> 在该小时有活动的规则，用于按小时淘汰过期的桶
+        self._expiry: Dict[int, Set[int]] = defaultdict(set)
+        self._top: Dict[Optional[int], List[int]] = {}
+        self._stale: Set[Optional[int]] = set()
+        self._task: Optional[asyncio.Task] = None
+
+    def _factor(self, hour: int) -> float:
+        return 2.0 ** ((hour - self._origin) / self.half_life_hours)
+
+    def _keys(self, rule_id: int):
+        # 规则所在分类的榜单和全站榜单
+        return (self._categories.get(rule_id), None)
+
+    def _set_category(self, rule_id: int, category_id: Optional[int]) -> None:
+        if rule_id in self._categories and self._categories[rule_id] == category_id:
+            return
+        if rule_id in self._categories:
+            # 更换分类：从原分类榜单移出，新分类榜单重新选出
+            old = self._categories[rule_id]
+            self._members[old].discard(rule_id)
+            if rule_id in self._top.get(old, ()):
+                self._stale.add(old)
+            self._stale.add(category_id)
+        self._categories[rule_id] = category_id
+        self._members[category_id].add(rule_id)
+        self._members[None].add(rule_id)
+
+    def _rescore(self, rule_id: int, old: float, new: float) -> None:
+        """分数变化后维护榜单"""
+        self._scores[rule_id] = new
+        for key in self._keys(rule_id):
+            if key in self._stale or key not in self._top:
+                continue
+            top = self._top[key]
+            if rule_id in top:
+                if new < old:
+                    # 榜外规则可能反超，读取时重新选出
+                    self._stale.add(key)
+                else:
+                    top.sort(key=self._scores.__getitem__, reverse=True)
+            elif new > old and new > 0 and (len(top) < self.top_k or new > self._scores[top[-1]]):
+                top.append(rule_id)
+                top.sort(key=self._scores.__getitem__, reverse=True)
+                del top[self.top_k:]
+
+    def _expire(self, rule_id: int, ring: _Ring, oldest: int) -> float:
+        """清空早于 oldest 的桶，返回按剩余桶重新计算的分数"""
+        score = 0.0
+        for slot, hour in enumerate(ring.hours):
+            if hour < 0:
+                continue
+            if hour < oldest:
+                ring.hours[slot], ring.weights[slot] = -1, 0.0
+            else:
+                score += ring.weights[slot] * self._factor(hour)
+        return score
+
+    def record(
+        self, rule_id: int, category_id: Optional[int], weight: float, timestamp: Optional[float] = None
+    ) -> None:
+        """记录一次活动（weight 见 EVENT_WEIGHTS），timestamp 默认为当前时间"""
+        if not weight:
+            return
+        hour = current_hour(timestamp)
+        now = current_hour()
+        if hour <= now - self.window_hours:
+            return
+        with self._lock:
+            self._set_category(rule_id, category_id)
+            ring = self._rings.get(rule_id)
+            if ring is None:
+                ring = self._rings[rule_id] = _Ring(self.window_hours)
+            old = self._scores.get(rule_id, 0.0)
+            slot = hour % self.window_hours
+            if ring.hours[slot] != hour:
+                # 槽位中是一个窗口之前的桶，先淘汰
+                new = self._expire(rule_id, ring, now - self.window_hours + 1)
+                ring.hours[slot] = hour
+                self._expiry[hour].add(rule_id)
+            else:
+                new = old
+            ring.weights[slot] += weight
+            self._rescore(rule_id, old, new + weight * self._factor(hour))
+
+    def update_category(self, rule_id: int, category_id: Optional[int]) -> None:
+        """规则更换分类后同步榜单"""
+        with self._lock:
+            if rule_id in self._categories:
+                self._set_category(rule_id, category_id)
+
+    def remove_rule(self, rule_id: int) -> None:
+        with self._lock:
+            self._drop(rule_id)
+
+    def _drop(self, rule_id: int) -> None:
+        if rule_id not in self._categories:
+            return
+        for key in self._keys(rule_id):
+            self._members[key].discard(rule_id)
+            if rule_id in self._top.get(key, ()):
+                self._stale.add(key)
+        self._categories.pop(rule_id)
+        self._rings.pop(rule_id, None)
+        self._scores.pop(rule_id, None)
+
+    def top(self, category_id: Optional[int] = None, limit: Optional[int] = None) -> List[int]:
+        """按热度从高到低返回规则ID（最多 top_k 条，只含热度为正的规则）"""
+        with self._lock:
+            key = category_id
+            if key in self._stale or key not in self._top:
+                members = (rule_id for rule_id in self._members.get(key, ()) if self._scores[rule_id] > 0)
+                self._top[key] = heapq.nlargest(self.top_k, members, key=self._scores.__getitem__)
+                self._stale.discard(key)
+            return self._top[key][:limit]
+
+    def score(self, rule_id: int) -> float:
+        """当前时刻的衰减热度"""
+        with self._lock:
+            return self._scores.get(rule_id, 0.0) / self._factor(current_hour())
+
+    def sweep(self) -> int:
+        """淘汰滑出窗口的桶，返回受影响的规则数"""
+        now = current_hour()
+        oldest = now - self.window_hours + 1
+        with self._lock:
+            expired: Set[int] = set()
+            for hour in [hour for hour in self._expiry if hour < oldest]:
+                expired |= self._expiry.pop(hour)
+            for rule_id in expired:
+                ring = self._rings.get(rule_id)
+                if ring is None:
+                    continue
+                old = self._scores[rule_id]
+                new = self._expire(rule_id, ring, oldest)
+                if max(ring.hours) < 0:
+                    self._drop(rule_id)
+                else:
+                    self._rescore(rule_id, old, new)
+
+            if now - self._origin > _REBASE_HALF_LIVES * self.half_life_hours:
+                # 平移基准小时：所有分数同比例缩小，顺序不变
+                scale = 2.0 ** (-(now - self._origin) / self.half_life_hours)
+                self._origin = now
+                for rule_id in self._scores:
+                    self._scores[rule_id] *= scale
+            return len(expired)
+
+    def load(self, db: Session) -> None:
+        """从 votes 表恢复窗口内的投票活动"""
+        cutoff = datetime.now(timezone.utc) - timedelta(hours=self.window_hours)
+        rows = db.query(Vote.cursor_rule_id, Vote.vote_type, Vote.created_at, CursorRule.category_id).join(
+            CursorRule, CursorRule.id == Vote.cursor_rule_id
+        ).filter(Vote.created_at >= cutoff.replace(tzinfo=None))
+        for rule_id, vote_type, created_at, category_id in rows:
+            if created_at.tzinfo is None:
+                created_at = created_at.replace(tzinfo=timezone.utc)
+            weight = EVENT_WEIGHTS["like" if vote_type == VoteType.LIKE else "dislike"]
+            self.record(rule_id, category_id, weight, created_at.timestamp())
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.sweep_interval)
+            try:
+                await asyncio.to_thread(self.sweep)
+            except Exception:
+                logger.exception("热度过期桶淘汰失败，下个周期重试")
+
+    def start(self) -> None:
+        """启动后台定期淘汰任务（需在事件循环中调用）"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+# 全局热度排行实例
+trending = TrendingTracker(
+    settings.TRENDING_HALF_LIFE_HOURS,
+    settings.TRENDING_WINDOW_HOURS,
+    settings.TRENDING_TOP_K,
+    settings.TRENDING_SWEEP_SECONDS,
+)
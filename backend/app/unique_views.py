@@ -0,0 +1,235 @@
+import asyncio
+import hashlib
+import logging
+import math
+import threading
+import zlib
+from typing import Dict, Iterable, Optional, Set
+
+from sqlalchemy.orm import Session
+
+from .config import settings
+from .database import SessionLocal
+from .models import CursorRule, RuleViewSketch
+
+logger = logging.getLogger(__name__)
+
+# 单条 IN 查询的最大ID数
+_CHUNK_SIZE = 500
+
+
+class HyperLogLog:
+    """HyperLogLog 基数估计草图
+
+    2^precision 个单字节寄存器，内存固定，与访问量无关；precision=10 时 1KB，
+    标准误差约 1.04 / sqrt(2^precision) ≈ 3.3%。两个草图按寄存器取最大值即可合并。
+    """
+
+    __slots__ = ("precision", "registers", "_estimate")
+
+    def __init__(self, precision: int, registers: Optional[bytes] = None):
+        self.precision = precision
+        self.registers = bytearray(registers) if registers else bytearray(1 << precision)
+        self._estimate: Optional[int] = None
+
+    def add(self, value: str) -> bool:
+        """加入一个元素，返回寄存器是否变化（变化说明很可能是新元素）"""
+        digest = int.from_bytes(hashlib.blake2b(value.encode(), digest_size=8).digest(), "big")
+        width = 64 - self.precision
+        index = digest >> width
+        rank = width - (digest & ((1 << width) - 1)).bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+            self._estimate = None
+            return True
+        return False
+
+    def merge(self, other: "HyperLogLog") -> None:
+        """合并另一个同精度草图（逐寄存器取最大值）"""
+        self.registers = bytearray(map(max, self.registers, other.registers))
+        self._estimate = None
+
+    def count(self) -> int:
+        """估算不同元素个数（小基数时使用线性计数修正）"""
+        if self._estimate is None:
+            m = len(self.registers)
+            alpha = 0.7213 / (1 + 1.079 / m)
+            estimate = alpha * m * m / sum(2.0 ** -register for register in self.registers)
+            zeros = self.registers.count(0)
+            if estimate <= 2.5 * m and zeros:
+                estimate = m * math.log(m / zeros)
+            self._estimate = round(estimate)
+        return self._estimate
+
+    def copy(self) -> "HyperLogLog":
+        return HyperLogLog(self.precision, self.registers)
+
+    def to_bytes(self) -> bytes:
+        """压缩后的寄存器（访客少时大部分寄存器为0，压缩后只有几十字节）"""
+        return zlib.compress(bytes(self.registers))
+
+    @classmethod
+    def from_bytes(cls, precision: int, data: bytes) -> "HyperLogLog":
+        return cls(precision, zlib.decompress(data))
+
+
+def visitor_key(user_id: Optional[int], ip_address: str) -> str:
+    """访客标识：登录用户按用户ID，未登录用户按IP"""
+    return f"user:{user_id}" if user_id is not None else f"ip:{ip_address}"
+
+
+class UniqueViewTracker:
+    """按规则统计独立访客数
+
+    每条规则一个 HyperLogLog 草图，首次访问该规则时从数据库加载，浏览时只更新内存。
+    后台任务定期把有变化的草图与库中草图合并后写回（合并幂等，多 worker 各自写回互不覆盖），
+    应用关闭时写回剩余变化。库中没有草图的规则记为 absent 避免重复查询，
+    每次定期写回时清空，其他 worker 写入的草图最迟一个周期后被读到。
+    """
+
+    def __init__(self, precision: int, checkpoint_interval: float):
+        self.precision = precision
+        self.checkpoint_interval = checkpoint_interval
+        self._lock = threading.Lock()
+        self._checkpoint_lock = threading.Lock()
+        self._sketches: Dict[int, HyperLogLog] = {}
+        self._absent: Set[int] = set()
+        self._dirty: Set[int] = set()
+        self._task: Optional[asyncio.Task] = None
+
+    def _load(self, db: Session, rule_ids: Iterable[int]) -> None:
+        with self._lock:
+            missing = [rid for rid in set(rule_ids) if rid not in self._sketches and rid not in self._absent]
+        if not missing:
+            return
+        loaded = {}
+        for start in range(0, len(missing), _CHUNK_SIZE):
+            for row in db.query(RuleViewSketch).filter(
+                RuleViewSketch.cursor_rule_id.in_(missing[start:start + _CHUNK_SIZE])
+            ):
+                loaded[row.cursor_rule_id] = HyperLogLog.from_bytes(row.precision, row.registers)
+        with self._lock:
+            for rule_id in missing:
+                if rule_id in self._sketches:
+                    continue
+                if rule_id in loaded:
+                    self._sketches[rule_id] = loaded[rule_id]
+                else:
+                    self._absent.add(rule_id)
+
+    def record(self, db: Session, rule_id: int, visitor: str) -> bool:
+        """记录一次浏览，返回是否计为新访客"""
+        self._load(db, [rule_id])
+        with self._lock:
+            sketch = self._sketches.get(rule_id)
+            if sketch is None:
+                sketch = self._sketches[rule_id] = HyperLogLog(self.precision)
+                self._absent.discard(rule_id)
+            changed = sketch.add(visitor)
+            if changed:
+                self._dirty.add(rule_id)
+            return changed
+
+    def counts(self, db: Session, rule_ids: Iterable[int]) -> Dict[int, int]:
+        """批量获取独立访客数"""
+        rule_ids = list(rule_ids)
+        self._load(db, rule_ids)
+        with self._lock:
+            return {
+                rule_id: self._sketches[rule_id].count() if rule_id in self._sketches else 0
+                for rule_id in rule_ids
+            }
+
+    def remove_rule(self, db: Session, rule_id: int) -> None:
+        """删除规则的草图（在提交事务前调用）"""
+        db.query(RuleViewSketch).filter(RuleViewSketch.cursor_rule_id == rule_id).delete(
+            synchronize_session=False
+        )
+        with self._lock:
+            self._sketches.pop(rule_id, None)
+            self._dirty.discard(rule_id)
+            self._absent.add(rule_id)
+
+    def checkpoint(self) -> int:
+        """把有变化的草图合并写回数据库，返回写回的草图数；失败时留待下次写回"""
+        with self._checkpoint_lock:
+            with self._lock:
+                dirty = {rule_id: self._sketches[rule_id].copy() for rule_id in self._dirty}
+                self._dirty.clear()
+                # 其他 worker 可能已为这些规则写入草图，下次访问时重新查询
+                self._absent.clear()
+            if not dirty:
+                return 0
+
+            db = SessionLocal()
+            try:
+                rule_ids = list(dirty)
+                for start in range(0, len(rule_ids), _CHUNK_SIZE):
+                    chunk = rule_ids[start:start + _CHUNK_SIZE]
+                    # 已删除的规则不再写回
+                    existing = {rid for rid, in db.query(CursorRule.id).filter(CursorRule.id.in_(chunk))}
+                    stored = {
+                        row.cursor_rule_id: row
+                        for row in db.query(RuleViewSketch).filter(
+                            RuleViewSketch.cursor_rule_id.in_(chunk)
+                        ).with_for_update()
+                    }
+                    for rule_id in chunk:
+                        sketch = dirty[rule_id]
+                        if rule_id not in existing:
+                            dirty.pop(rule_id)
+                            continue
+                        row = stored.get(rule_id)
+                        if row is None:
+                            db.add(RuleViewSketch(
+                                cursor_rule_id=rule_id, precision=sketch.precision, registers=sketch.to_bytes()
+                            ))
+                            continue
+                        if row.precision == sketch.precision:
+                            sketch.merge(HyperLogLog.from_bytes(row.precision, row.registers))
+                        row.precision = sketch.precision
+                        row.registers = sketch.to_bytes()
+                db.commit()
+            except Exception:
+                db.rollback()
+                with self._lock:
+                    self._dirty.update(rule_id for rule_id in dirty if rule_id in self._sketches)
+                raise
+            finally:
+                db.close()
+
+            # 写回时合并进来的其他 worker 的访客同步到本地
+            with self._lock:
+                for rule_id, sketch in dirty.items():
+                    current = self._sketches.get(rule_id)
+                    if current is not None and current.precision == sketch.precision:
+                        current.merge(sketch)
+            return len(dirty)
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.checkpoint_interval)
+            try:
+                await asyncio.to_thread(self.checkpoint)
+            except Exception:
+                logger.exception("独立访客草图写回失败，下个周期重试")
+
+    def start(self) -> None:
+        """启动后台定期写回任务（需在事件循环中调用）"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """停止后台任务并写回剩余变化"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await asyncio.to_thread(self.checkpoint)
+
+
+# 全局独立访客统计实例
+unique_views = UniqueViewTracker(settings.UNIQUE_VIEW_PRECISION, settings.UNIQUE_VIEW_CHECKPOINT_SECONDS)
@@ -0,0 +1,206 @@
+from collections import defaultdict
+from typing import Dict, Iterable, Optional, Tuple
+
+from sqlalchemy import and_, bindparam, case, delete, func, insert, or_, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from .models import CursorRule, Vote, VoteType
+from .trending import trending, vote_weight
+
+# 同一投票人并发投票冲突时的最大尝试次数
+VOTE_MAX_ATTEMPTS = 5
+
+# 唯一约束冲突的错误码：MySQL 1062（Duplicate entry）、PostgreSQL 23505
+_UNIQUE_VIOLATION_CODES = (1062, "23505")
+
+
+class RuleNotFound(Exception):
+    """投票的规则不存在"""
+
+
+class VoteConflict(Exception):
+    """已有投票在读取后被并发请求修改"""
+
+
+def is_unique_violation(error: IntegrityError) -> bool:
+    """是否为唯一约束冲突（区别于外键、非空等其他完整性错误）"""
+    orig = error.orig
+    code = getattr(orig, "pgcode", None) or (orig.args[0] if getattr(orig, "args", None) else None)
+    return code in _UNIQUE_VIOLATION_CODES or "UNIQUE constraint failed" in str(orig)
+
+
+def voter_filter(user_id: Optional[int], ip_address: str):
+    """投票人的识别条件：登录用户按用户ID或IP匹配，未登录用户只按IP匹配
+
+    登录用户匹配到同IP下未登录时投的票时，会把该票转为登录用户的票。
+    """
+    if user_id is not None:
+        return or_(Vote.user_id == user_id, Vote.ip_address == ip_address)
+    return Vote.ip_address == ip_address
+
+
+def user_votes(
+    db: Session, cursor_rule_ids: Iterable[int], user_id: Optional[int], ip_address: str
+) -> Dict[int, VoteType]:
+    """批量查询投票人在多条规则上的投票（一次 IN 查询），识别方式与投票时相同"""
+    cursor_rule_ids = list(cursor_rule_ids)
+    if not cursor_rule_ids:
+        return {}
+    votes: Dict[int, VoteType] = {}
+    for cursor_rule_id, vote_user_id, vote_type in db.query(
+        Vote.cursor_rule_id, Vote.user_id, Vote.vote_type
+    ).filter(Vote.cursor_rule_id.in_(cursor_rule_ids), voter_filter(user_id, ip_address)):
+        # 同一规则同时匹配到用户ID和IP两条记录时，以用户ID的记录为准
+        if cursor_rule_id not in votes or (user_id is not None and vote_user_id == user_id):
+            votes[cursor_rule_id] = vote_type
+    return votes
+
+
+def _vote_deltas(old_type: Optional[VoteType], new_type: Optional[VoteType]) -> Tuple[int, int]:
+    """投票变化对 (点赞数, 点踩数) 的增量"""
+    likes = (new_type == VoteType.LIKE) - (old_type == VoteType.LIKE)
+    dislikes = (new_type == VoteType.DISLIKE) - (old_type == VoteType.DISLIKE)
+    return likes, dislikes
+
+
+def _apply_vote(
+    db: Session, cursor_rule_id: int, vote_type: VoteType, user_id: Optional[int], ip_address: str
+) -> Tuple[int, int, Optional[VoteType], Optional[int], float]:
+    # 先锁定规则行：规则不存在时不写投票；同一规则上的投票按行锁排队，
+    # 避免插入投票（外键检查持有规则行共享锁）后再更新计数时的锁升级死锁
+    if db.query(CursorRule.id).filter(CursorRule.id == cursor_rule_id).with_for_update().first() is None:
+        raise RuleNotFound(cursor_rule_id)
+
+    # 读取投票人在该规则上的已有投票（优先匹配用户ID）
+    query = db.query(Vote.id, Vote.vote_type).filter(
+        Vote.cursor_rule_id == cursor_rule_id, voter_filter(user_id, ip_address)
+    )
+    if user_id is not None:
+        query = query.order_by(case((Vote.user_id == user_id, 0), else_=1))
+    existing_vote = query.first()
+
+    # 写入投票：修改和删除以读到的投票类型为条件（比较并交换），
+    # 期间被并发请求改动时影响行数为0，抛出 VoteConflict 重试
+    if existing_vote is None:
+        db.execute(insert(Vote).values(
+            cursor_rule_id=cursor_rule_id, user_id=user_id, ip_address=ip_address, vote_type=vote_type
+        ))
+        old_type, new_type = None, vote_type
+    else:
+        old_type = existing_vote.vote_type
+        condition = and_(Vote.id == existing_vote.id, Vote.vote_type == old_type)
+        if old_type == vote_type:
+            # 重复投同一类型即取消投票
+            result = db.execute(delete(Vote).where(condition))
+            new_type = None
+        else:
+            values = {"vote_type": vote_type}
+            if user_id is not None:
+                values["user_id"] = user_id
+            result = db.execute(update(Vote).where(condition).values(**values))
+            new_type = vote_type
+        if result.rowcount != 1:
+            raise VoteConflict(cursor_rule_id)
+
+    # 按增量原子更新计数（一并取回分类供热度排行使用）
+    likes_delta, dislikes_delta = _vote_deltas(old_type, new_type)
+    statement = update(CursorRule).where(CursorRule.id == cursor_rule_id).values(
+        likes_count=func.coalesce(CursorRule.likes_count, 0) + likes_delta,
+        dislikes_count=func.coalesce(CursorRule.dislikes_count, 0) + dislikes_delta,
+    )
+    if db.get_bind().dialect.update_returning:
+        counts = db.execute(statement.returning(
+            CursorRule.likes_count, CursorRule.dislikes_count, CursorRule.category_id
+        )).first()
+    else:
+        result = db.execute(statement)
+        counts = None
+        if result.rowcount:
+            counts = db.query(CursorRule.likes_count, CursorRule.dislikes_count, CursorRule.category_id).filter(
+                CursorRule.id == cursor_rule_id
+            ).first()
+    if counts is None:
+        raise RuleNotFound(cursor_rule_id)
+    return counts[0], counts[1], new_type, counts[2], vote_weight(likes_delta, dislikes_delta)
+
+
+def cast_vote(
+    db: Session, cursor_rule_id: int, vote_type: VoteType, user_id: Optional[int], ip_address: str
+) -> Tuple[int, int, Optional[VoteType]]:
+    """投票（同类型再次投票为取消），返回 (点赞数, 点踩数, 当前投票)
+
+    投票记录的写入和计数的增量更新在同一事务中完成，不重新统计 votes 表，提交后计入热度排行。
+    规则不存在时抛出 RuleNotFound，多次重试仍冲突时抛出 VoteConflict。
+    """
+    for _ in range(VOTE_MAX_ATTEMPTS):
+        try:
+            likes_count, dislikes_count, user_vote, category_id, weight = _apply_vote(
+                db, cursor_rule_id, vote_type, user_id, ip_address
+            )
+            db.commit()
+            trending.record(cursor_rule_id, category_id, weight)
+            return likes_count, dislikes_count, user_vote
+        except IntegrityError as error:
+            db.rollback()
+            # 同一投票人并发首次投票触发唯一约束冲突，回滚后重试即读到对方写入的投票；
+            # 其他完整性错误（如外键）不是并发冲突，不重试
+            if not is_unique_violation(error):
+                raise
+        except VoteConflict:
+            # 已有投票在读取后被并发请求改删，回滚后重试
+            db.rollback()
+        except RuleNotFound:
+            db.rollback()
+            raise
+    raise VoteConflict(cursor_rule_id)
+
+
+def reconcile_vote_counts(db: Session, chunk_size: int = 1000, dry_run: bool = False) -> Dict[str, int]:
+    """按 votes 表校正规则的点赞点踩计数，返回统计：扫描、偏差、修复、跳过的规则数
+
+    按规则ID分块扫描，每块一次分组统计 votes，偏差行批量更新。
+    更新以读到的旧计数为条件，期间有新投票改动了计数的规则跳过，留待下次校正。
+    """
+    stats = {"scanned": 0, "drifted": 0, "fixed": 0, "skipped": 0}
+    statement = update(CursorRule.__table__).where(
+        CursorRule.id == bindparam("rule_id"),
+        func.coalesce(CursorRule.likes_count, 0) == bindparam("old_likes"),
+        func.coalesce(CursorRule.dislikes_count, 0) == bindparam("old_dislikes"),
+    ).values(likes_count=bindparam("new_likes"), dislikes_count=bindparam("new_dislikes"))
+
+    last_id = 0
+    while True:
+        rules = db.query(CursorRule.id, CursorRule.likes_count, CursorRule.dislikes_count).filter(
+            CursorRule.id > last_id
+        ).order_by(CursorRule.id).limit(chunk_size).all()
+        if not rules:
+            break
+        first_id, last_id = rules[0][0], rules[-1][0]
+
+        counts: Dict[int, Dict[VoteType, int]] = defaultdict(dict)
+        for cursor_rule_id, vote_type, count in db.query(
+            Vote.cursor_rule_id, Vote.vote_type, func.count()
+        ).filter(Vote.cursor_rule_id.between(first_id, last_id)).group_by(Vote.cursor_rule_id, Vote.vote_type):
+            counts[cursor_rule_id][vote_type] = count
+
+        drifted = []
+        for rule_id, likes_count, dislikes_count in rules:
+            actual = counts.get(rule_id, {})
+            new_likes, new_dislikes = actual.get(VoteType.LIKE, 0), actual.get(VoteType.DISLIKE, 0)
+            if (likes_count, dislikes_count) != (new_likes, new_dislikes):
+                drifted.append({
+                    "rule_id": rule_id, "old_likes": likes_count or 0, "old_dislikes": dislikes_count or 0,
+                    "new_likes": new_likes, "new_dislikes": new_dislikes,
+                })
+        stats["scanned"] += len(rules)
+        stats["drifted"] += len(drifted)
+
+        if drifted and not dry_run:
+            fixed = db.connection().execute(statement, drifted).rowcount
+            db.commit()
+            stats["fixed"] += fixed
+            stats["skipped"] += len(drifted) - fixed
+        else:
+            db.rollback()
+    return stats
@@ -0,0 +1,121 @@
+import struct
+import time
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+# ZIP 记录结构（见 PKWARE APPNOTE）
+_LOCAL_HEADER = struct.Struct("<4s2B4HL2L2H")
+_CENTRAL_HEADER = struct.Struct("<4s4B4HL2L5H2L")
+_END_RECORD = struct.Struct("<4s4H2LH")
+_ZIP64_END_RECORD = struct.Struct("<4sQ2H2L4Q")
+_ZIP64_END_LOCATOR = struct.Struct("<4sLQL")
+
+# 通用标志：第11位为文件名使用UTF-8
+_FLAG_UTF8 = 0x800
+
+_VERSION = 20
+_VERSION_ZIP64 = 45
+_UNIX_SYSTEM = 3
+_FILE_ATTRIBUTES = 0o100644 << 16
+_MAX_32 = 0xFFFFFFFF
+_MAX_16 = 0xFFFF
+
+# 压缩方法
+ZIP_STORED = 0
+ZIP_DEFLATED = 8
+
+DateTime = Tuple[int, int, int, int, int, int]
+
+
+def dos_datetime(date_time: DateTime) -> Tuple[int, int]:
+    """(年, 月, 日, 时, 分, 秒) 转为 ZIP 使用的 DOS (时间, 日期)"""
+    year, month, day, hour, minute, second = date_time
+    return (hour << 11) | (minute << 5) | (second // 2), ((year - 1980) << 9) | (month << 5) | day
+
+
+class ZipStreamWriter:
+    """流式输出的 ZIP 写入器
+
+    条目数据已预先压缩（见 rule_blobs），add_compressed 原样拼接，不再重新压缩；
+    中央目录在所有文件之后输出。不需要回写或 seek，内存中只保留每个文件一条中央目录记录，
+    与文件内容大小无关。文件数或偏移超过 ZIP 格式32位上限时自动写入 ZIP64 结束记录。
+    """
+
+    def __init__(self):
+        self._offset = 0
+        self._entries: List[bytes] = []
+
+    def _emit(self, data: bytes) -> bytes:
+        self._offset += len(data)
+        return data
+
+    def add_compressed(
+        self, arcname: str, compressed: bytes, crc: int, size: int,
+        date_time: Optional[DateTime] = None, method: int = ZIP_DEFLATED
+    ) -> Iterator[bytes]:
+        """输出一个已压缩好的文件（raw deflate 或 STORED 数据及其 CRC32、原文大小），不重新压缩
+
+        大小和 CRC 已知，直接写在本地文件头中。
+        """
+        name = arcname.encode("utf-8")
+        flags = _FLAG_UTF8 if not name.isascii() else 0
+        dos_time, dos_date = dos_datetime(date_time or time.localtime()[:6])
+        if size >= _MAX_32 or len(compressed) >= _MAX_32:
+            raise ValueError(f"{arcname} is too large for a streamed ZIP entry")
+        header_offset = self._offset
+
+        yield self._emit(_LOCAL_HEADER.pack(
+            b"PK\003\004", _VERSION, 0, flags, method, dos_time, dos_date,
+            crc, len(compressed), size, len(name), 0
+        ) + name)
+        yield self._emit(compressed)
+        self._add_entry(name, flags, method, dos_time, dos_date, crc, len(compressed), size, header_offset)
+
+    def _add_entry(
+        self, name: bytes, flags: int, method: int, dos_time: int, dos_date: int,
+        crc: int, compressed_size: int, size: int, header_offset: int
+    ) -> None:
+        """记录中央目录条目"""
+        extra = b""
+        version = _VERSION
+        if header_offset >= _MAX_32:
+            # 偏移超过4GB时写入 ZIP64 扩展字段
+            extra = struct.pack("<2HQ", 0x0001, 8, header_offset)
+            header_offset = _MAX_32
+            version = _VERSION_ZIP64
+        self._entries.append(_CENTRAL_HEADER.pack(
+            b"PK\001\002", version, _UNIX_SYSTEM, version, 0, flags, method, dos_time, dos_date,
+            crc, compressed_size, size, len(name), len(extra), 0, 0, 0, _FILE_ATTRIBUTES, header_offset
+        ) + name + extra)
+
+    def close(self) -> Iterator[bytes]:
+        """输出中央目录和结束记录"""
+        directory_offset = self._offset
+        for entry in self._entries:
+            yield self._emit(entry)
+        directory_size = self._offset - directory_offset
+        count = len(self._entries)
+
+        if count >= _MAX_16 or directory_offset >= _MAX_32 or directory_size >= _MAX_32:
+            zip64_offset = self._offset
+            yield self._emit(_ZIP64_END_RECORD.pack(
+                b"PK\006\006", _ZIP64_END_RECORD.size - 12, _VERSION_ZIP64, _VERSION_ZIP64, 0, 0,
+                count, count, directory_size, directory_offset
+            ))
+            yield self._emit(_ZIP64_END_LOCATOR.pack(b"PK\006\007", 0, zip64_offset, 1))
+            count = min(count, _MAX_16)
+            directory_size = min(directory_size, _MAX_32)
+            directory_offset = min(directory_offset, _MAX_32)
+        yield self._emit(_END_RECORD.pack(
+            b"PK\005\006", 0, 0, count, count, directory_size, directory_offset, 0
+        ))
+
+
+def stream_precompressed_zip(entries: Iterable[Tuple[str, bytes, int, int, int, DateTime]]) -> Iterator[bytes]:
+    """把 (文件路径, 条目数据, 压缩方法, CRC32, 原文大小, 修改时间) 序列直接拼接为 ZIP，不做任何压缩
+
+    输出只取决于输入，相同的条目总是得到相同的字节。
+    """
+    writer = ZipStreamWriter()
+    for arcname, data, method, crc, size, date_time in entries:
+        yield from writer.add_compressed(arcname, data, crc, size, date_time, method)
+    yield from writer.close()
@@ -0,0 +1,7 @@
+#!/bin/sh
+set -e
+
+# 启动前把数据库迁移到最新版本（表结构、计算列和索引只由 Alembic 迁移维护）
+alembic upgrade head
+
+exec "$@"
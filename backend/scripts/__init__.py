@@ -0,0 +1 @@
+# Maintenance and benchmark scripts
\ No newline at end of file
@@ -0,0 +1,85 @@
+"""下载归档格式基准测试
+
+对同一批规则分别生成各种归档格式（ZIP 拼接预压缩数据、tar.gz、tar.zst），比较：
+包大小、生成耗时和吞吐量（按原文字节计）、客户端解包耗时，并校验解包内容一致。
+
+用法（在 backend 目录下执行）：
+    python -m scripts.bench_archive --rules 2000 --content-size 4096
+"""
+import argparse
+import io
+import statistics
+import tarfile
+import time
+import warnings
+import zipfile
+
+from scripts.seed import prepare_database, seed_catalog
+
+
+def unpack(name: str, data: bytes) -> dict:
+    """按格式解包，返回 {文件路径: 内容}"""
+    if name == "zip":
+        archive = zipfile.ZipFile(io.BytesIO(data))
+        return {member: archive.read(member) for member in archive.namelist()}
+    if name == "tar.zst":
+        import zstandard
+        data = zstandard.ZstdDecompressor().decompressobj().decompress(data)
+    archive = tarfile.open(fileobj=io.BytesIO(data), mode="r:*")
+    return {member.name: archive.extractfile(member).read() for member in archive.getmembers()}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="下载归档格式基准测试")
+    parser.add_argument("--database-url", default=None, help="数据库地址，默认使用临时SQLite文件")
+    parser.add_argument("--rules", type=int, default=2_000, help="打包的规则数量")
+    parser.add_argument("--content-size", type=int, default=4_096, help="每条规则内容的大致字节数")
+    parser.add_argument("--repeat", type=int, default=5, help="每种格式的生成次数")
+    args = parser.parse_args()
+
+    warnings.filterwarnings("ignore", category=DeprecationWarning)
+    prepare_database(args.database_url)
+    seed_catalog(args.rules, args.content_size)
+
+    from app.archives import ARCHIVE_FORMATS
+    from app.database import SessionLocal
+    from app.models import CursorRule
+    from app.routers.download import iter_rule_entries
+    from app.rule_blobs import ensure_blobs
+
+    db = SessionLocal()
+    rule_ids = [rule_id for rule_id, in db.query(CursorRule.id).order_by(CursorRule.id)]
+    ensure_blobs(db, rule_ids)
+    db.close()
+    # 预先读出条目，只比较各格式的打包开销
+    entries = list(iter_rule_entries(rule_ids))
+    raw_size = sum(entry[4] for entry in entries)
+
+    print(f"打包 {len(entries)} 条规则，原文共 {raw_size / 1024 / 1024:.2f}MB")
+    if "tar.zst" not in ARCHIVE_FORMATS:
+        print("未安装 zstandard，跳过 tar.zst")
+    print(f"{'格式':<10}{'包大小(MB)':>12}{'压缩率':>8}{'生成(ms)':>10}{'吞吐(MB/s)':>12}{'解包(ms)':>10}")
+    expected = None
+    for name, archive_format in ARCHIVE_FORMATS.items():
+        times = []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            data = b"".join(archive_format.stream(entries))
+            times.append(time.perf_counter() - start)
+        start = time.perf_counter()
+        contents = unpack(name, data)
+        unpack_time = time.perf_counter() - start
+        if expected is None:
+            expected = contents
+        elif contents != expected:
+            raise SystemExit(f"{name} 解包内容不一致")
+        elapsed = statistics.median(times)
+        print(
+            f"{name:<10}{len(data) / 1024 / 1024:>12.2f}{len(data) / raw_size:>8.1%}{elapsed * 1000:>10.1f}"
+            f"{raw_size / 1024 / 1024 / elapsed:>12.1f}{unpack_time * 1000:>10.1f}"
+        )
+    print("解包内容一致: True")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""分类整包下载基准测试
+
+对比同一分类的几种下载方式：
+- 逐请求打包：每次按分类查询规则，流式拼接预压缩数据（批量下载的做法）
+- 整包缓存：直接发送已生成的整包文件
+- 整包缓存+校验：规则有变化（其他分类）后的下载，需重新读取成员列表比对
+- 增量重建：修改若干规则后的首次下载（未变化的成员从旧整包复制）
+
+用法（在 backend 目录下执行）：
+    python -m scripts.bench_bundle --rules 40000 --content-size 4096
+"""
+import argparse
+import statistics
+import time
+import warnings
+
+from scripts.seed import prepare_database, seed_catalog
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="分类整包下载基准测试")
+    parser.add_argument("--database-url", default=None, help="数据库地址，默认使用临时SQLite文件")
+    parser.add_argument("--rules", type=int, default=40_000, help="规则总数（平均分布在20个分类中）")
+    parser.add_argument("--content-size", type=int, default=4_096, help="每条规则内容的大致字节数")
+    parser.add_argument("--repeat", type=int, default=5, help="每种方式的下载次数")
+    parser.add_argument("--changes", type=int, default=20, help="每轮增量重建前修改的规则数")
+    args = parser.parse_args()
+
+    warnings.filterwarnings("ignore", category=DeprecationWarning)
+    prepare_database(args.database_url)
+    seed_catalog(args.rules, args.content_size)
+
+    from app.bundles import bundle_cache
+    from app.database import SessionLocal
+    from app.models import CursorRule
+    from app.routers.download import iter_file, iter_rule_entries
+    from app.rule_blobs import ensure_blobs, store_blob
+    from app.zipstream import stream_precompressed_zip
+
+    db = SessionLocal()
+    category_id = 1
+    member_ids = [rule_id for rule_id, in db.query(CursorRule.id).filter(
+        CursorRule.category_id == category_id
+    ).order_by(CursorRule.id)]
+    ensure_blobs(db, member_ids)
+
+    def per_request():
+        ids = [rule_id for rule_id, in db.query(CursorRule.id).filter(CursorRule.category_id == category_id)]
+        return stream_precompressed_zip(iter_rule_entries(ids))
+
+    def cached():
+        _, bundle_file = bundle_cache.open(db, "category", category_id)
+        return iter_file(bundle_file)
+
+    def checked():
+        bundle_cache.invalidate()
+        return cached()
+
+    change_round = 0
+
+    def incremental():
+        nonlocal change_round
+        change_round += 1
+        for rule_id in member_ids[change_round::len(member_ids) // args.changes][:args.changes]:
+            rule = db.get(CursorRule, rule_id)
+            rule.content = f"{rule.content}\n修改 {change_round}"
+            store_blob(db, rule_id, rule.content)
+        db.commit()
+        bundle_cache.invalidate()
+        start = time.perf_counter()
+        _, bundle_file = bundle_cache.open(db, "category", category_id)
+        return iter_file(bundle_file), start
+
+    def measure(build):
+        start = time.perf_counter()
+        result = build()
+        if isinstance(result, tuple):
+            result, start = result
+        size = sum(len(chunk) for chunk in result)
+        return (time.perf_counter() - start) * 1000, size
+
+    start = time.perf_counter()
+    bundle_cache.get(db, "category", category_id)
+    print(f"分类 {category_id} 共 {len(member_ids)} 条规则，首次生成整包耗时 {(time.perf_counter() - start) * 1000:.0f}ms")
+    print(f"{'方式':<12}{'中位(ms)':>10}{'最慢(ms)':>10}{'包大小(MB)':>12}")
+    for name, build in (
+        ("逐请求打包", per_request), ("整包缓存", cached), ("整包缓存+校验", checked), ("增量重建", incremental)
+    ):
+        results = [measure(build) for _ in range(args.repeat)]
+        times = [elapsed for elapsed, _ in results]
+        print(f"{name:<12}{statistics.median(times):>10.1f}{max(times):>10.1f}{results[-1][1] / 1024 / 1024:>12.2f}")
+    print(f"整包缓存指标: {bundle_cache.metrics()}")
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
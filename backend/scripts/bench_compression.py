@@ -0,0 +1,162 @@
+"""打包压缩对并发列表请求的影响
+
+批量下载进行期间，按固定速率发送列表请求，统计列表请求的中位和P99延迟
+（延迟从计划发送时刻算起，事件循环被阻塞而推迟发送的时间也计入）：
+- 事件循环内压缩：async def 下载路由内直接整包压缩（旧写法），压缩期间阻塞事件循环
+- 请求线程内压缩：COMPRESSION_WORKERS=0，在处理请求的线程池中压缩
+- 压缩线程池：交给有界压缩线程池（--workers 个线程），队列满时背压
+
+每次下载的规则都没有预压缩数据，下载时必须压缩（模拟冷数据或大量新规则）。
+请求经 ASGI 直接送入应用。
+
+用法（在 backend 目录下执行）：
+    python -m scripts.bench_compression --downloads 40 --batch 50
+"""
+import argparse
+import asyncio
+import io
+import statistics
+import time
+import warnings
+import zipfile
+
+from scripts.seed import prepare_database, seed_catalog
+
+
+def percentile(values, ratio: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * ratio))]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="打包压缩对并发列表请求的影响")
+    parser.add_argument("--database-url", default=None, help="数据库地址，默认使用临时SQLite文件")
+    parser.add_argument("--content-size", type=int, default=16_384, help="每条规则内容的大致字节数")
+    parser.add_argument("--downloads", type=int, default=40, help="每种方案的批量下载次数")
+    parser.add_argument("--batch", type=int, default=50, help="每次下载的规则数")
+    parser.add_argument("--download-concurrency", type=int, default=4, help="同时进行的下载数")
+    parser.add_argument("--list-rate", type=float, default=50.0, help="每秒发送的列表请求数")
+    parser.add_argument("--workers", type=int, default=1, help="压缩线程数")
+    args = parser.parse_args()
+
+    warnings.filterwarnings("ignore", category=DeprecationWarning)
+    prepare_database(args.database_url)
+    rules = args.downloads * args.batch
+    seed_catalog(rules, args.content_size)
+
+    import httpx
+    from fastapi import Depends, FastAPI
+    from fastapi.responses import StreamingResponse
+    from sqlalchemy.orm import Session, undefer
+
+    from app import rule_blobs
+    from app.compression import create_compression_pool
+    from app.database import SessionLocal, configure_thread_pool, get_db
+    from app.main import app
+    from app.models import CursorRule, RuleContentBlob
+    from app.routers import cursor_rules
+    from app.schemas import BatchDownloadRequest
+
+    legacy_app = FastAPI()
+    legacy_app.include_router(cursor_rules.router, prefix="/api/cursor-rules")
+
+    @legacy_app.post("/api/download/batch")
+    async def legacy_batch(download_data: BatchDownloadRequest, db: Session = Depends(get_db)):
+        # 旧写法：在事件循环线程中读取并整包压缩
+        cursor_rules = db.query(CursorRule).options(undefer(CursorRule.content)).filter(
+            CursorRule.id.in_(download_data.cursor_rule_ids)
+        ).all()
+        zip_buffer = io.BytesIO()
+        with zipfile.ZipFile(zip_buffer, "w", zipfile.ZIP_DEFLATED) as zip_file:
+            for cursor_rule in cursor_rules:
+                zip_file.writestr(f".cursor/rules/{cursor_rule.filename}.mdc", cursor_rule.content)
+        zip_buffer.seek(0)
+        return StreamingResponse(io.BytesIO(zip_buffer.read()), media_type="application/zip")
+
+    db = SessionLocal()
+    rule_ids = [rule_id for rule_id, in db.query(CursorRule.id).order_by(CursorRule.id)]
+    db.close()
+    batches = [rule_ids[start:start + args.batch] for start in range(0, len(rule_ids), args.batch)]
+
+    def clear_blobs():
+        db = SessionLocal()
+        try:
+            db.query(RuleContentBlob).delete()
+            db.commit()
+        finally:
+            db.close()
+
+    async def run(client):
+        queue = asyncio.Queue()
+        for batch in batches:
+            queue.put_nowait(batch)
+        list_latencies, download_latencies = [], []
+        done = asyncio.Event()
+
+        async def downloader():
+            while not queue.empty():
+                batch = queue.get_nowait()
+                start = time.perf_counter()
+                response = await client.post("/api/download/batch", json={"cursor_rule_ids": batch})
+                response.raise_for_status()
+                download_latencies.append((time.perf_counter() - start) * 1000)
+
+        async def list_once(page, scheduled):
+            response = await client.get("/api/cursor-rules", params={"page": page, "with_total": "false"})
+            response.raise_for_status()
+            list_latencies.append((time.perf_counter() - scheduled) * 1000)
+
+        async def lister():
+            requests = []
+            interval = 1 / args.list_rate
+            scheduled = time.perf_counter()
+            while not done.is_set():
+                requests.append(asyncio.create_task(list_once(len(requests) % 20 + 1, scheduled)))
+                scheduled += interval
+                await asyncio.sleep(max(0.0, scheduled - time.perf_counter()))
+            await asyncio.gather(*requests)
+
+        list_task = asyncio.create_task(lister())
+        start = time.perf_counter()
+        await asyncio.gather(*(downloader() for _ in range(args.download_concurrency)))
+        elapsed = time.perf_counter() - start
+        done.set()
+        await list_task
+        return elapsed, list_latencies, download_latencies
+
+    async def bench():
+        configure_thread_pool()
+        print(
+            f"{args.downloads}次批量下载（每次{args.batch}条，每条约{args.content_size}字节，并发{args.download_concurrency}），"
+            f"同时每秒{args.list_rate:g}个列表请求"
+        )
+        print(
+            f"{'方案':<14}{'列表请求数':>10}{'列表中位(ms)':>14}{'列表P99(ms)':>13}"
+            f"{'下载中位(ms)':>14}{'总耗时(s)':>11}{'最大排队':>9}{'背压拒绝':>9}"
+        )
+        for name, target, workers in (
+            ("事件循环内压缩", legacy_app, None),
+            ("请求线程内压缩", app, 0),
+            ("压缩线程池", app, args.workers),
+        ):
+            clear_blobs()
+            pool = None
+            if workers is not None:
+                pool = rule_blobs.compression_pool = create_compression_pool(workers)
+            transport = httpx.ASGITransport(app=target)
+            async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+                elapsed, list_latencies, download_latencies = await run(client)
+            metrics = pool.metrics() if pool is not None and workers else {"max_queued": "-", "rejected": "-"}
+            print(
+                f"{name:<14}{len(list_latencies):>10}{statistics.median(list_latencies):>14.2f}"
+                f"{percentile(list_latencies, 0.99):>13.2f}{statistics.median(download_latencies):>14.1f}"
+                f"{elapsed:>11.2f}{metrics['max_queued']:>9}{metrics['rejected']:>9}"
+            )
+            if pool is not None:
+                pool.shutdown()
+
+    asyncio.run(bench())
+
+
+if __name__ == "__main__":
+    main()
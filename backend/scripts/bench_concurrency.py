@@ -0,0 +1,110 @@
+"""并发吞吐基准测试
+
+对比两种路由写法在并发请求下的吞吐：
+- 旧写法：async def 路由内直接调用同步数据库会话，查询期间阻塞事件循环
+- 新写法：同步路由，由FastAPI放到线程池执行（线程池大小 DB_THREAD_POOL_SIZE）
+
+两者执行完全相同的列表查询逻辑，请求经 ASGI 直接送入应用，不经过网络。
+本地 SQLite 没有网络往返，--db-latency-ms 在每条SQL执行前休眠指定时间，
+模拟生产环境中远程 MySQL 的往返延迟（休眠期间释放GIL，与真实网络等待一致）。
+
+用法（在 backend 目录下执行）：
+    python -m scripts.bench_concurrency --db-latency-ms 5
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import time
+import warnings
+
+from scripts.bench_listing import call_endpoint
+from scripts.seed import prepare_database, seed_catalog
+
+
+async def run_load(client, path: str, concurrency: int, requests: int, max_page: int):
+    """以固定并发发送请求，返回 (吞吐req/s, 延迟列表ms)"""
+    rng = random.Random(0)
+    queue = asyncio.Queue()
+    for _ in range(requests):
+        queue.put_nowait(rng.randint(1, max_page))
+    latencies = []
+
+    async def worker():
+        while not queue.empty():
+            page = queue.get_nowait()
+            start = time.perf_counter()
+            response = await client.get(path, params={"page": page, "with_total": "false"})
+            response.raise_for_status()
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    return requests / elapsed, latencies
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="并发吞吐基准测试")
+    parser.add_argument("--database-url", default=None, help="数据库地址，默认使用临时SQLite文件")
+    parser.add_argument("--rules", type=int, default=10_000, help="规则数量")
+    parser.add_argument("--requests", type=int, default=200, help="每轮请求数")
+    parser.add_argument("--max-page", type=int, default=50, help="随机页码上限")
+    parser.add_argument("--db-latency-ms", type=float, default=5.0, help="模拟的每条SQL往返延迟（毫秒）")
+    parser.add_argument("--concurrency", default="1,8,32", help="并发数列表（逗号分隔）")
+    args = parser.parse_args()
+
+    warnings.filterwarnings("ignore", category=DeprecationWarning)
+    prepare_database(args.database_url)
+    seed_catalog(args.rules, content_size=256)
+
+    import httpx
+    from fastapi import Depends, FastAPI
+    from sqlalchemy import event
+    from sqlalchemy.orm import Session
+
+    from app.database import configure_thread_pool, engine, get_db
+    from app.main import app
+    from app.routers.cursor_rules import get_cursor_rules
+
+    legacy_app = FastAPI()
+
+    @legacy_app.get("/api/cursor-rules")
+    async def legacy_list(page: int = 1, db: Session = Depends(get_db)):
+        # 旧写法：在事件循环线程中执行同步查询
+        return call_endpoint(get_cursor_rules, page=page, size=20, with_total=False, db=db)
+
+    if args.db_latency_ms > 0:
+        @event.listens_for(engine, "before_cursor_execute")
+        def simulate_round_trip(*_):
+            time.sleep(args.db_latency_ms / 1000)
+
+    max_page = max(1, min(args.max_page, args.rules // 20))
+    levels = [int(level) for level in args.concurrency.split(",")]
+
+    async def bench():
+        configure_thread_pool()
+        print(
+            f"规则数: {args.rules}, 每轮{args.requests}个请求, 随机页码 1-{max_page}, "
+            f"模拟SQL往返延迟 {args.db_latency_ms}ms"
+        )
+        print(f"{'写法':<18}{'并发':>6}{'吞吐(req/s)':>14}{'中位延迟(ms)':>14}{'P99延迟(ms)':>14}")
+        for name, target in (("async+同步会话", legacy_app), ("同步路由+线程池", app)):
+            transport = httpx.ASGITransport(app=target)
+            async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+                for concurrency in levels:
+                    throughput, latencies = await run_load(
+                        client, "/api/cursor-rules", concurrency, args.requests, max_page
+                    )
+                    latencies.sort()
+                    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+                    print(
+                        f"{name:<18}{concurrency:>6}{throughput:>14.1f}"
+                        f"{statistics.median(latencies):>14.2f}{p99:>14.2f}"
+                    )
+
+    asyncio.run(bench())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+"""打包下载基准测试
+
+1. 打包全部规则：对比旧方案（整包写入 BytesIO 再复制一份后返回）、流式 ZIP（边读取边压缩边输出）
+   和流式拼接预压缩数据的首字节时间、总耗时和峰值内存（tracemalloc），并校验解压内容一致。
+2. 重复下载热门规则：对比每次下载重新压缩与拼接预压缩数据的每次下载CPU时间。
+
+用法（在 backend 目录下执行）：
+    python -m scripts.bench_download --rules 2000 --content-size 16384
+"""
+import argparse
+import io
+import random
+import time
+import tracemalloc
+import warnings
+import zipfile
+import zlib
+from typing import Iterable, Iterator, Tuple
+
+from scripts.seed import prepare_database, seed_catalog
+
+
+def stream_zip(files: Iterable[Tuple[str, bytes]], compresslevel: int = 6) -> Iterator[bytes]:
+    """对照方案：每次下载逐个文件重新压缩后流式输出（应用已改为拼接写入时生成的预压缩数据）"""
+    from app.compression import compress_bytes
+    from app.zipstream import ZipStreamWriter
+
+    writer = ZipStreamWriter()
+    for arcname, data in files:
+        compressed, method = compress_bytes(data, compresslevel, 0)
+        yield from writer.add_compressed(arcname, compressed, zlib.crc32(data), len(data), None, method)
+    yield from writer.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="打包下载基准测试")
+    parser.add_argument("--database-url", default=None, help="数据库地址，默认使用临时SQLite文件")
+    parser.add_argument("--rules", type=int, default=2_000, help="打包的规则数量")
+    parser.add_argument("--content-size", type=int, default=16_384, help="每条规则内容的大致字节数")
+    parser.add_argument("--downloads", type=int, default=200, help="重复下载的次数")
+    parser.add_argument("--batch", type=int, default=50, help="每次下载的规则数")
+    parser.add_argument("--hot-rules", type=int, default=200, help="热门规则数（每次从中随机选取）")
+    args = parser.parse_args()
+
+    warnings.filterwarnings("ignore", category=DeprecationWarning)
+    prepare_database(args.database_url)
+    seed_catalog(args.rules, args.content_size)
+
+    from sqlalchemy.orm import undefer
+
+    from app.database import SessionLocal
+    from app.models import CursorRule
+    from app.routers.download import iter_rule_entries
+    from app.rule_blobs import ensure_blobs
+    from app.zipstream import stream_precompressed_zip
+
+    db = SessionLocal()
+    rule_ids = [rule_id for rule_id, in db.query(CursorRule.id).order_by(CursorRule.id)]
+    start = time.perf_counter()
+    ensure_blobs(db, rule_ids)
+    print(f"生成 {len(rule_ids)} 条规则的预压缩数据耗时 {(time.perf_counter() - start) * 1000:.0f}ms（一次性）")
+    db.close()
+
+    def iter_rule_files(cursor_rule_ids):
+        # 每次下载读取正文重新压缩
+        db = SessionLocal()
+        try:
+            rows = db.query(CursorRule.filename, CursorRule.content).filter(
+                CursorRule.id.in_(cursor_rule_ids)
+            ).order_by(CursorRule.id).yield_per(20)
+            for filename, content in rows:
+                yield f".cursor/rules/{filename}.mdc", content.encode("utf-8")
+        finally:
+            db.close()
+
+    def legacy():
+        # 旧方案：读出全部规则，整包压缩到内存后再复制一份
+        db = SessionLocal()
+        try:
+            cursor_rules = db.query(CursorRule).options(undefer(CursorRule.content)).filter(
+                CursorRule.id.in_(rule_ids)
+            ).all()
+            zip_buffer = io.BytesIO()
+            with zipfile.ZipFile(zip_buffer, "w", zipfile.ZIP_DEFLATED) as zip_file:
+                for cursor_rule in cursor_rules:
+                    zip_file.writestr(f".cursor/rules/{cursor_rule.filename}.mdc", cursor_rule.content)
+            zip_buffer.seek(0)
+            yield from io.BytesIO(zip_buffer.read())
+        finally:
+            db.close()
+
+    def streaming():
+        return stream_zip(iter_rule_files(rule_ids))
+
+    def precompressed():
+        return stream_precompressed_zip(iter_rule_entries(rule_ids))
+
+    def measure(build):
+        tracemalloc.start()
+        start = time.perf_counter()
+        first_byte = None
+        output = io.BytesIO()
+        size = 0
+        for chunk in build():
+            if first_byte is None:
+                first_byte = time.perf_counter() - start
+            size += len(chunk)
+            output.write(chunk)
+            # 模拟发送：已发送的数据不再占用内存
+            output.seek(0)
+            output.truncate()
+        elapsed = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        return first_byte, elapsed, peak, size
+
+    def contents(build):
+        archive = zipfile.ZipFile(io.BytesIO(b"".join(build())))
+        return {name: archive.read(name) for name in archive.namelist()}
+
+    print(f"打包 {len(rule_ids)} 条规则，每条约 {args.content_size} 字节")
+    print(f"{'方案':<10}{'首字节(ms)':>12}{'总耗时(ms)':>12}{'峰值内存(MB)':>14}{'包大小(MB)':>12}")
+    for name, build in (("旧方案", legacy), ("流式ZIP", streaming), ("预压缩拼接", precompressed)):
+        first_byte, elapsed, peak, size = measure(build)
+        print(
+            f"{name:<10}{first_byte * 1000:>12.1f}{elapsed * 1000:>12.1f}"
+            f"{peak / 1024 / 1024:>14.2f}{size / 1024 / 1024:>12.2f}"
+        )
+    expected = contents(legacy)
+    print(f"解压内容一致: {expected == contents(streaming) == contents(precompressed)}")
+
+    rng = random.Random(0)
+    hot_ids = rule_ids[:args.hot_rules]
+    batches = [rng.sample(hot_ids, min(args.batch, len(hot_ids))) for _ in range(args.downloads)]
+    print(f"\n重复下载 {args.downloads} 次，每次 {args.batch} 条（{len(hot_ids)} 条热门规则）")
+    print(f"{'方案':<10}{'CPU时间/次(ms)':>16}{'总CPU时间(s)':>14}")
+    for name, build in (
+        ("重新压缩", lambda ids: stream_zip(iter_rule_files(ids))),
+        ("预压缩拼接", lambda ids: stream_precompressed_zip(iter_rule_entries(ids))),
+    ):
+        start = time.process_time()
+        for batch in batches:
+            for _ in build(batch):
+                pass
+        cpu = time.process_time() - start
+        print(f"{name:<10}{cpu / len(batches) * 1000:>16.2f}{cpu:>14.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""列表查询基准测试
+
+对比旧方案（joinedload + offset/limit 单查询 + count）与两阶段方案
+（只查ID + 批量补全）的每请求SQL次数和耗时。
+
+用法（在 backend 目录下执行）：
+    python -m scripts.bench_listing --rules 100000
+"""
+import argparse
+import asyncio
+import inspect
+import statistics
+import time
+import warnings
+
+from scripts.seed import prepare_database, seed_catalog
+
+
+def call_endpoint(func, **kwargs):
+    """直接调用路由函数（兼容同步和异步实现）
+
+    未传入的查询参数取 Query 声明的默认值，Request 和其余依赖项传 None。
+    """
+    from fastapi.params import Depends, Param
+
+    for name, parameter in inspect.signature(func).parameters.items():
+        if name in kwargs:
+            continue
+        if isinstance(parameter.default, Param):
+            kwargs[name] = parameter.default.default
+        elif parameter.default is inspect.Parameter.empty or isinstance(parameter.default, Depends):
+            kwargs[name] = None
+    if inspect.iscoroutinefunction(func):
+        return asyncio.run(func(**kwargs))
+    return func(**kwargs)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="列表查询基准测试")
+    parser.add_argument("--database-url", default=None, help="数据库地址，默认使用临时SQLite文件")
+    parser.add_argument("--rules", type=int, default=100_000, help="规则数量")
+    parser.add_argument("--content-size", type=int, default=1024, help="每条规则内容的大致字节数")
+    parser.add_argument("--repeat", type=int, default=20, help="每个场景的重复次数")
+    args = parser.parse_args()
+
+    warnings.filterwarnings("ignore", category=DeprecationWarning)
+    prepare_database(args.database_url)
+    seed_catalog(args.rules, args.content_size)
+
+    from sqlalchemy import desc, event
+    from sqlalchemy.orm import joinedload
+
+    from app.database import SessionLocal, engine
+    from app.models import CursorRule, CursorRuleTag
+    from app.pagination import count_cache
+    from app.routers.cursor_rules import get_cursor_rules
+    from app.schemas import CursorRuleListResponse
+
+    statements = [0]
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def count_statement(*_):
+        statements[0] += 1
+
+    def legacy_plan(db, page, size, tag_ids):
+        query = db.query(CursorRule).options(
+            joinedload(CursorRule.author),
+            joinedload(CursorRule.category),
+            joinedload(CursorRule.tags)
+        )
+        if tag_ids:
+            query = query.join(CursorRuleTag).filter(CursorRuleTag.tag_id.in_(tag_ids))
+        query = query.order_by(desc(CursorRule.created_at))
+        query.count()
+        items = query.offset((page - 1) * size).limit(size).all()
+        return [CursorRuleListResponse.from_orm(item).dict() for item in items]
+
+    def two_phase_plan(db, page, size, tag_ids):
+        count_cache.invalidate()
+        return call_endpoint(
+            get_cursor_rules, page=page, size=size,
+            tag_ids=",".join(map(str, tag_ids)) or None, db=db
+        )
+
+    scenarios = [
+        ("第1页", 1, []),
+        ("第500页", 500, []),
+        ("标签筛选第1页", 1, [1, 2, 3]),
+    ]
+    plans = [("joinedload单查询", legacy_plan), ("两阶段查询", two_phase_plan)]
+
+    print(f"规则数: {args.rules}, 每页20条, 每场景重复{args.repeat}次")
+    print(f"{'场景':<12}{'方案':<16}{'SQL次数/请求':>12}{'中位耗时(ms)':>14}{'P95耗时(ms)':>14}")
+    for scenario, page, tag_ids in scenarios:
+        for plan_name, plan in plans:
+            timings = []
+            statements[0] = 0
+            for _ in range(args.repeat):
+                db = SessionLocal()
+                try:
+                    start = time.perf_counter()
+                    plan(db, page, 20, tag_ids)
+                    timings.append((time.perf_counter() - start) * 1000)
+                finally:
+                    db.close()
+            timings.sort()
+            p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+            print(
+                f"{scenario:<12}{plan_name:<16}{statements[0] / args.repeat:>12.1f}"
+                f"{statistics.median(timings):>14.2f}{p95:>14.2f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""增量同步基准测试
+
+命令行工具镜像整个规则库：首次全量拉取（since=0 分页拉完），之后只拉取上次同步后的变更。
+对比全量同步与修改若干规则后的增量同步耗时，并校验增量同步后的镜像与数据库一致。
+
+用法（在 backend 目录下执行）：
+    python -m scripts.bench_sync --rules 20000 --changes 50
+"""
+import argparse
+import random
+import time
+import warnings
+
+from scripts.seed import prepare_database, seed_catalog
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="增量同步基准测试")
+    parser.add_argument("--database-url", default=None, help="数据库地址，默认使用临时SQLite文件")
+    parser.add_argument("--rules", type=int, default=20_000, help="规则总数")
+    parser.add_argument("--content-size", type=int, default=1_024, help="每条规则内容的大致字节数")
+    parser.add_argument("--changes", type=int, default=50, help="两次同步之间修改和删除的规则数")
+    parser.add_argument("--limit", type=int, default=1_000, help="每次拉取的变更数")
+    args = parser.parse_args()
+
+    warnings.filterwarnings("ignore", category=DeprecationWarning)
+    prepare_database(args.database_url)
+    seed_catalog(args.rules, args.content_size)
+
+    from fastapi.testclient import TestClient
+
+    from app.changelog import CHANGE_DELETE, CHANGE_UPDATE, record_change
+    from app.database import SessionLocal
+    from app.main import app
+    from app.models import CursorRule
+
+    mirror = {}
+
+    def sync(client, since):
+        """拉取 since 之后的全部变更并应用到本地镜像，返回 (新的 since, 请求次数, 变更条数)"""
+        requests = changes = 0
+        while True:
+            data = client.get("/api/changes", params={"since": since, "limit": args.limit}).json()
+            requests += 1
+            changes += len(data["items"])
+            for item in data["items"]:
+                if item["deleted"]:
+                    mirror.pop(item["id"], None)
+                else:
+                    mirror[item["id"]] = item["content"]
+            since = data["next_since"]
+            if not data["has_more"]:
+                return since, requests, changes
+
+    with TestClient(app) as client:
+        start = time.perf_counter()
+        since, requests, changes = sync(client, 0)
+        print(f"全量同步：{changes} 条规则，{requests} 次请求，耗时 {(time.perf_counter() - start) * 1000:.0f}ms")
+
+        db = SessionLocal()
+        rng = random.Random(0)
+        changed = rng.sample(sorted(mirror), args.changes)
+        for index, rule_id in enumerate(changed):
+            cursor_rule = db.get(CursorRule, rule_id)
+            if index % 5 == 0:
+                db.delete(cursor_rule)
+                record_change(db, rule_id, CHANGE_DELETE)
+            else:
+                cursor_rule.content = f"{cursor_rule.content}\n修改"
+                record_change(db, rule_id, CHANGE_UPDATE)
+            db.commit()
+
+        start = time.perf_counter()
+        since, requests, changes = sync(client, since)
+        print(
+            f"增量同步：{args.changes} 条规则变更后拉取 {changes} 条，{requests} 次请求，"
+            f"耗时 {(time.perf_counter() - start) * 1000:.1f}ms"
+        )
+        expected = {rule_id: content for rule_id, content in db.query(CursorRule.id, CursorRule.content)}
+        db.close()
+        print(f"镜像与数据库一致: {mirror == expected}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+"""投票吞吐基准测试
+
+对比旧投票流程（存在性检查、逐个查询已有投票、两次COUNT重算、两次提交）
+与 votes.cast_vote（锁定已有投票 + 增量更新计数，一次提交）在并发投票下的
+吞吐、每次投票的SQL条数，以及结束后计数与 votes 表是否一致。
+
+每个并发请求使用不同的客户端IP，投向少量热门规则，重复投票会切换或取消。
+请求经 ASGI 直接送入应用；--db-latency-ms 模拟远程数据库的往返延迟。
+
+用法（在 backend 目录下执行）：
+    python -m scripts.bench_votes --votes 2000 --concurrency 16
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import time
+import warnings
+
+from scripts.seed import prepare_database, seed_catalog
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="投票吞吐基准测试")
+    parser.add_argument("--database-url", default=None, help="数据库地址，默认使用临时SQLite文件")
+    parser.add_argument("--rules", type=int, default=1_000, help="规则数量")
+    parser.add_argument("--hot-rules", type=int, default=5, help="被投票的热门规则数")
+    parser.add_argument("--voters", type=int, default=500, help="投票人（IP）数量")
+    parser.add_argument("--votes", type=int, default=2_000, help="每轮投票次数")
+    parser.add_argument("--concurrency", type=int, default=16, help="并发数")
+    parser.add_argument("--db-latency-ms", type=float, default=2.0, help="模拟的每条SQL往返延迟（毫秒）")
+    args = parser.parse_args()
+
+    warnings.filterwarnings("ignore", category=DeprecationWarning)
+    prepare_database(args.database_url)
+    seed_catalog(args.rules, content_size=64)
+
+    import httpx
+    from fastapi import Depends, FastAPI, HTTPException, Request
+    from sqlalchemy import event, func
+    from sqlalchemy.orm import Session
+
+    from app.database import SessionLocal, configure_thread_pool, engine, get_db
+    from app.main import app
+    from app.models import CursorRule, Vote, VoteType
+    from app.routers.cursor_rules import get_client_ip
+    from app.schemas import VoteRequest, VoteResponse
+
+    legacy_app = FastAPI()
+
+    @legacy_app.post("/api/cursor-rules/{cursor_rule_id}/vote")
+    def legacy_vote(cursor_rule_id: int, vote_data: VoteRequest, request: Request, db: Session = Depends(get_db)):
+        # 旧流程（未登录用户分支）
+        cursor_rule = db.query(CursorRule).filter(CursorRule.id == cursor_rule_id).first()
+        if not cursor_rule:
+            raise HTTPException(status_code=404, detail="Cursor rule not found")
+        ip_address = get_client_ip(request)
+        existing_vote = db.query(Vote).filter(
+            Vote.cursor_rule_id == cursor_rule_id, Vote.ip_address == ip_address
+        ).first()
+        if existing_vote:
+            if existing_vote.vote_type == vote_data.vote_type:
+                db.delete(existing_vote)
+            else:
+                existing_vote.vote_type = vote_data.vote_type
+        else:
+            db.add(Vote(cursor_rule_id=cursor_rule_id, ip_address=ip_address, vote_type=vote_data.vote_type))
+        db.commit()
+        likes_count = db.query(Vote).filter(
+            Vote.cursor_rule_id == cursor_rule_id, Vote.vote_type == VoteType.LIKE
+        ).count()
+        dislikes_count = db.query(Vote).filter(
+            Vote.cursor_rule_id == cursor_rule_id, Vote.vote_type == VoteType.DISLIKE
+        ).count()
+        cursor_rule.likes_count = likes_count
+        cursor_rule.dislikes_count = dislikes_count
+        db.commit()
+        current_vote = db.query(Vote).filter(
+            Vote.cursor_rule_id == cursor_rule_id, Vote.ip_address == ip_address
+        ).first()
+        return VoteResponse(
+            likes_count=likes_count,
+            dislikes_count=dislikes_count,
+            user_vote=current_vote.vote_type if current_vote else None
+        )
+
+    statements = [0]
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def count_statement(*_):
+        statements[0] += 1
+        if args.db_latency_ms > 0:
+            time.sleep(args.db_latency_ms / 1000)
+
+    def reset_votes():
+        db = SessionLocal()
+        try:
+            db.query(Vote).delete()
+            db.query(CursorRule).update({CursorRule.likes_count: 0, CursorRule.dislikes_count: 0})
+            db.commit()
+        finally:
+            db.close()
+
+    def mismatched_rules() -> int:
+        """计数与 votes 表实际统计不一致的规则数"""
+        db = SessionLocal()
+        try:
+            actual = {
+                (rule_id, vote_type): count
+                for rule_id, vote_type, count in db.query(
+                    Vote.cursor_rule_id, Vote.vote_type, func.count()
+                ).group_by(Vote.cursor_rule_id, Vote.vote_type)
+            }
+            mismatched = 0
+            for rule_id, likes, dislikes in db.query(
+                CursorRule.id, CursorRule.likes_count, CursorRule.dislikes_count
+            ):
+                if (likes, dislikes) != (
+                    actual.get((rule_id, VoteType.LIKE), 0), actual.get((rule_id, VoteType.DISLIKE), 0)
+                ):
+                    mismatched += 1
+            return mismatched
+        finally:
+            db.close()
+
+    rng = random.Random(0)
+    plan = [
+        (rng.randint(1, args.hot_rules), f"10.0.{i // 256}.{i % 256}", rng.choice(["like", "dislike"]))
+        for i in (rng.randrange(args.voters) for _ in range(args.votes))
+    ]
+
+    async def run_load(client):
+        queue = asyncio.Queue()
+        for item in plan:
+            queue.put_nowait(item)
+        latencies = []
+        errors = [0]
+
+        async def worker():
+            while not queue.empty():
+                rule_id, ip_address, vote_type = queue.get_nowait()
+                start = time.perf_counter()
+                response = await client.post(
+                    f"/api/cursor-rules/{rule_id}/vote",
+                    json={"vote_type": vote_type},
+                    headers={"X-Forwarded-For": ip_address},
+                )
+                latencies.append((time.perf_counter() - start) * 1000)
+                if response.status_code != 200:
+                    errors[0] += 1
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+        return len(plan) / (time.perf_counter() - start), latencies, errors[0]
+
+    async def bench():
+        configure_thread_pool()
+        print(
+            f"{args.votes}次投票, {args.voters}个投票人, {args.hot_rules}条热门规则, "
+            f"并发{args.concurrency}, 模拟SQL往返延迟 {args.db_latency_ms}ms"
+        )
+        print(
+            f"{'方案':<12}{'SQL次数/票':>10}{'吞吐(票/s)':>12}{'中位延迟(ms)':>14}"
+            f"{'P99延迟(ms)':>13}{'失败':>6}{'计数不一致':>10}"
+        )
+        for name, target in (("旧流程", legacy_app), ("原子增量", app)):
+            reset_votes()
+            statements[0] = 0
+            transport = httpx.ASGITransport(app=target, raise_app_exceptions=False)
+            async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+                throughput, latencies, errors = await run_load(client)
+            latencies.sort()
+            p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+            print(
+                f"{name:<12}{statements[0] / len(plan):>10.1f}{throughput:>12.1f}"
+                f"{statistics.median(latencies):>14.2f}{p99:>13.2f}{errors:>6}{mismatched_rules():>10}"
+            )
+
+    asyncio.run(bench())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+"""点赞点踩计数校正
+
+规则的 likes_count/dislikes_count 在投票时按增量维护，详情页直接读取。
+本任务离线扫描 votes 表，修复计数偏差并报告修复的行数，可由定时任务执行。
+
+用法（在 backend 目录下执行，默认使用应用配置中的数据库）：
+    python -m scripts.reconcile_votes
+    python -m scripts.reconcile_votes --dry-run --chunk-size 5000
+"""
+import argparse
+import os
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="点赞点踩计数校正")
+    parser.add_argument("--database-url", default=None, help="数据库地址，默认使用应用配置")
+    parser.add_argument("--chunk-size", type=int, default=1000, help="每批扫描的规则数")
+    parser.add_argument("--dry-run", action="store_true", help="只统计偏差，不写入")
+    args = parser.parse_args()
+
+    if args.database_url:
+        os.environ["DATABASE_URL"] = args.database_url
+    os.environ.setdefault("DATABASE_ECHO", "false")
+
+    from app.database import SessionLocal
+    from app.votes import reconcile_vote_counts
+
+    db = SessionLocal()
+    try:
+        stats = reconcile_vote_counts(db, args.chunk_size, args.dry_run)
+    finally:
+        db.close()
+
+    print(
+        f"扫描 {stats['scanned']} 条规则，计数偏差 {stats['drifted']} 条，"
+        f"已修复 {stats['fixed']} 条，并发变更跳过 {stats['skipped']} 条"
+        + ("（dry-run，未写入）" if args.dry_run else "")
+    )
+
+
+if __name__ == "__main__":
+    main()
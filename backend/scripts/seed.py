@@ -0,0 +1,99 @@
+"""基准测试数据生成
+
+基准测试脚本需要在导入 app 之前设置数据库地址，统一通过 prepare_database() 处理：
+未指定 --database-url 时使用临时 SQLite 文件。
+"""
+import os
+import random
+import tempfile
+from datetime import datetime, timedelta
+from typing import Optional
+
+SEED_USERS = 200
+SEED_CATEGORIES = 20
+SEED_TAGS = 60
+_BATCH = 5000
+
+_WORDS = [
+    "规范", "组件", "接口", "类型", "测试", "文档", "命名", "异常", "性能", "缓存",
+    "python", "vue", "react", "fastapi", "typescript", "sql", "docker", "async",
+]
+
+
+def prepare_database(database_url: Optional[str]) -> str:
+    """设置 DATABASE_URL 环境变量（必须在导入 app 之前调用）"""
+    if not database_url:
+        path = os.path.join(tempfile.mkdtemp(prefix="cursor-rules-bench-"), "bench.db")
+        database_url = f"sqlite:///{path}"
+    os.environ["DATABASE_URL"] = database_url
+    os.environ["DATABASE_ECHO"] = "false"
+    # 基准测试从同一客户端发出大量请求，不做限流
+    os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+    os.environ.setdefault("BUNDLE_CACHE_DIR", tempfile.mkdtemp(prefix="cursor-rules-bundles-"))
+    return database_url
+
+
+def _text(rng: random.Random, size: int) -> str:
+    words = []
+    length = 0
+    while length < size:
+        word = rng.choice(_WORDS)
+        words.append(word)
+        length += len(word) + 1
+    return " ".join(words)
+
+
+def seed_catalog(rules: int, content_size: int = 1024, seed: int = 42) -> None:
+    """批量写入用户、分类、标签、规则和标签关联（已有数据时跳过）"""
+    from sqlalchemy import insert
+
+    from app.database import SessionLocal, upgrade_database
+    from app.models import Category, CursorRule, CursorRuleTag, Tag, User
+
+    upgrade_database()
+    db = SessionLocal()
+    try:
+        if db.query(CursorRule.id).first() is not None:
+            return
+
+        rng = random.Random(seed)
+        db.execute(insert(User), [
+            {"id": i, "username": f"user{i}", "password_hash": "x"} for i in range(1, SEED_USERS + 1)
+        ])
+        db.execute(insert(Category), [
+            {"id": i, "name": f"分类{i}", "created_by": 1} for i in range(1, SEED_CATEGORIES + 1)
+        ])
+        db.execute(insert(Tag), [
+            {"id": i, "name": f"标签{i}", "created_by": 1} for i in range(1, SEED_TAGS + 1)
+        ])
+
+        start = datetime(2024, 1, 1)
+        for offset in range(0, rules, _BATCH):
+            rule_rows = []
+            tag_rows = []
+            for rule_id in range(offset + 1, min(offset + _BATCH, rules) + 1):
+                likes = rng.randint(0, 500)
+                rule_rows.append({
+                    "id": rule_id,
+                    "title": f"规则{rule_id} " + _text(rng, 24),
+                    "filename": f"rule-{rule_id}",
+                    "category_id": rng.randint(1, SEED_CATEGORIES),
+                    "description": _text(rng, 80),
+                    "content": _text(rng, content_size),
+                    "example": _text(rng, content_size // 4),
+                    "author_id": rng.randint(1, SEED_USERS),
+                    "likes_count": likes,
+                    "dislikes_count": rng.randint(0, likes // 5 + 1),
+                    "download_count": rng.randint(0, 2000),
+                    "view_count": rng.randint(0, 10000),
+                    "created_at": start + timedelta(minutes=rule_id),
+                    "updated_at": start + timedelta(minutes=rule_id),
+                })
+                for tag_id in rng.sample(range(1, SEED_TAGS + 1), rng.randint(0, 3)):
+                    tag_rows.append({"cursor_rule_id": rule_id, "tag_id": tag_id})
+            db.execute(insert(CursorRule), rule_rows)
+            if tag_rows:
+                db.execute(insert(CursorRuleTag), tag_rows)
+            db.commit()
+    finally:
+        db.close()
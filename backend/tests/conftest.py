@@ -0,0 +1,117 @@
+import os
+import sys
+import tempfile
+import uuid
+from contextlib import contextmanager
+
+import pytest
+from sqlalchemy import event
+
+# 导入应用之前配置测试环境：临时 SQLite 数据库、整包目录，关闭 SQL 日志和限流
+_TEMP_DIR = tempfile.mkdtemp(prefix="cursor-rules-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{_TEMP_DIR}/test.db"
+os.environ["DATABASE_ECHO"] = "false"
+os.environ["RATE_LIMIT_ENABLED"] = "false"
+os.environ["BUNDLE_CACHE_DIR"] = os.path.join(_TEMP_DIR, "bundles")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+from app.database import SessionLocal, engine, upgrade_database  # noqa: E402
+from app.main import app  # noqa: E402
+
+
+def unique_name(prefix: str) -> str:
+    """各测试共用一个数据库，名称加随机后缀避免冲突"""
+    return f"{prefix}-{uuid.uuid4().hex[:8]}"
+
+
+@contextmanager
+def recorded_statements():
+    """记录期间执行的 SQL"""
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+
+
+@pytest.fixture(scope="session")
+def client():
+    """执行应用启动、关闭流程的测试客户端（整个测试会话共用）"""
+    upgrade_database()
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+@pytest.fixture
+def db(client):
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.fixture
+def auth_headers(client):
+    """注册新用户并返回认证头"""
+    username = unique_name("user")
+    client.post("/api/auth/register", json={"username": username, "password": "secret1"})
+    token = client.post(
+        "/api/auth/login", json={"username": username, "password": "secret1"}
+    ).json()["access_token"]
+    return {"Authorization": f"Bearer {token}"}
+
+
+@pytest.fixture
+def category(client, auth_headers):
+    response = client.post("/api/categories", json={"name": unique_name("category")}, headers=auth_headers)
+    return response.json()["data"]["category"]["id"]
+
+
+@pytest.fixture
+def make_tag(client, auth_headers):
+    def make(name=None):
+        response = client.post("/api/tags", json={"name": name or unique_name("tag")}, headers=auth_headers)
+        return response.json()["data"]["tag"]["id"]
+    return make
+
+
+@pytest.fixture
+def make_rule(client, auth_headers, category):
+    """创建规则，返回规则ID（默认放在本测试的分类下）"""
+    def make(title=None, content="规则内容", category_id=None, tag_ids=(), headers=None, **fields):
+        payload = {
+            "title": title or unique_name("rule"),
+            "filename": fields.pop("filename", unique_name("file")),
+            "category_id": category_id or category,
+            "content": content,
+            "tag_ids": list(tag_ids),
+            **fields,
+        }
+        response = client.post("/api/cursor-rules", json=payload, headers=headers or auth_headers)
+        assert response.status_code == 200, response.text
+        return response.json()["data"]["cursor_rule_id"]
+    return make
+
+
+def walk_pages(client, path, headers=None, **params):
+    """沿 next_cursor 翻完所有页，返回按顺序出现的规则ID"""
+    seen, cursor = [], None
+    while True:
+        query = dict(params)
+        if cursor:
+            query["cursor"] = cursor
+        response = client.get(path, params=query, headers=headers or {})
+        assert response.status_code == 200, response.text
+        data = response.json()
+        seen.extend(item["id"] for item in data["items"])
+        cursor = data.get("next_cursor")
+        if not cursor:
+            return seen
@@ -0,0 +1,77 @@
+import io
+import tarfile
+import zlib
+
+import pytest
+
+from app.archives import ARCHIVE_FORMATS, negotiate_format, zstandard
+from app.zipstream import ZIP_DEFLATED, ZIP_STORED
+
+
+def _deflate(data: bytes) -> bytes:
+    compressor = zlib.compressobj(6, zlib.DEFLATED, -15)
+    return compressor.compress(data) + compressor.flush()
+
+
+ENTRIES = [
+    (".cursor/rules/a.mdc", _deflate(b"a" * 3000), ZIP_DEFLATED, zlib.crc32(b"a" * 3000), 3000, (2024, 5, 6, 7, 8, 10)),
+    (".cursor/rules/中文.mdc", "短".encode(), ZIP_STORED, zlib.crc32("短".encode()), 3, (2024, 5, 6, 7, 8, 10)),
+]
+
+
+def _decompress(name: str, data: bytes) -> bytes:
+    if name == "tar.zst":
+        return zstandard.ZstdDecompressor().decompressobj().decompress(data)
+    return data
+
+
+@pytest.mark.parametrize("name", [name for name in ARCHIVE_FORMATS if name != "zip"])
+def test_tar_formats_are_readable_and_deterministic(name):
+    archive_format = ARCHIVE_FORMATS[name]
+    data = b"".join(archive_format.stream(ENTRIES))
+    assert b"".join(archive_format.stream(ENTRIES)) == data
+
+    mode = "r:gz" if name == "tar.gz" else "r:"
+    with tarfile.open(fileobj=io.BytesIO(_decompress(name, data)), mode=mode) as tar:
+        members = tar.getmembers()
+        assert [member.name for member in members] == [".cursor/rules/a.mdc", ".cursor/rules/中文.mdc"]
+        assert tar.extractfile(members[0]).read() == b"a" * 3000
+        assert tar.extractfile(members[1]).read() == "短".encode()
+        assert members[0].mtime == 1714979290
+
+
+def test_negotiate_format():
+    assert negotiate_format(None, None).name == "zip"
+    assert negotiate_format("tar.gz", "application/zip").name == "tar.gz"
+    assert negotiate_format(None, "application/zip;q=0.5, application/gzip;q=0.9").name == "tar.gz"
+    assert negotiate_format(None, "text/html, */*").name == "zip"
+    assert negotiate_format("rar", None) is None
+
+
+def test_download_format_parameter_and_accept(client, category, make_rule):
+    rule_id = make_rule(content="正文")
+    response = client.get(f"/api/download/single/{rule_id}", params={"format": "tar.gz"})
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/gzip"
+    assert response.headers["content-disposition"].endswith(".tar.gz")
+    with tarfile.open(fileobj=io.BytesIO(response.content), mode="r:gz") as tar:
+        assert tar.extractfile(tar.getmembers()[0]).read() == "正文".encode()
+
+    negotiated = client.get(f"/api/download/single/{rule_id}", headers={"Accept": "application/gzip"})
+    assert negotiated.content == response.content
+    assert negotiated.headers["vary"] == "Accept"
+    # 不同格式的 ETag 不同
+    zipped = client.get(f"/api/download/single/{rule_id}")
+    assert zipped.headers["etag"] != response.headers["etag"]
+
+    bundle = client.get(f"/api/download/category/{category}", params={"format": "tar.gz"})
+    assert bundle.headers["accept-ranges"] == "none"
+    with tarfile.open(fileobj=io.BytesIO(bundle.content), mode="r:gz") as tar:
+        assert len(tar.getmembers()) == 1
+
+
+def test_unsupported_format_is_rejected(client, make_rule):
+    rule_id = make_rule()
+    assert client.get(f"/api/download/single/{rule_id}", params={"format": "rar"}).status_code == 400
+    response = client.post("/api/download/batch", params={"format": "7z"}, json={"cursor_rule_ids": [rule_id]})
+    assert response.status_code == 400
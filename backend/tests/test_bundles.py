@@ -0,0 +1,81 @@
+import io
+import os
+import zipfile
+
+from app.bundles import BundleCache, bundle_cache
+
+
+def _names_and_bodies(data: bytes):
+    with zipfile.ZipFile(io.BytesIO(data)) as archive:
+        assert archive.testzip() is None
+        return sorted(archive.read(name).decode() for name in archive.namelist())
+
+
+def test_category_bundle_contents_and_etag(client, category, make_rule):
+    for i in range(3):
+        make_rule(content=f"正文 {i}")
+    response = client.get(f"/api/download/category/{category}")
+    assert response.status_code == 200
+    assert _names_and_bodies(response.content) == ["正文 0", "正文 1", "正文 2"]
+
+    builds = bundle_cache.metrics()["builds"]
+    again = client.get(f"/api/download/category/{category}")
+    assert again.content == response.content
+    assert again.headers["etag"] == response.headers["etag"]
+    assert bundle_cache.metrics()["builds"] == builds
+
+
+def test_changed_rule_rebuilds_incrementally(client, auth_headers, category, make_rule):
+    ids = [make_rule(content=f"正文 {i}") for i in range(4)]
+    first = client.get(f"/api/download/category/{category}")
+
+    client.put(f"/api/cursor-rules/{ids[1]}", json={"content": "已修改"}, headers=auth_headers)
+    before = bundle_cache.metrics()
+    second = client.get(f"/api/download/category/{category}")
+    after = bundle_cache.metrics()
+    assert second.headers["etag"] != first.headers["etag"]
+    assert _names_and_bodies(second.content) == ["已修改", "正文 0", "正文 2", "正文 3"]
+    assert after["builds"] == before["builds"] + 1
+    assert after["copied_members"] - before["copied_members"] == 3
+    assert after["fetched_members"] - before["fetched_members"] == 1
+
+    client.delete(f"/api/cursor-rules/{ids[0]}", headers=auth_headers)
+    third = client.get(f"/api/download/category/{category}")
+    assert _names_and_bodies(third.content) == ["已修改", "正文 2", "正文 3"]
+
+
+def test_rebuild_survives_old_file_removed_by_another_worker(db, tmp_path, category, make_rule):
+    for i in range(3):
+        make_rule(content=f"正文 {i}")
+    cache = BundleCache(str(tmp_path), check_interval=3600)
+    bundle = cache.get(db, "category", category)
+
+    # 其他 worker 重建后删除了旧文件，本进程仍按旧清单增量重建
+    os.remove(bundle.path)
+    old = cache._load_manifest("category", category)
+    manifest = cache._build(db, "category", category, old["members"], old)
+    assert manifest["token"] == bundle.token
+    assert cache.metrics()["copied_members"] == 0
+    assert cache.metrics()["fetched_members"] == 6
+    with open(bundle.path, "rb") as bundle_file:
+        assert _names_and_bodies(bundle_file.read()) == ["正文 0", "正文 1", "正文 2"]
+
+
+def test_tag_bundle_and_missing_targets(client, make_tag, make_rule, category):
+    tag_id = make_tag()
+    make_rule(content="带标签", tag_ids=[tag_id])
+    make_rule(content="无标签")
+    response = client.get(f"/api/download/tag/{tag_id}")
+    assert response.status_code == 200
+    assert _names_and_bodies(response.content) == ["带标签"]
+
+    assert client.get("/api/download/category/999999").status_code == 404
+    assert client.get("/api/download/tag/999999").status_code == 404
+    # 没有规则的标签
+    assert client.get(f"/api/download/tag/{make_tag()}").status_code == 404
+
+
+def test_bundle_stats_endpoint_requires_login(client, auth_headers):
+    assert client.get("/api/download/bundle-stats").status_code == 401
+    data = client.get("/api/download/bundle-stats", headers=auth_headers).json()
+    assert set(data) == {"builds", "copied_members", "fetched_members"}
@@ -0,0 +1,104 @@
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app import changelog
+from app.models import Base, Category, ChangeLogCounter, CursorRule, RuleChange, User
+
+
+def _changes(client, **params):
+    response = client.get("/api/changes", params=params)
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def test_changes_return_latest_state_per_rule(client, auth_headers, make_tag, make_rule):
+    since = _changes(client, limit=1)["latest_seq"]
+    tag_id = make_tag()
+    kept = make_rule(content="旧正文", tag_ids=[tag_id])
+    deleted = make_rule()
+    client.put(f"/api/cursor-rules/{kept}", json={"content": "新正文"}, headers=auth_headers)
+    client.delete(f"/api/cursor-rules/{deleted}", headers=auth_headers)
+
+    data = _changes(client, since=since)
+    assert [item["id"] for item in data["items"]] == [kept, deleted]
+    assert [item["seq"] for item in data["items"]] == [since + 3, since + 4]
+    assert data["items"][0]["content"] == "新正文"
+    assert data["items"][0]["tag_ids"] == [tag_id]
+    assert data["items"][1] == {**data["items"][1], "deleted": True, "title": None}
+    assert data["next_since"] == data["latest_seq"] == since + 4
+    assert data["has_more"] is False
+
+    # 同步到最新后没有新变更
+    assert _changes(client, since=data["next_since"])["items"] == []
+
+
+def test_changes_are_paged_by_seq(client, make_rule):
+    since = _changes(client, limit=1)["latest_seq"]
+    ids = [make_rule() for _ in range(5)]
+
+    seen, pages = [], 0
+    while True:
+        data = _changes(client, since=since, limit=2)
+        seen.extend(item["id"] for item in data["items"])
+        since, pages = data["next_since"], pages + 1
+        if not data["has_more"]:
+            break
+    assert seen == ids
+    assert pages == 3
+
+
+def test_invalid_parameters_are_rejected(client):
+    assert client.get("/api/changes", params={"since": -1}).status_code == 422
+    assert client.get("/api/changes", params={"limit": 0}).status_code == 422
+
+
+@pytest.fixture
+def fresh_session(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path}/changelog.db")
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine)()
+    try:
+        yield session
+    finally:
+        session.close()
+        engine.dispose()
+
+
+def _add_rules(session, count):
+    user = User(username="author", password_hash="x")
+    category = Category(name="category", created_by=1)
+    session.add_all([user, category])
+    session.flush()
+    session.add_all([
+        CursorRule(title=f"rule {i}", filename=f"rule-{i}", content="x", category_id=category.id, author_id=user.id)
+        for i in range(count)
+    ])
+    session.commit()
+
+
+def test_backfill_runs_once(fresh_session):
+    _add_rules(fresh_session, 3)
+    assert changelog.backfill(fresh_session) == 3
+    # 其他 worker 启动时再次调用不会重复补记
+    assert changelog.backfill(fresh_session) == 0
+
+    assert [seq for seq, in fresh_session.query(RuleChange.seq).order_by(RuleChange.seq)] == [1, 2, 3]
+    assert changelog.latest_seq(fresh_session) == 3
+    changelog.record_change(fresh_session, 1, changelog.CHANGE_UPDATE)
+    fresh_session.commit()
+    assert changelog.latest_seq(fresh_session) == 4
+
+
+def test_backfill_uses_seeded_counter(fresh_session):
+    # 迁移预先创建的计数行（last_seq 为0）
+    fresh_session.add(ChangeLogCounter(id=1, last_seq=0))
+    fresh_session.commit()
+    _add_rules(fresh_session, 2)
+    assert changelog.backfill(fresh_session) == 2
+    assert changelog.latest_seq(fresh_session) == 2
+
+
+def test_record_change_requires_counter(fresh_session):
+    with pytest.raises(RuntimeError):
+        changelog.record_change(fresh_session, 1, changelog.CHANGE_CREATE)
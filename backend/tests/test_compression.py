@@ -0,0 +1,69 @@
+import threading
+
+import pytest
+
+from app.compression import CompressionBusy, CompressionPool, compress_bytes, compression_pool
+from app.zipstream import ZIP_DEFLATED, ZIP_STORED
+
+
+def test_compress_bytes_stores_small_or_incompressible_data():
+    assert compress_bytes(b"abc", 6, 16) == (b"abc", ZIP_STORED)
+    random_like = bytes(range(256))
+    assert compress_bytes(random_like, 6, 16) == (random_like, ZIP_STORED)
+    compressed, method = compress_bytes(b"a" * 1000, 6, 16)
+    assert method == ZIP_DEFLATED
+    assert len(compressed) < 1000
+
+
+def test_inline_pool_runs_in_caller_thread():
+    pool = CompressionPool(0, 0, 1)
+    caller = threading.get_ident()
+    assert pool.submit(threading.get_ident).result() == caller
+    assert pool.map(lambda x: x * 2, [1, 2, 3]) == [2, 4, 6]
+
+
+def test_pool_map_keeps_order_and_records_metrics():
+    pool = CompressionPool(2, 4, 1)
+    try:
+        assert pool.map(lambda x: x * x, range(10)) == [x * x for x in range(10)]
+        metrics = pool.metrics()
+        assert metrics["completed"] == 10
+        assert metrics["queued"] == 0
+        assert metrics["active"] == 0
+        assert metrics["rejected"] == 0
+    finally:
+        pool.shutdown()
+
+
+def test_full_queue_raises_busy():
+    pool = CompressionPool(1, 1, 0.05)
+    release = threading.Event()
+    try:
+        pool.submit(release.wait)
+        pool.submit(release.wait)
+        with pytest.raises(CompressionBusy):
+            pool.submit(release.wait)
+        assert pool.metrics()["rejected"] == 1
+    finally:
+        release.set()
+        pool.shutdown()
+    # 任务完成后空位归还
+    assert pool.metrics()["completed"] == 2
+
+
+def test_busy_pool_returns_503_with_retry_after(client, auth_headers, monkeypatch, make_rule):
+    rule_id = make_rule()
+
+    def busy(*args):
+        raise CompressionBusy()
+
+    monkeypatch.setattr(compression_pool, "submit", busy)
+    response = client.put(f"/api/cursor-rules/{rule_id}", json={"content": "新的正文"}, headers=auth_headers)
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "5"
+
+
+def test_compression_stats_endpoint_requires_login(client, auth_headers):
+    assert client.get("/api/download/compression-stats").status_code == 401
+    data = client.get("/api/download/compression-stats", headers=auth_headers).json()
+    assert {"workers", "queued", "max_queued", "rejected", "avg_wait_ms"} <= set(data)
@@ -0,0 +1,89 @@
+import threading
+
+import pytest
+
+from app.counters import CounterAggregator, counter_aggregator
+from app.models import CursorRule
+
+
+def _persisted(db, rule_id, field):
+    db.expire_all()
+    return getattr(db.get(CursorRule, rule_id), field)
+
+
+def test_flush_writes_batched_deltas(db, make_rule):
+    ids = [make_rule() for _ in range(3)]
+    aggregator = CounterAggregator(flush_interval=60)
+    for rule_id in ids:
+        aggregator.increment("view_count", rule_id)
+    aggregator.increment("view_count", ids[0], 4)
+    aggregator.increment("download_count", ids[1], 2)
+    assert aggregator.merged("view_count", ids[0], 0) == 5
+    assert aggregator.pending_total("view_count") == 7
+
+    assert aggregator.flush() == 4
+    assert [_persisted(db, rule_id, "view_count") for rule_id in ids] == [5, 1, 1]
+    assert _persisted(db, ids[1], "download_count") == 2
+    assert aggregator.pending_total("view_count") == 0
+    assert aggregator.flush() == 0
+
+
+def test_failed_flush_restores_deltas(db, make_rule, monkeypatch):
+    rule_id = make_rule()
+    aggregator = CounterAggregator(flush_interval=60)
+    aggregator.increment("view_count", rule_id, 3)
+
+    class BrokenSession:
+        def query(self, *args):
+            # 写入过程中又有新的增量进入缓冲区
+            aggregator.increment("view_count", rule_id, 2)
+            raise RuntimeError("database unavailable")
+
+        def rollback(self):
+            pass
+
+        def close(self):
+            pass
+
+    monkeypatch.setattr("app.counters.SessionLocal", BrokenSession)
+    with pytest.raises(RuntimeError):
+        aggregator.flush()
+    assert aggregator.pending("view_count", rule_id) == 5
+
+    monkeypatch.undo()
+    aggregator.flush()
+    assert _persisted(db, rule_id, "view_count") == 5
+
+
+def test_concurrent_increments_are_not_lost(db, make_rule):
+    rule_id = make_rule()
+    aggregator = CounterAggregator(flush_interval=60)
+
+    def worker():
+        for _ in range(500):
+            aggregator.increment("download_count", rule_id)
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    flusher = threading.Thread(target=lambda: [aggregator.flush() for _ in range(20)])
+    for thread in [*threads, flusher]:
+        thread.start()
+    for thread in [*threads, flusher]:
+        thread.join()
+    aggregator.flush()
+    assert _persisted(db, rule_id, "download_count") == 4000
+
+
+def test_discard_drops_pending_deltas():
+    aggregator = CounterAggregator(flush_interval=60)
+    aggregator.increment("view_count", 1, 3)
+    aggregator.discard(1)
+    assert aggregator.pending("view_count", 1) == 0
+
+
+def test_view_endpoint_reports_unflushed_count(client, make_rule):
+    rule_id = make_rule()
+    for _ in range(3):
+        client.post(f"/api/cursor-rules/{rule_id}/view")
+    assert client.get(f"/api/cursor-rules/{rule_id}").json()["view_count"] == 3
+    counter_aggregator.flush()
+    assert client.get(f"/api/cursor-rules/{rule_id}").json()["view_count"] == 3
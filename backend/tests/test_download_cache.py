@@ -0,0 +1,86 @@
+from app.counters import counter_aggregator
+from app.database import SessionLocal
+from app.models import CursorRule
+
+
+def _downloads(rule_id):
+    # 聚合器可能在后台落库，先落库再读取数据库中的计数
+    counter_aggregator.flush()
+    db = SessionLocal()
+    try:
+        return db.query(CursorRule.download_count).filter(CursorRule.id == rule_id).scalar()
+    finally:
+        db.close()
+
+
+def test_single_download_etag_and_not_modified(client, make_rule):
+    rule_id = make_rule(content="正文" * 100)
+    response = client.get(f"/api/download/single/{rule_id}")
+    etag = response.headers["etag"]
+    assert response.headers["accept-ranges"] == "bytes"
+    assert "max-age" in response.headers["cache-control"]
+
+    assert client.get(f"/api/download/single/{rule_id}").content == response.content
+    cached = client.get(f"/api/download/single/{rule_id}", headers={"If-None-Match": f"W/{etag}"})
+    assert cached.status_code == 304
+    assert cached.content == b""
+    assert cached.headers["etag"] == etag
+
+
+def test_etag_changes_with_content(client, auth_headers, make_rule):
+    rule_id = make_rule()
+    etag = client.get(f"/api/download/single/{rule_id}").headers["etag"]
+    client.put(f"/api/cursor-rules/{rule_id}", json={"filename": "renamed"}, headers=auth_headers)
+    response = client.get(f"/api/download/single/{rule_id}", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+
+
+def test_range_requests(client, make_rule):
+    rule_id = make_rule(content="正文" * 100)
+    full = client.get(f"/api/download/single/{rule_id}")
+    size, etag = len(full.content), full.headers["etag"]
+    path = f"/api/download/single/{rule_id}"
+
+    partial = client.get(path, headers={"Range": "bytes=10-19"})
+    assert partial.status_code == 206
+    assert partial.content == full.content[10:20]
+    assert partial.headers["content-range"] == f"bytes 10-19/{size}"
+
+    assert client.get(path, headers={"Range": "bytes=-5"}).content == full.content[-5:]
+    assert client.get(path, headers={"Range": "bytes=100-"}).content == full.content[100:]
+
+    unsatisfiable = client.get(path, headers={"Range": f"bytes={size}-"})
+    assert unsatisfiable.status_code == 416
+    assert unsatisfiable.headers["content-range"] == f"bytes */{size}"
+
+    # If-Range 与当前 ETag 不一致时返回完整内容
+    stale = client.get(path, headers={"Range": "bytes=0-9", "If-Range": '"stale"'})
+    assert stale.status_code == 200
+    assert client.get(path, headers={"Range": "bytes=0-9", "If-Range": etag}).status_code == 206
+
+
+def test_resumed_range_is_not_counted_again(client, make_rule):
+    rule_id = make_rule(content="正文" * 100)
+    path = f"/api/download/single/{rule_id}"
+    client.get(path)
+    assert _downloads(rule_id) == 1
+    client.get(path, headers={"Range": "bytes=0-99"})
+    assert _downloads(rule_id) == 2
+    client.get(path, headers={"Range": "bytes=100-"})
+    etag = client.get(path, headers={"Range": "bytes=50-60"}).headers["etag"]
+    client.get(path, headers={"If-None-Match": etag})
+    assert _downloads(rule_id) == 2
+
+
+def test_bundle_range_and_not_modified(client, category, make_rule):
+    make_rule(content="正文" * 100)
+    path = f"/api/download/category/{category}"
+    full = client.get(path)
+    etag = full.headers["etag"]
+
+    assert client.get(path, headers={"If-None-Match": etag}).status_code == 304
+    partial = client.get(path, headers={"Range": "bytes=5-", "If-Range": etag})
+    assert partial.status_code == 206
+    assert partial.content == full.content[5:]
+    assert client.get(path, headers={"Range": f"bytes={len(full.content)}-"}).status_code == 416
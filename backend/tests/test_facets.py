@@ -0,0 +1,63 @@
+import pytest
+
+from app.facets import parse_facet_fields
+
+
+@pytest.fixture
+def author_id(client, auth_headers):
+    return client.get("/api/auth/profile", headers=auth_headers).json()["id"]
+
+
+def _facets(client, **params):
+    data = client.get("/api/cursor-rules", params={"facets": "category,tag", **params}).json()
+    return {field: {facet["id"]: facet["count"] for facet in values} for field, values in data["facets"].items()}
+
+
+def test_facet_counts_follow_filters(client, auth_headers, author_id, category, make_tag, make_rule):
+    other_category = client.post(
+        "/api/categories", json={"name": f"other-{author_id}"}, headers=auth_headers
+    ).json()["data"]["category"]["id"]
+    a, b = make_tag(), make_tag()
+    make_rule(tag_ids=[a])
+    make_rule(tag_ids=[a, b])
+    make_rule(tag_ids=[b], category_id=other_category)
+
+    facets = _facets(client, author_id=author_id)
+    assert facets["category"] == {category: 2, other_category: 1}
+    assert facets["tag"] == {a: 2, b: 2}
+
+    # 分类分面不应用当前分类筛选，标签分面应用
+    facets = _facets(client, author_id=author_id, category_id=category)
+    assert facets["category"] == {category: 2, other_category: 1}
+    assert facets["tag"] == {a: 2, b: 1}
+
+    facets = _facets(client, author_id=author_id, tag_ids=str(b))
+    assert facets["category"] == {category: 1, other_category: 1}
+
+
+def test_facets_are_invalidated_by_writes(client, author_id, make_tag, make_rule):
+    tag = make_tag()
+    make_rule(tag_ids=[tag])
+    assert _facets(client, author_id=author_id)["tag"] == {tag: 1}
+    make_rule(tag_ids=[tag])
+    assert _facets(client, author_id=author_id)["tag"] == {tag: 2}
+
+
+def test_unknown_facet_field_is_400(client):
+    assert client.get("/api/cursor-rules", params={"facets": "category,author"}).status_code == 400
+    with pytest.raises(ValueError):
+        parse_facet_fields("tag,color")
+    assert parse_facet_fields(" tag , tag,category") == ["tag", "category"]
+
+
+def test_trending_facets_count_only_ranked_rules(client, category, make_tag, make_rule):
+    tag = make_tag()
+    ranked = make_rule(tag_ids=[tag])
+    make_rule(tag_ids=[tag])
+    client.post(f"/api/cursor-rules/{ranked}/view")
+
+    data = client.get(
+        "/api/cursor-rules", params={"facets": "tag", "category_id": category, "sort_by": "trending"}
+    ).json()
+    assert data["total"] == 1
+    assert {facet["id"]: facet["count"] for facet in data["facets"]["tag"]} == {tag: 1}
@@ -0,0 +1,57 @@
+from app.listing import hydrate_rules
+from conftest import recorded_statements
+
+
+def test_hydrate_keeps_id_order_and_skips_missing(db, make_tag, make_rule):
+    tag_id = make_tag()
+    ids = [make_rule(tag_ids=[tag_id]) for _ in range(3)]
+    order = [ids[2], 10 ** 9, ids[0], ids[1]]
+
+    items = hydrate_rules(db, order)
+    assert [item["id"] for item in items] == [ids[2], ids[0], ids[1]]
+    assert all(item["author"] and item["category"] for item in items)
+    assert [tag["id"] for tag in items[0]["tags"]] == [tag_id]
+    assert hydrate_rules(db, []) == []
+
+
+def test_hydrate_query_count_does_not_grow_with_page_size(db, make_tag, make_rule):
+    tag_ids = [make_tag() for _ in range(3)]
+    ids = [make_rule(tag_ids=tag_ids[:n % 3 + 1]) for n in range(12)]
+    hydrate_rules(db, ids)
+
+    with recorded_statements() as small:
+        hydrate_rules(db, ids[:2])
+    with recorded_statements() as large:
+        hydrate_rules(db, ids)
+    assert len(small) == len(large)
+
+
+def test_list_page_issues_fixed_number_of_queries(client, category, make_rule):
+    for _ in range(12):
+        make_rule()
+    params = {"category_id": category, "with_total": "false"}
+    # 预热分类、标签和访客草图缓存
+    client.get("/api/cursor-rules", params={**params, "size": 12})
+
+    with recorded_statements() as small:
+        client.get("/api/cursor-rules", params={**params, "size": 2})
+    with recorded_statements() as large:
+        client.get("/api/cursor-rules", params={**params, "size": 12})
+    assert len(small) == len(large)
+
+
+def test_listing_never_selects_rule_body(client, category, make_rule):
+    make_rule(content="正文" * 1000, example="示例")
+    with recorded_statements() as statements:
+        client.get("/api/cursor-rules", params={"category_id": category})
+        client.get("/api/download/stats")
+    selected = " ".join(statements)
+    assert "cursor_rules.content" not in selected
+    assert "cursor_rules.example" not in selected
+
+
+def test_detail_still_returns_body(client, make_rule):
+    rule_id = make_rule(content="完整正文", example="使用示例")
+    data = client.get(f"/api/cursor-rules/{rule_id}").json()
+    assert data["content"] == "完整正文"
+    assert data["example"] == "使用示例"
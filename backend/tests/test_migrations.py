@@ -0,0 +1,70 @@
+import os
+import subprocess
+import sys
+
+import pytest
+import sqlalchemy as sa
+
+from app import database
+from app.models import Base
+from scripts.explain_queries import scanned_table
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _run(args, database_url=None):
+    env = {key: value for key, value in os.environ.items() if key not in ("DATABASE_URL", "BUNDLE_CACHE_DIR")}
+    if database_url:
+        env["DATABASE_URL"] = database_url
+    result = subprocess.run(
+        [sys.executable, "-m", *args], cwd=BACKEND_DIR, env=env, capture_output=True, text=True, timeout=600
+    )
+    assert result.returncode == 0, result.stdout + result.stderr
+    return result.stdout
+
+
+def test_migrations_match_models_and_downgrade(tmp_path):
+    database_url = f"sqlite:///{tmp_path}/migrated.db"
+    _run(["alembic", "upgrade", "head"], database_url)
+    # 迁移结果与模型定义一致（没有需要自动生成的差异）
+    _run(["alembic", "check"], database_url)
+
+    indexes = {index["name"] for index in sa.inspect(sa.create_engine(database_url)).get_indexes("cursor_rules")}
+    assert {"ix_cursor_rules_created_at", "ix_cursor_rules_category_created"} <= indexes
+    # 各排序方式的按分类组合索引
+    assert {
+        "ix_cursor_rules_category_downloads", "ix_cursor_rules_category_likes",
+        "ix_cursor_rules_category_views", "ix_cursor_rules_category_net_score",
+    } <= indexes
+    tag_indexes = sa.inspect(sa.create_engine(database_url)).get_indexes("cursor_rules_tags")
+    assert "ix_cursor_rules_tags_tag_rule" in {index["name"] for index in tag_indexes}
+    # 变更日志计数行由迁移预先创建
+    with sa.create_engine(database_url).connect() as connection:
+        assert connection.execute(sa.text("SELECT id, last_seq FROM change_log_counter")).all() == [(1, 0)]
+
+    _run(["alembic", "downgrade", "base"], database_url)
+    _run(["alembic", "upgrade", "head"], database_url)
+
+
+def test_explain_check_passes_on_seeded_catalog():
+    output = _run(["scripts.explain_queries", "--rules", "2000"])
+    assert "所有查询均使用索引" in output
+
+
+def test_scanned_table_strips_aliases():
+    tables = {"tags", "cursor_rules"}
+    assert scanned_table("tags_1", tables) == "tags"
+    assert scanned_table("cursor_rules", tables) == "cursor_rules"
+    assert scanned_table("anon_1", tables) == ""
+
+
+def test_startup_requires_migrated_schema(client, monkeypatch, tmp_path):
+    # 测试库由迁移创建，已是最新版本
+    database.check_schema()
+
+    # create_all 建出的库没有迁移版本，启动时直接报错
+    stale = sa.create_engine(f"sqlite:///{tmp_path}/stale.db")
+    Base.metadata.create_all(bind=stale)
+    monkeypatch.setattr(database, "engine", stale)
+    with pytest.raises(RuntimeError, match="alembic upgrade head"):
+        database.check_schema()
@@ -0,0 +1,118 @@
+import pytest
+from fastapi import HTTPException
+
+from app.models import CursorRule
+from app.pagination import decode_cursor, encode_cursor, paginate_ids
+from conftest import recorded_statements, walk_pages
+
+
+def _page(client, category, **params):
+    response = client.get("/api/cursor-rules", params={"category_id": category, **params})
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def test_cursor_walk_matches_offset_pages(client, category, make_rule):
+    ids = [make_rule() for _ in range(7)]
+    newest_first = list(reversed(ids))
+
+    assert walk_pages(client, "/api/cursor-rules", category_id=category, size=3) == newest_first
+    offset_ids = [
+        item["id"] for page in (1, 2, 3) for item in _page(client, category, size=3, page=page)["items"]
+    ]
+    assert offset_ids == newest_first
+
+
+def test_cursor_survives_deleted_anchor(client, auth_headers, category, make_rule):
+    ids = [make_rule() for _ in range(6)]
+    first = _page(client, category, size=2)
+    anchor_id = first["items"][-1]["id"]
+    assert client.delete(f"/api/cursor-rules/{anchor_id}", headers=auth_headers).status_code == 200
+
+    rest = walk_pages(client, "/api/cursor-rules", category_id=category, size=2, cursor=first["next_cursor"])
+    assert rest == list(reversed(ids))[2:]
+
+
+def test_cursor_boundary_is_fixed_when_sort_value_changes(client, db, category, make_rule):
+    ids = [make_rule() for _ in range(6)]
+    for likes, rule_id in enumerate(ids):
+        db.query(CursorRule).filter(CursorRule.id == rule_id).update({"likes_count": likes * 10})
+    db.commit()
+
+    first = _page(client, category, size=3, sort_by="most_liked")
+    seen = [item["id"] for item in first["items"]]
+    assert seen == [ids[5], ids[4], ids[3]]
+
+    # 上一页最后一行的点赞数在翻页前变化，边界仍是翻页时的取值，不应重复第一页的行
+    db.query(CursorRule).filter(CursorRule.id == ids[3]).update({"likes_count": 100})
+    db.commit()
+    rest = walk_pages(
+        client, "/api/cursor-rules", category_id=category, size=3, sort_by="most_liked",
+        cursor=first["next_cursor"]
+    )
+    assert rest == [ids[2], ids[1], ids[0]]
+
+
+def test_cursor_ties_on_created_at_are_split_by_id(client, db, category, make_rule):
+    ids = [make_rule() for _ in range(5)]
+    same_time = db.query(CursorRule.created_at).filter(CursorRule.id == ids[0]).scalar()
+    db.query(CursorRule).filter(CursorRule.id.in_(ids)).update({"created_at": same_time})
+    db.commit()
+
+    walked = walk_pages(client, "/api/cursor-rules", category_id=category, size=2)
+    assert walked == list(reversed(ids))
+
+
+def test_cursor_is_bound_to_sort_mode(client, category, make_rule):
+    for _ in range(3):
+        make_rule()
+    cursor = _page(client, category, size=1)["next_cursor"]
+
+    response = client.get("/api/cursor-rules", params={"cursor": cursor, "sort_by": "most_liked"})
+    assert response.status_code == 400
+
+
+@pytest.mark.parametrize("cursor", ["not-base64!", encode_cursor({"scope": "x"}), encode_cursor({"id": 1})])
+def test_invalid_cursor_is_rejected(client, cursor):
+    response = client.get("/api/cursor-rules", params={"cursor": cursor})
+    assert response.status_code == 400
+
+
+def test_cursor_round_trip():
+    payload = {"scope": "newest:desc", "id": 5, "value": "2024-01-01 00:00:00"}
+    assert decode_cursor(encode_cursor(payload)) == payload
+
+
+
+def test_rank_cursor_walks_trending_ranking(client, auth_headers, category, make_rule):
+    ids = [make_rule() for _ in range(5)]
+    for votes, rule_id in enumerate(ids):
+        for n in range(votes + 1):
+            client.post(f"/api/cursor-rules/{rule_id}/view", headers={"X-Forwarded-For": f"10.9.{votes}.{n}"})
+    ranking = client.get("/api/cursor-rules", params={"category_id": category, "sort_by": "trending"}).json()
+    expected = [item["id"] for item in ranking["items"]]
+    assert sorted(expected) == sorted(ids)
+
+    with recorded_statements() as statements:
+        walked = walk_pages(client, "/api/cursor-rules", category_id=category, sort_by="trending", size=2)
+    assert walked == expected
+    assert not any("CASE" in statement for statement in statements)
+
+    # 上一页最后一条被删除后从原名次继续
+    first = _page(client, category, sort_by="trending", size=2)
+    client.delete(f"/api/cursor-rules/{first['items'][-1]['id']}", headers=auth_headers)
+    rest = walk_pages(
+        client, "/api/cursor-rules", category_id=category, sort_by="trending", size=2, cursor=first["next_cursor"]
+    )
+    assert rest == expected[2:]
+
+
+def test_rank_cursor_rejects_other_scopes():
+    ids = [5, 4, 3]
+    page_ids, cursor = paginate_ids(ids, "relevance", 1, 2)
+    assert page_ids == [5, 4]
+    assert paginate_ids(ids, "relevance", 1, 2, cursor) == ([3], None)
+    with pytest.raises(HTTPException):
+        paginate_ids(ids, "trending", 1, 2, cursor)
+    with pytest.raises(HTTPException):
+        paginate_ids(ids, "relevance", 1, 2, encode_cursor({"scope": "relevance", "id": 4, "value": "1"}))
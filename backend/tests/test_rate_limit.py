@@ -0,0 +1,99 @@
+import asyncio
+
+import pytest
+
+from app.config import settings
+from app.rate_limit import MemoryBucketStore, RateLimiter, rate_limiter
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("app.rate_limit.time.monotonic", lambda: now[0])
+    return now
+
+
+def test_bucket_allows_burst_then_refills(clock):
+    store = MemoryBucketStore(shards=4)
+    results = [store.take("ip:a", 1, capacity=3, rate=1.0)[0] for _ in range(4)]
+    assert results == [True, True, True, False]
+    # 其他键有独立的桶
+    assert store.take("ip:b", 1, 3, 1.0)[0] is True
+
+    clock[0] += 1.5
+    assert store.take("ip:a", 1, 3, 1.0) == (True, pytest.approx(0.5))
+    assert store.take("ip:a", 1, 3, 1.0)[0] is False
+
+    clock[0] += 100
+    # 不超过桶容量
+    assert store.take("ip:a", 1, 3, 1.0) == (True, pytest.approx(2.0))
+
+
+def test_cost_larger_than_tokens_is_denied_without_spending(clock):
+    store = MemoryBucketStore(shards=1)
+    store.take("k", 2, capacity=3, rate=1.0)
+    assert store.take("k", 2, 3, 1.0) == (False, pytest.approx(1.0))
+    assert store.take("k", 1, 3, 1.0)[0] is True
+
+
+def test_idle_keys_are_evicted(clock):
+    store = MemoryBucketStore(shards=1)
+    for i in range(4):
+        store.take(f"ip:{i}", 1, capacity=10, rate=1.0)
+    clock[0] += 11
+    store.take("ip:new", 1, 10, 1.0)
+    assert len(store) == 3
+    store.take("ip:new", 1, 10, 1.0)
+    assert len(store) == 1
+
+
+def test_route_costs_longest_prefix_wins():
+    limiter = RateLimiter(MemoryBucketStore(1), 60, {
+        "/api/download": 3, "POST /api/download/batch": 10, "GET /api/download/batch": 1000, "/health": 0,
+    })
+    assert limiter.cost("POST", "/api/download/batch") == 10
+    # 超过桶容量的消耗按容量计，避免永远无法通过
+    assert limiter.cost("GET", "/api/download/batch") == 60
+    assert limiter.cost("GET", "/api/download/single/1") == 3
+    assert limiter.cost("GET", "/health") == 0
+    assert limiter.cost("GET", "/api/tags") == 1
+    assert limiter.retry_after(10, 4.5) == 6
+
+
+def test_unavailable_store_fails_open():
+    class BrokenStore:
+        blocking = True
+
+        def take(self, *args):
+            raise ConnectionError("redis down")
+
+    limiter = RateLimiter(BrokenStore(), 60, {})
+    assert asyncio.run(limiter.acquire("ip:x", 1)) == (True, 60.0)
+
+
+@pytest.fixture
+def enabled_limiter(monkeypatch):
+    monkeypatch.setattr(settings, "RATE_LIMIT_ENABLED", True)
+    monkeypatch.setattr(rate_limiter, "store", MemoryBucketStore(4))
+    monkeypatch.setattr(rate_limiter, "capacity", 3)
+    monkeypatch.setattr(rate_limiter, "rate", 3 / 60.0)
+
+
+def test_middleware_returns_429_with_headers(client, enabled_limiter):
+    ip = {"X-Forwarded-For": "10.3.0.1"}
+    responses = [client.get("/api/tags", headers=ip) for _ in range(4)]
+    assert [r.status_code for r in responses] == [200, 200, 200, 429]
+    assert responses[0].headers["X-RateLimit-Limit"] == "3"
+    assert responses[2].headers["X-RateLimit-Remaining"] == "0"
+    assert int(responses[3].headers["Retry-After"]) >= 1
+
+    assert client.get("/api/tags", headers={"X-Forwarded-For": "10.3.0.2"}).status_code == 200
+    assert client.get("/health", headers=ip).status_code == 200
+
+
+def test_logged_in_user_has_own_bucket(client, auth_headers, enabled_limiter):
+    ip = {"X-Forwarded-For": "10.3.0.3"}
+    for _ in range(3):
+        client.get("/api/tags", headers=ip)
+    assert client.get("/api/tags", headers=ip).status_code == 429
+    assert client.get("/api/tags", headers={**ip, **auth_headers}).status_code == 200
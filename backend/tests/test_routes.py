@@ -0,0 +1,29 @@
+import inspect
+
+from anyio import to_thread
+from fastapi.routing import APIRoute
+
+from app.config import settings
+from app.database import get_db
+
+
+def _dependencies(dependant):
+    for dependency in dependant.dependencies:
+        yield dependency.call
+        yield from _dependencies(dependency)
+
+
+def test_database_routes_are_sync(client):
+    # 使用数据库会话的路由必须是普通函数，由线程池执行，不阻塞事件循环
+    db_routes = [
+        route for route in client.app.routes
+        if isinstance(route, APIRoute) and get_db in set(_dependencies(route.dependant))
+    ]
+    assert db_routes
+    async_routes = [route.path for route in db_routes if inspect.iscoroutinefunction(route.endpoint)]
+    assert async_routes == []
+
+
+def test_thread_pool_is_sized_from_settings(client):
+    total_tokens = client.portal.call(lambda: to_thread.current_default_thread_limiter().total_tokens)
+    assert total_tokens == settings.DB_THREAD_POOL_SIZE
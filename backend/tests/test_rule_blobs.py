@@ -0,0 +1,57 @@
+import io
+import zipfile
+import zlib
+
+from app.models import RuleContentBlob
+from app.rule_blobs import ensure_blobs
+from app.zipstream import ZIP_DEFLATED, ZIP_STORED
+
+
+def _content(blob: RuleContentBlob) -> bytes:
+    data = zlib.decompress(blob.compressed, -15) if blob.method == ZIP_DEFLATED else blob.compressed
+    assert zlib.crc32(data) == blob.crc32
+    assert len(data) == blob.size
+    return data
+
+
+def test_blob_follows_rule_writes(client, db, auth_headers, make_rule):
+    content = "规则正文 " * 200
+    rule_id = make_rule(content=content)
+    blob = db.get(RuleContentBlob, rule_id)
+    assert blob.method == ZIP_DEFLATED
+    assert _content(blob) == content.encode()
+
+    response = client.put(f"/api/cursor-rules/{rule_id}", json={"content": "短"}, headers=auth_headers)
+    assert response.status_code == 200, response.text
+    db.expire_all()
+    blob = db.get(RuleContentBlob, rule_id)
+    assert blob.method == ZIP_STORED
+    assert _content(blob) == "短".encode()
+
+    client.delete(f"/api/cursor-rules/{rule_id}", headers=auth_headers)
+    db.expire_all()
+    assert db.get(RuleContentBlob, rule_id) is None
+
+
+def test_ensure_blobs_fills_missing_rows(db, make_rule):
+    ids = [make_rule(content=f"正文 {i}") for i in range(3)]
+    db.query(RuleContentBlob).filter(RuleContentBlob.cursor_rule_id.in_(ids[:2])).delete(synchronize_session=False)
+    db.commit()
+
+    assert ensure_blobs(db, ids) == 2
+    assert ensure_blobs(db, ids) == 0
+    assert [_content(db.get(RuleContentBlob, rule_id)).decode() for rule_id in ids] == ["正文 0", "正文 1", "正文 2"]
+
+
+def test_single_download_serves_blob_without_recompressing(client, db, make_rule):
+    rule_id = make_rule(content="内容 " * 300)
+    db.query(RuleContentBlob).filter(RuleContentBlob.cursor_rule_id == rule_id).delete(synchronize_session=False)
+    db.commit()
+
+    response = client.get(f"/api/download/single/{rule_id}")
+    assert response.status_code == 200
+    blob = db.get(RuleContentBlob, rule_id)
+    with zipfile.ZipFile(io.BytesIO(response.content)) as archive:
+        info = archive.infolist()[0]
+        assert archive.read(info) == ("内容 " * 300).encode()
+        assert (info.compress_type, info.CRC, info.compress_size) == (blob.method, blob.crc32, len(blob.compressed))
@@ -0,0 +1,149 @@
+from types import SimpleNamespace
+
+from app.models import CursorRule
+from app.search import MemorySearchBackend, MySQLSearchBackend, search_engine, tokenize
+from conftest import recorded_statements, unique_name, walk_pages
+
+
+def _keyword():
+    return unique_name("kw").replace("-", "")
+
+
+def test_tokenize_cjk_bigrams_and_words():
+    assert tokenize("编码规范 FastAPI") == ["编码", "码规", "规范", "范", "fastapi"]
+
+
+def test_keyword_search_returns_every_match(client, db, make_rule):
+    keyword = _keyword()
+    ids = [make_rule(title=f"{keyword} rule {i}") for i in range(5)]
+
+    assert sorted(rule_id for rule_id, _ in search_engine.search(db, keyword)) == ids
+    assert len(search_engine.search(db, keyword, limit=2)) == 2
+
+    response = client.get("/api/cursor-rules", params={"keyword": keyword, "size": 2}).json()
+    assert response["total"] == 5
+    assert sorted(walk_pages(client, "/api/cursor-rules", keyword=keyword, size=2)) == ids
+
+
+def test_single_cjk_character_matches(client, make_rule):
+    rule_id = make_rule(title=f"{_keyword()} 鲲鹏")
+    items = client.get("/api/cursor-rules", params={"keyword": "鲲"}).json()["items"]
+    assert rule_id in [item["id"] for item in items]
+
+
+def test_memory_backend_has_no_result_cap():
+    backend = MemorySearchBackend(refresh_seconds=3600)
+    backend._loaded_at = float("inf")
+    for rule_id in range(1, 1501):
+        backend._add(SimpleNamespace(id=rule_id, title="shared term", description=None, content="x"))
+
+    assert len(backend.search(None, "shared")) == 1500
+    assert len(backend.search(None, "shared", limit=10)) == 10
+
+
+def test_memory_backend_picks_up_rules_written_elsewhere(db, category, auth_headers, make_rule):
+    keyword = _keyword()
+    backend = MemorySearchBackend(refresh_seconds=0)
+    backend.setup(db)
+    assert backend.search(db, keyword) == []
+
+    # 其他 worker 写入的规则不会经过本进程的 index_rule
+    rule_id = make_rule(title=keyword)
+    assert [rule_id for rule_id, _ in backend.search(db, keyword)] == [rule_id]
+
+    db.query(CursorRule).filter(CursorRule.id == rule_id).update({"title": "renamed"})
+    db.commit()
+    assert backend.search(db, keyword) == []
+
+
+class _RecordingSession:
+    """记录执行的 SQL 和参数，代替 MySQL 会话"""
+
+    def __init__(self):
+        self.statements = []
+
+    def execute(self, statement, params):
+        self.statements.append((str(statement), params))
+        return SimpleNamespace(all=lambda: [])
+
+
+def test_mysql_backend_uses_like_for_terms_shorter_than_ngram():
+    session = _RecordingSession()
+    MySQLSearchBackend().search(session, "规范 鲲 50%")
+
+    sql, params = session.statements[0]
+    assert params["q"] == '+"规范" +"50%"'
+    assert params["w0"] == "%鲲%"
+    assert "title LIKE :w0" in sql
+    assert "LIMIT" not in sql
+
+
+def test_mysql_backend_only_short_terms_skips_fulltext():
+    session = _RecordingSession()
+    MySQLSearchBackend().search(session, "_", limit=5)
+
+    sql, params = session.statements[0]
+    assert "MATCH" not in sql
+    assert params["w0"] == "%\\_%"
+    assert params["limit"] == 5
+
+
+def test_relevance_listing_pages_ranked_ids_without_sql_ranking(
+    client, db, auth_headers, category, make_tag, make_rule
+):
+    keyword = _keyword()
+    tag_id = make_tag()
+    ids = [make_rule(title=f"{keyword} {i}", tag_ids=[tag_id] if i % 2 else []) for i in range(12)]
+    other = client.post("/api/categories", json={"name": unique_name("category")}, headers=auth_headers)
+    make_rule(title=keyword, category_id=other.json()["data"]["category"]["id"])
+    ranked = [rule_id for rule_id, _ in search_engine.search(db, keyword) if rule_id in ids]
+    params = {"keyword": keyword, "sort_by": "relevance", "category_id": category}
+
+    with recorded_statements() as statements:
+        data = client.get("/api/cursor-rules", params={**params, "size": 5}).json()
+    assert [item["id"] for item in data["items"]] == ranked[:5]
+    assert data["total"] == 12
+    # 名次不以 CASE 或完整ID列表的形式交给数据库
+    assert not any("CASE" in statement for statement in statements)
+    assert max(statement.count("?") for statement in statements) < 12
+
+    tagged = client.get("/api/cursor-rules", params={**params, "tag_ids": tag_id, "page": 2, "size": 2}).json()
+    assert [item["id"] for item in tagged["items"]] == [rule_id for rule_id in ranked if rule_id in ids[1::2]][2:4]
+    assert tagged["total"] == 6
+
+
+def test_last_latin_word_matches_as_prefix(client, db, make_rule):
+    keyword = _keyword()
+    rule_id = make_rule(title=f"{keyword} FastAPI 规范")
+    for partial in ("Fast", "fastap", f"{keyword} fast", "规范 Fast"):
+        assert rule_id in [found for found, _ in search_engine.search(db, partial)], partial
+    # 只有最后一个拉丁词按前缀匹配
+    assert search_engine.search(db, f"{keyword[:-2]} fastapi") == []
+
+
+def test_memory_backend_prefix_match():
+    backend = MemorySearchBackend(refresh_seconds=3600)
+    backend._loaded_at = float("inf")
+    backend._add(SimpleNamespace(id=1, title="FastAPI guide", description=None, content="x"))
+    backend._add(SimpleNamespace(id=2, title="fasting", description=None, content="x"))
+    assert sorted(rule_id for rule_id, _ in backend.search(None, "fast")) == [1, 2]
+    assert [rule_id for rule_id, _ in backend.search(None, "fastapi guid")] == [1]
+    assert backend.search(None, "guid fast") == []
+
+
+def test_punctuation_only_keyword_matches_substring(client, make_rule):
+    marker = f"{_keyword()}"
+    rule_id = make_rule(title=f"{marker} C++ 规则", content="使用 -> 运算符")
+    for keyword in ("++", "->"):
+        items = client.get("/api/cursor-rules", params={"keyword": keyword, "size": 100}).json()["items"]
+        assert rule_id in [item["id"] for item in items], keyword
+    assert client.get("/api/cursor-rules", params={"keyword": "%%"}).json()["total"] == 0
+
+
+def test_mysql_backend_punctuation_word_uses_like():
+    session = _RecordingSession()
+    MySQLSearchBackend().search(session, "c++ ++")
+
+    sql, params = session.statements[0]
+    assert params["q"] == '+"c++"'
+    assert params["w0"] == "%++%"
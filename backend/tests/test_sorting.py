@@ -0,0 +1,41 @@
+import pytest
+
+from app.models import CursorRule
+
+
+@pytest.fixture
+def scored_rules(db, make_rule):
+    """三条规则：(点赞, 点踩, 下载, 浏览) 各不相同"""
+    ids = [make_rule() for _ in range(3)]
+    values = [(5, 0, 1, 30), (9, 8, 20, 10), (1, 0, 3, 20)]
+    for rule_id, (likes, dislikes, downloads, views) in zip(ids, values):
+        db.query(CursorRule).filter(CursorRule.id == rule_id).update({
+            "likes_count": likes, "dislikes_count": dislikes,
+            "download_count": downloads, "view_count": views,
+        })
+    db.commit()
+    return ids
+
+
+@pytest.mark.parametrize("sort_by, expected", [
+    ("most_liked", [1, 0, 2]),
+    ("likes_count", [1, 0, 2]),
+    ("most_downloaded", [1, 2, 0]),
+    ("most_viewed", [0, 2, 1]),
+    ("net_score", [0, 2, 1]),  # 净好评相同时按ID降序
+    ("newest", [2, 1, 0]),
+])
+def test_sort_modes(client, category, scored_rules, sort_by, expected):
+    items = client.get("/api/cursor-rules", params={"category_id": category, "sort_by": sort_by}).json()["items"]
+    assert [item["id"] for item in items] == [scored_rules[i] for i in expected]
+
+
+def test_ascending_order(client, category, scored_rules):
+    params = {"category_id": category, "sort_by": "most_liked", "sort_order": "asc"}
+    items = client.get("/api/cursor-rules", params=params).json()["items"]
+    assert [item["id"] for item in items] == [scored_rules[i] for i in (2, 0, 1)]
+
+
+@pytest.mark.parametrize("sort_by", ["title", "content", "id; drop table users"])
+def test_unindexed_sort_is_rejected(client, sort_by):
+    assert client.get("/api/cursor-rules", params={"sort_by": sort_by}).status_code == 400
@@ -0,0 +1,65 @@
+import pytest
+
+from app.models import CursorRule
+from app.stats import TOP_DOWNLOADS_LIMIT, PlatformStats
+from conftest import recorded_statements
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("app.stats.time.monotonic", lambda: now[0])
+    return now
+
+
+def test_snapshot_served_from_memory_and_updated_by_writes(client, make_rule):
+    before = client.get("/api/download/platform-stats").json()
+    rule_id = make_rule()
+    with recorded_statements() as statements:
+        after = client.get("/api/download/platform-stats").json()
+    assert after["total_rules"] == before["total_rules"] + 1
+    assert not [statement for statement in statements if "count(" in statement.lower()]
+
+    client.get(f"/api/download/single/{rule_id}")
+    assert client.get("/api/download/platform-stats").json()["total_downloads"] == before["total_downloads"] + 1
+
+
+def test_recomputes_after_max_staleness(db, clock, make_rule):
+    stats = PlatformStats(max_staleness=60)
+    total = stats.totals(db)["total_rules"]
+    make_rule()
+    # 其他 worker 的写入在快照过期前不可见
+    clock[0] += 30
+    assert stats.totals(db)["total_rules"] == total
+    clock[0] += 31
+    assert stats.totals(db)["total_rules"] == total + 1
+
+
+def test_top_downloads_incremental_and_removal(db, clock, make_rule):
+    ids = [make_rule() for _ in range(2)]
+    db.query(CursorRule).filter(CursorRule.id == ids[0]).update({"download_count": 10 ** 6})
+    db.commit()
+    stats = PlatformStats(max_staleness=60)
+    top = stats.top_downloads(db)
+    assert top[0]["id"] == ids[0]
+    assert len(top) <= TOP_DOWNLOADS_LIMIT
+
+    stats.record_download(ids[1], "renamed", 10 ** 6 + 1)
+    assert [entry["id"] for entry in stats.top_downloads(db)[:2]] == [ids[1], ids[0]]
+    stats.update_rule(ids[1], "new title")
+    assert stats.top_downloads(db)[0]["title"] == "new title"
+
+    # 榜内规则被删除后，下次读取重算排行
+    db.query(CursorRule).filter(CursorRule.id == ids[0]).delete()
+    db.commit()
+    downloads = stats.totals(db)["total_downloads"]
+    stats.remove_rule(ids[0], 10 ** 6)
+    assert ids[0] not in [entry["id"] for entry in stats.top_downloads(db)]
+    assert stats.totals(db)["total_downloads"] <= downloads - 10 ** 6 + 1
+
+
+def test_increments_before_first_load_are_ignored(db):
+    stats = PlatformStats(max_staleness=60)
+    stats.add("total_rules")
+    stats.record_download(1, "x", 5)
+    assert stats.totals(db)["total_rules"] == db.query(CursorRule).count()
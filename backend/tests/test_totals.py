@@ -0,0 +1,57 @@
+from sqlalchemy import text
+
+from app.pagination import CountCache, count_cache
+
+
+def test_with_total_false_skips_count(client, category, make_rule):
+    make_rule()
+    data = client.get("/api/cursor-rules", params={"category_id": category, "with_total": "false"}).json()
+    assert data["total"] is None
+    assert data["pages"] is None
+    assert len(data["items"]) == 1
+
+
+def test_cached_total_is_invalidated_by_writes(client, auth_headers, category, make_rule):
+    make_rule()
+    params = {"category_id": category}
+    assert client.get("/api/cursor-rules", params=params).json()["total"] == 1
+
+    rule_id = make_rule()
+    assert client.get("/api/cursor-rules", params=params).json()["total"] == 2
+
+    client.delete(f"/api/cursor-rules/{rule_id}", headers=auth_headers)
+    assert client.get("/api/cursor-rules", params=params).json()["total"] == 1
+
+
+def test_estimated_total_uses_table_statistics(client, db, make_rule):
+    make_rule()
+    db.execute(text("ANALYZE"))
+    db.commit()
+    count_cache.invalidate()
+
+    data = client.get("/api/cursor-rules", params={"estimate_total": "true"}).json()
+    assert data["total_estimated"] is True
+    assert data["total"] > 0
+
+    # 有筛选条件时不使用估算
+    filtered = client.get("/api/cursor-rules", params={"estimate_total": "true", "author_id": 1}).json()
+    assert filtered["total_estimated"] is False
+
+
+def test_count_cache_expires_and_evicts(monkeypatch):
+    cache = CountCache(ttl=10, max_entries=2)
+    now = [100.0]
+    monkeypatch.setattr("app.pagination.time.monotonic", lambda: now[0])
+
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+
+    now[0] += 11
+    assert cache.get("a") is None
+    cache.set("d", 4)
+    cache.invalidate()
+    assert cache.get("d") is None
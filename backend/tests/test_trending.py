@@ -0,0 +1,134 @@
+import pytest
+
+from app.trending import EVENT_WEIGHTS, TrendingTracker, trending
+
+HOUR = 3600.0
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """可拨动的当前时间（整点开始）"""
+    now = [1_000_000 * HOUR]
+    monkeypatch.setattr("app.trending.time.time", lambda: now[0])
+    return now
+
+
+def _tracker(top_k=10):
+    return TrendingTracker(half_life_hours=24, window_hours=72, top_k=top_k, sweep_interval=60)
+
+
+def test_ranking_by_weighted_activity(clock):
+    tracker = _tracker()
+    tracker.record(1, 10, EVENT_WEIGHTS["view"])
+    tracker.record(2, 10, EVENT_WEIGHTS["like"])
+    tracker.record(3, 20, EVENT_WEIGHTS["download"])
+    assert tracker.top() == [2, 3, 1]
+    assert tracker.top(10) == [2, 1]
+    assert tracker.top(10, limit=1) == [2]
+    assert tracker.top(99) == []
+
+
+def test_older_activity_decays(clock):
+    tracker = _tracker()
+    tracker.record(1, None, 10.0, clock[0] - 24 * HOUR)
+    tracker.record(2, None, 6.0)
+    assert tracker.top() == [2, 1]
+    # 一个半衰期前的 10 分衰减为 5 分
+    assert tracker.score(1) == pytest.approx(5.0)
+
+    clock[0] += 24 * HOUR
+    assert tracker.score(2) == pytest.approx(3.0)
+    assert tracker.top() == [2, 1]
+
+
+def test_sweep_expires_buckets_outside_window(clock):
+    tracker = _tracker()
+    tracker.record(1, 10, 5.0)
+    tracker.record(2, 10, 1.0)
+    clock[0] += 2 * HOUR
+    tracker.record(2, 10, 1.0)
+    assert tracker.top(10) == [1, 2]
+
+    # 规则1的活动滑出窗口后被淘汰，规则2还剩一个桶
+    clock[0] += 71 * HOUR
+    assert tracker.sweep() == 2
+    assert tracker.top(10) == [2]
+    assert tracker.score(2) > 0
+
+    clock[0] += 2 * HOUR
+    tracker.sweep()
+    assert tracker.top(10) == []
+    assert tracker.top() == []
+
+
+def test_events_outside_window_are_ignored(clock):
+    tracker = _tracker()
+    tracker.record(1, None, 5.0, clock[0] - 72 * HOUR)
+    assert tracker.top() == []
+
+
+def test_negative_weight_drops_rule_from_ranking(clock):
+    tracker = _tracker()
+    tracker.record(1, None, EVENT_WEIGHTS["like"])
+    tracker.record(2, None, EVENT_WEIGHTS["view"])
+    tracker.record(1, None, -EVENT_WEIGHTS["like"])
+    assert tracker.top() == [2]
+
+
+def test_top_k_and_late_climber(clock):
+    tracker = _tracker(top_k=2)
+    for rule_id, weight in [(1, 3.0), (2, 2.0), (3, 1.0)]:
+        tracker.record(rule_id, None, weight)
+    assert tracker.top() == [1, 2]
+    tracker.record(3, None, 5.0)
+    assert tracker.top() == [3, 1]
+    # 榜内规则分数下降后，榜外规则重新入选
+    tracker.record(3, None, -5.5)
+    assert tracker.top() == [1, 2]
+
+
+def test_category_change_and_removal(clock):
+    tracker = _tracker()
+    tracker.record(1, 10, 2.0)
+    tracker.record(2, 10, 1.0)
+    tracker.update_category(1, 20)
+    assert tracker.top(10) == [2]
+    assert tracker.top(20) == [1]
+    tracker.remove_rule(1)
+    assert tracker.top(20) == []
+    assert tracker.top() == [2]
+
+
+def test_rebase_keeps_order(clock):
+    tracker = TrendingTracker(half_life_hours=1, window_hours=400, top_k=10, sweep_interval=60)
+    tracker.record(1, None, 2.0)
+    tracker.record(2, None, 1.0)
+    clock[0] += 300 * HOUR
+    tracker.record(3, None, 1.0)
+    tracker.sweep()
+    assert tracker.top() == [3, 1, 2]
+    assert tracker.score(3) == pytest.approx(1.0)
+
+
+def test_load_restores_recent_votes(client, db, make_rule):
+    rule_id = make_rule()
+    client.post(f"/api/cursor-rules/{rule_id}/vote", json={"vote_type": "like"})
+    tracker = _tracker()
+    tracker.load(db)
+    assert rule_id in tracker.top()
+
+
+def test_empty_ranking_falls_back_to_newest(client, category, make_rule):
+    ids = [make_rule() for _ in range(3)]
+    assert trending.top(category) == []
+    data = client.get("/api/cursor-rules", params={"category_id": category, "sort_by": "trending"}).json()
+    assert [item["id"] for item in data["items"]] == list(reversed(ids))
+    assert data["total"] == 3
+
+
+def test_trending_listing_follows_ranking(client, category, make_rule):
+    ids = [make_rule() for _ in range(3)]
+    client.post(f"/api/cursor-rules/{ids[0]}/view")
+    client.post(f"/api/cursor-rules/{ids[1]}/vote", json={"vote_type": "like"})
+    data = client.get("/api/cursor-rules", params={"category_id": category, "sort_by": "trending"}).json()
+    assert [item["id"] for item in data["items"]] == [ids[1], ids[0]]
@@ -0,0 +1,99 @@
+from app.models import RuleViewSketch
+from app.unique_views import HyperLogLog, UniqueViewTracker, visitor_key
+
+
+def test_estimate_within_error_bound():
+    sketch = HyperLogLog(10)
+    for i in range(20000):
+        sketch.add(f"ip:{i}")
+    # 标准误差约 3.3%，取 4 倍余量
+    assert abs(sketch.count() - 20000) < 20000 * 0.13
+
+
+def test_small_counts_are_exact_and_duplicates_ignored():
+    sketch = HyperLogLog(10)
+    assert sketch.count() == 0
+    for _ in range(3):
+        for i in range(5):
+            sketch.add(f"user:{i}")
+    assert sketch.count() == 5
+    assert sketch.add("user:0") is False
+
+
+def test_merge_is_union_and_idempotent():
+    left, right = HyperLogLog(10), HyperLogLog(10)
+    for i in range(300):
+        left.add(f"ip:{i}")
+    for i in range(200, 500):
+        right.add(f"ip:{i}")
+    union = left.copy()
+    union.merge(right)
+    assert abs(union.count() - 500) < 500 * 0.13
+
+    again = union.copy()
+    again.merge(right)
+    again.merge(left)
+    assert again.registers == union.registers
+
+
+def test_serialization_round_trip():
+    sketch = HyperLogLog(10)
+    for i in range(50):
+        sketch.add(str(i))
+    restored = HyperLogLog.from_bytes(10, sketch.to_bytes())
+    assert restored.registers == sketch.registers
+    assert len(sketch.to_bytes()) < 1024
+
+
+def test_visitor_key():
+    assert visitor_key(3, "1.2.3.4") == "user:3"
+    assert visitor_key(None, "1.2.3.4") == "ip:1.2.3.4"
+
+
+def test_two_workers_checkpoint_merges(db, make_rule):
+    rule_id = make_rule()
+    first, second = UniqueViewTracker(10, 60), UniqueViewTracker(10, 60)
+    for i in range(10):
+        first.record(db, rule_id, f"ip:{i}")
+    for i in range(5, 20):
+        second.record(db, rule_id, f"ip:{i}")
+
+    assert first.checkpoint() == 1
+    assert second.checkpoint() == 1
+    # 后写回的 worker 合并了库中草图，先写回的不会被覆盖
+    assert second.counts(db, [rule_id])[rule_id] == 20
+    assert UniqueViewTracker(10, 60).counts(db, [rule_id])[rule_id] == 20
+    assert second.checkpoint() == 0
+
+
+def test_deleted_rule_is_not_written_back(client, auth_headers, db, make_rule):
+    rule_id = make_rule()
+    tracker = UniqueViewTracker(10, 60)
+    tracker.record(db, rule_id, "ip:1")
+    client.delete(f"/api/cursor-rules/{rule_id}", headers=auth_headers)
+
+    tracker.checkpoint()
+    assert db.query(RuleViewSketch).filter(RuleViewSketch.cursor_rule_id == rule_id).count() == 0
+
+
+def test_view_endpoint_counts_unique_visitors(client, make_rule):
+    rule_id = make_rule()
+    for ip in ["10.2.0.1", "10.2.0.1", "10.2.0.2"]:
+        client.post(f"/api/cursor-rules/{rule_id}/view", headers={"X-Forwarded-For": ip})
+    data = client.get(f"/api/cursor-rules/{rule_id}").json()
+    assert data["unique_view_count"] == 2
+    assert data["view_count"] == 3
+
+
+def test_absent_rule_picks_up_sketch_from_other_worker(db, make_rule):
+    rule_id = make_rule()
+    reader, writer = UniqueViewTracker(10, 60), UniqueViewTracker(10, 60)
+    assert reader.counts(db, [rule_id])[rule_id] == 0
+
+    writer.record(db, rule_id, "ip:1")
+    writer.checkpoint()
+    assert reader.counts(db, [rule_id])[rule_id] == 0
+
+    # 定期写回时清空 absent，重新从数据库加载
+    reader.checkpoint()
+    assert reader.counts(db, [rule_id])[rule_id] == 1
@@ -0,0 +1,40 @@
+from app.models import CursorRule
+from app.votes import reconcile_vote_counts
+from conftest import recorded_statements
+
+
+def _set_counts(db, rule_id, likes, dislikes):
+    db.query(CursorRule).filter(CursorRule.id == rule_id).update(
+        {"likes_count": likes, "dislikes_count": dislikes}
+    )
+    db.commit()
+
+
+def _counts(db, rule_id):
+    db.expire_all()
+    rule = db.get(CursorRule, rule_id)
+    return rule.likes_count, rule.dislikes_count
+
+
+def test_detail_reads_counters_without_counting_votes(client, make_rule):
+    rule_id = make_rule()
+    client.post(f"/api/cursor-rules/{rule_id}/vote", json={"vote_type": "like"})
+    with recorded_statements() as statements:
+        data = client.get(f"/api/cursor-rules/{rule_id}").json()
+    assert (data["likes_count"], data["dislikes_count"]) == (1, 0)
+    assert not any("FROM votes" in statement and "count(" in statement.lower() for statement in statements)
+
+
+def test_reconcile_repairs_drift(client, db, make_rule):
+    rule_id = make_rule()
+    client.post(f"/api/cursor-rules/{rule_id}/vote", json={"vote_type": "like"})
+    _set_counts(db, rule_id, 7, 3)
+
+    stats = reconcile_vote_counts(db, chunk_size=2, dry_run=True)
+    assert stats["drifted"] >= 1
+    assert _counts(db, rule_id) == (7, 3)
+
+    stats = reconcile_vote_counts(db, chunk_size=2)
+    assert stats["fixed"] >= 1
+    assert _counts(db, rule_id) == (1, 0)
+    assert reconcile_vote_counts(db)["drifted"] == 0
@@ -0,0 +1,44 @@
+from app.models import VoteType
+from app.votes import user_votes
+from conftest import recorded_statements
+
+IP = {"X-Forwarded-For": "10.1.1.1"}
+
+
+def _statuses(client, category, headers):
+    params = {"category_id": category, "include_user_vote": "true"}
+    items = client.get("/api/cursor-rules", params=params, headers=headers).json()["items"]
+    return {item["id"]: item["user_vote"] for item in items}
+
+
+def test_list_returns_vote_status_per_voter(client, auth_headers, category, make_rule):
+    liked, disliked, untouched = make_rule(), make_rule(), make_rule()
+    client.post(f"/api/cursor-rules/{liked}/vote", json={"vote_type": "like"}, headers=IP)
+    client.post(f"/api/cursor-rules/{disliked}/vote", json={"vote_type": "dislike"}, headers={**auth_headers, **IP})
+
+    assert _statuses(client, category, IP) == {liked: "like", disliked: "dislike", untouched: None}
+    # 其他IP的登录用户只看到自己按用户ID投的票
+    other_ip = {**auth_headers, "X-Forwarded-For": "10.1.1.2"}
+    assert _statuses(client, category, other_ip) == {liked: None, disliked: "dislike", untouched: None}
+    assert _statuses(client, category, {"X-Forwarded-For": "10.1.1.3"}) == dict.fromkeys([liked, disliked, untouched])
+
+
+def test_vote_status_is_one_query(db, make_rule):
+    ids = [make_rule() for _ in range(10)]
+    with recorded_statements() as statements:
+        assert user_votes(db, ids, None, "10.1.1.9") == {}
+    assert sum("FROM votes" in statement for statement in statements) == 1
+    assert user_votes(db, [], None, "10.1.1.9") == {}
+
+
+def test_user_vote_wins_over_ip_vote(client, auth_headers, db, make_rule):
+    rule_id = make_rule()
+    user_id = client.get("/api/auth/profile", headers=auth_headers).json()["id"]
+    client.post(
+        f"/api/cursor-rules/{rule_id}/vote", json={"vote_type": "dislike"}, headers={"X-Forwarded-For": "10.1.1.4"}
+    )
+    client.post(
+        f"/api/cursor-rules/{rule_id}/vote", json={"vote_type": "like"},
+        headers={**auth_headers, "X-Forwarded-For": "10.1.1.5"}
+    )
+    assert user_votes(db, [rule_id], user_id, "10.1.1.4") == {rule_id: VoteType.LIKE}
@@ -0,0 +1,99 @@
+import threading
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import sessionmaker
+
+from app.config import settings
+from app.database import SessionLocal
+from app.models import CursorRule, Vote, VoteType
+from app.votes import RuleNotFound, cast_vote, is_unique_violation
+
+
+@pytest.fixture
+def fk_session(client):
+    """开启外键约束的会话（与 MySQL InnoDB 行为一致）"""
+    engine = create_engine(settings.DATABASE_URL)
+    event.listen(engine, "connect", lambda connection, _: connection.execute("PRAGMA foreign_keys=ON"))
+    session = sessionmaker(bind=engine)()
+    try:
+        yield session
+    finally:
+        session.close()
+        engine.dispose()
+
+
+def _vote(client, rule_id, vote_type, ip="10.0.0.1"):
+    return client.post(
+        f"/api/cursor-rules/{rule_id}/vote", json={"vote_type": vote_type}, headers={"X-Forwarded-For": ip}
+    )
+
+
+def test_vote_toggle_and_switch(client, make_rule):
+    rule_id = make_rule()
+    assert _vote(client, rule_id, "like").json() == {"likes_count": 1, "dislikes_count": 0, "user_vote": "like"}
+    assert _vote(client, rule_id, "dislike").json() == {"likes_count": 0, "dislikes_count": 1, "user_vote": "dislike"}
+    assert _vote(client, rule_id, "dislike").json() == {"likes_count": 0, "dislikes_count": 0, "user_vote": None}
+    assert _vote(client, rule_id, "like", ip="10.0.0.2").json()["likes_count"] == 1
+
+
+def test_vote_on_missing_rule_is_404(client):
+    assert _vote(client, 10 ** 9, "like").status_code == 404
+
+
+def test_missing_rule_with_foreign_keys_is_not_retried(fk_session):
+    with pytest.raises(RuleNotFound):
+        cast_vote(fk_session, 10 ** 9, VoteType.LIKE, None, "10.0.0.3")
+    assert fk_session.query(Vote).filter(Vote.cursor_rule_id == 10 ** 9).count() == 0
+
+
+def test_foreign_key_violation_is_raised_not_retried(fk_session, make_rule):
+    rule_id = make_rule()
+    with pytest.raises(IntegrityError) as error:
+        cast_vote(fk_session, rule_id, VoteType.LIKE, 10 ** 9, "10.0.0.4")
+    assert not is_unique_violation(error.value)
+
+
+def test_concurrent_first_votes_keep_counts_consistent(make_rule):
+    rule_id = make_rule()
+    errors = []
+
+    def voter(ip):
+        db = SessionLocal()
+        try:
+            cast_vote(db, rule_id, VoteType.LIKE, None, ip)
+        except Exception as e:  # 记录后在主线程断言
+            errors.append(e)
+        finally:
+            db.close()
+
+    # 同一IP并发投两次（互相抵消），另有三个不同IP
+    ips = ["1.1.1.1", "1.1.1.1", "2.2.2.2", "3.3.3.3", "4.4.4.4"]
+    threads = [threading.Thread(target=voter, args=(ip,)) for ip in ips]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+
+    db = SessionLocal()
+    try:
+        likes = db.query(Vote).filter(Vote.cursor_rule_id == rule_id, Vote.vote_type == VoteType.LIKE).count()
+        assert db.get(CursorRule, rule_id).likes_count == likes == 3
+    finally:
+        db.close()
+
+
+class _DriverError(Exception):
+    pass
+
+
+@pytest.mark.parametrize("orig, expected", [
+    (_DriverError("UNIQUE constraint failed: votes.cursor_rule_id, votes.ip_address"), True),
+    (_DriverError(1062, "Duplicate entry '1-1.1.1.1' for key 'unique_ip_rule'"), True),
+    (_DriverError("FOREIGN KEY constraint failed"), False),
+    (_DriverError(1452, "Cannot add or update a child row: a foreign key constraint fails"), False),
+])
+def test_unique_violation_detection(orig, expected):
+    assert is_unique_violation(IntegrityError("INSERT", {}, orig)) is expected
@@ -0,0 +1,56 @@
+import io
+import zipfile
+import zlib
+
+from app.zipstream import ZIP_DEFLATED, ZIP_STORED, stream_precompressed_zip, ZipStreamWriter
+from scripts.bench_download import stream_zip
+
+
+def _deflate(data: bytes) -> bytes:
+    compressor = zlib.compressobj(6, zlib.DEFLATED, -15)
+    return compressor.compress(data) + compressor.flush()
+
+
+def _read_all(data: bytes):
+    with zipfile.ZipFile(io.BytesIO(data)) as archive:
+        assert archive.testzip() is None
+        return {info.filename: (archive.read(info), info.compress_type) for info in archive.infolist()}
+
+
+def test_precompressed_entries_are_spliced_unchanged():
+    content = b"rule body " * 500
+    entries = [
+        ("deflated.mdc", _deflate(content), ZIP_DEFLATED, zlib.crc32(content), len(content), (2024, 1, 2, 3, 4, 6)),
+        ("规则/中文.mdc", b"tiny", ZIP_STORED, zlib.crc32(b"tiny"), 4, (2024, 1, 2, 3, 4, 6)),
+    ]
+    data = b"".join(stream_precompressed_zip(entries))
+    assert _read_all(data) == {"deflated.mdc": (content, ZIP_DEFLATED), "规则/中文.mdc": (b"tiny", ZIP_STORED)}
+    # 相同输入得到相同字节
+    assert b"".join(stream_precompressed_zip(entries)) == data
+    with zipfile.ZipFile(io.BytesIO(data)) as archive:
+        assert archive.getinfo("规则/中文.mdc").date_time == (2024, 1, 2, 3, 4, 6)
+
+
+def test_many_entries_write_zip64_end_record():
+    writer = ZipStreamWriter()
+    chunks = []
+    for i in range(0x10000):
+        chunks.extend(writer.add_compressed(f"{i}.txt", b"", 0, 0, (2024, 1, 1, 0, 0, 0), ZIP_STORED))
+    chunks.extend(writer.close())
+    data = b"".join(chunks)
+    assert b"PK\x06\x06" in data[-200:]
+    with zipfile.ZipFile(io.BytesIO(data)) as archive:
+        assert len(archive.infolist()) == 0x10000
+
+
+def test_benchmark_baseline_recompresses_to_the_same_contents():
+    files = [("a.mdc", b"hello " * 20000), ("empty.mdc", b"")]
+    assert {name: data for name, (data, _) in _read_all(b"".join(stream_zip(iter(files)))).items()} == dict(files)
+
+
+def test_batch_download_is_a_valid_zip(client, make_rule):
+    ids = [make_rule(content=f"正文 {i}") for i in range(3)]
+    response = client.post("/api/download/batch", json={"cursor_rule_ids": ids})
+    assert response.status_code == 200
+    contents = _read_all(response.content)
+    assert sorted(data.decode() for data, _ in contents.values()) == ["正文 0", "正文 1", "正文 2"]